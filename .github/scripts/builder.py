@@ -5,6 +5,8 @@ WITH NON-BLOCKING HOKIBOT AND STAGING PUBLISH + SAFETY UPGRADES
 
 import os
 import sys
+import json
+import hashlib
 import logging
 import subprocess
 import tempfile
@@ -12,8 +14,10 @@ import random
 import string
 import datetime
 import filecmp
+import traceback
+from functools import cached_property
 from pathlib import Path
-from typing import List, Tuple, Dict, Set
+from typing import List, Tuple, Dict, Set, Optional
 
 # Configure logging
 logging.basicConfig(
@@ -37,7 +41,6 @@ try:
     from modules.vps.rsync_client import RsyncClient
     
     from modules.repo.manifest_factory import ManifestFactory
-    from modules.repo.smart_cleanup import SmartCleanup
     from modules.repo.cleanup_manager import CleanupManager
     from modules.repo.database_manager import DatabaseManager
     from modules.repo.version_tracker import VersionTracker
@@ -48,25 +51,36 @@ try:
     
     from modules.gpg.gpg_handler import GPGHandler
     
-    from modules.hokibot.hokibot import HokibotRunner
-    
     MODULES_LOADED = True
 except ImportError as e:
     logger.error(f"Failed to import modules: {e}")
     MODULES_LOADED = False
     sys.exit(1)
 
+# Package lists are imported once here (script_dir is already on sys.path);
+# get_package_lists only falls back to the repo-root layout if this fails
+try:
+    import packages as _pkglists
+except ImportError:
+    _pkglists = None
+
 
 class PackageBuilderOrchestrator:
     """Main orchestrator coordinating all phases WITH NON-BLOCKING HOKIBOT AND STAGING PUBLISH + SAFETY UPGRADES"""
     
-    def __init__(self):
-        """Initialize orchestrator with all modules"""
+    def __init__(self, validate_env: bool = True):
+        """
+        Initialize orchestrator configuration and state (modules load lazily, see ensure_ready).
+        
+        Args:
+            validate_env: Run the pre-flight secret/env validation (False for --status)
+        """
         # CRITICAL: Single pipeline owner declaration
         logger.info("PIPELINE_OWNER=builder.py")
         
-        # Pre-flight validation
-        EnvironmentValidator.validate_env()
+        # Pre-flight validation (exits on missing secrets, so --status skips it)
+        if validate_env:
+            EnvironmentValidator.validate_env()
         
         # Load configuration
         self.config_loader = ConfigLoader()
@@ -88,21 +102,41 @@ class PackageBuilderOrchestrator:
         self.output_dir = self.repo_root / python_config['output_dir']
         self.mirror_temp_dir = Path(python_config['mirror_temp_dir'])
         self.aur_build_dir = self.repo_root / python_config['aur_build_dir']
+        self.build_tracking_dir = self.repo_root / python_config['build_tracking_dir']
         self.ssh_options = python_config['ssh_options']
+        self.ssh_control_path = python_config['ssh_control_path']
+        self.ssh_control_persist = python_config['ssh_control_persist']
+        # Carry the multiplexing options on every explicit ssh/rsync argv too, so
+        # calls attach to the master even when ~/.ssh/config is not consulted
+        if self.ssh_control_path:
+            self.ssh_options = list(self.ssh_options) + [
+                "-o", "ControlMaster=auto",
+                "-o", f"ControlPath={self.ssh_control_path}",
+                "-o", f"ControlPersist={self.ssh_control_persist}",
+            ]
+        self.rsync_upload_streams = python_config['rsync_upload_streams']
+        self.rsync_mirror_streams = python_config['rsync_mirror_streams']
+        self.manifest_fetch_workers = python_config['manifest_fetch_workers']
+        self.remote_inventory_cache = python_config['remote_inventory_cache']
+        self.remote_inventory_max_age = python_config['remote_inventory_max_age']
         self.packager_id = python_config['packager_id']
         self.debug_mode = python_config['debug_mode']
         self.sign_packages = python_config['sign_packages']
         
-        # Initialize modules
-        self._init_modules()
+        # Modules (SSH, GPG key import, package builder...) are initialized
+        # on first use by ensure_ready(); status() never needs them
+        self._modules_ready = False
         
         # State tracking
         self.vps_files = []
         self.vps_packages = []
+        self._inventory: List[str] = []  # VPS package inventory, fetched once in Phase I
+        self._output_listing: Optional[List[Path]] = None  # cached output_dir scan, see _list_output_files
         self.allowlist = set()
-        self.built_packages = []
-        self.skipped_packages = []
+        self.built_packages: List[Tuple[str, str]] = []  # (pkg_name, version)
+        self.skipped_packages: List[Tuple[str, str]] = []
         self.desired_inventory = set()
+        self.source_pkgnames: Dict[str, List[str]] = {}  # package source -> pkgnames from its PKGBUILD
         
         # GATE STATE TRACKING
         self.gate_state = {
@@ -124,6 +158,41 @@ class PackageBuilderOrchestrator:
         
         logger.info("PackageBuilderOrchestrator initialized")
     
+    def ensure_ready(self):
+        """Initialize all modules once (idempotent); called before any phase runs"""
+        if self._modules_ready:
+            return
+        self._init_modules()
+        self._modules_ready = True
+    
+    def status(self) -> Dict[str, Optional[int]]:
+        """
+        Report local cache state without initializing SSH, GPG or the builders.
+        
+        Returns:
+            Dict of entry counts (None when the cache file is missing or unreadable)
+        """
+        def _json_len(path: Path, key: Optional[str] = None) -> Optional[int]:
+            try:
+                with open(path, 'r') as f:
+                    data = json.load(f)
+                return len(data[key] if key else data)
+            except (OSError, ValueError, KeyError, TypeError):
+                return None
+        
+        try:
+            with os.scandir(self.output_dir) as entries:
+                output_packages = sum(1 for entry in entries if entry.name.endswith(('.pkg.tar.zst', '.pkg.tar.xz')))
+        except FileNotFoundError:
+            output_packages = None
+        
+        return {
+            'output_packages': output_packages,
+            'build_cache_entries': _json_len(self.build_tracking_dir / '.build-cache.json'),
+            'meta_cache_entries': _json_len(self.build_tracking_dir / '.meta_cache.json'),
+            'vps_inventory_packages': _json_len(self.build_tracking_dir / 'inventory.json', 'files'),
+        }
+    
     def _init_modules(self):
         """Initialize all required modules"""
         # VPS modules
@@ -133,6 +202,12 @@ class PackageBuilderOrchestrator:
             'remote_dir': self.remote_dir,
             'ssh_options': self.ssh_options,
             'repo_name': self.repo_name,
+            'inventory_cache_file': self.build_tracking_dir / 'inventory.json' if self.remote_inventory_cache else None,
+            'inventory_cache_max_age': self.remote_inventory_max_age,
+            'ssh_control_path': self.ssh_control_path,
+            'ssh_control_persist': self.ssh_control_persist,
+            'rsync_upload_streams': self.rsync_upload_streams,
+            'rsync_mirror_streams': self.rsync_mirror_streams,
         }
         self.ssh_client = SSHClient(vps_config)
         self.ssh_client.setup_ssh_config(self.ssh_key)
@@ -147,6 +222,7 @@ class PackageBuilderOrchestrator:
             'mirror_temp_dir': self.mirror_temp_dir,
             'vps_user': self.vps_user,
             'vps_host': self.vps_host,
+            'ssh_options': self.ssh_options,
         }
         self.cleanup_manager = CleanupManager(repo_config)
         self.database_manager = DatabaseManager(repo_config)
@@ -183,14 +259,23 @@ class PackageBuilderOrchestrator:
             sign_packages=self.sign_packages,
             debug_mode=self.debug_mode,
             version_tracker=self.version_tracker,
-            build_tracker=self.build_tracker
+            build_tracker=self.build_tracker,
+            state_dir=self.build_tracking_dir  # Cached between CI runs; output_dir is not
         )
+        # Version metadata survives between runs in the (cached) build tracking dir
+        self.package_builder.version_manager.load_meta_cache(self.build_tracking_dir / ".meta_cache.json")
         
-        # Initialize HokibotRunner
-        self.hokibot_runner = HokibotRunner(debug_mode=self.debug_mode)
+        # HokibotRunner (git client, config loader) is created on first use;
+        # most runs have no hokibot data and never touch it
         
         logger.info("All modules initialized successfully")
     
+    @cached_property
+    def hokibot_runner(self):
+        """HokibotRunner, imported and constructed on first access"""
+        from modules.hokibot.hokibot import HokibotRunner
+        return HokibotRunner(debug_mode=self.debug_mode)
+    
     def _ensure_output_directory(self):
         """Ensure output directory exists with proper ownership and permissions."""
         try:
@@ -248,10 +333,8 @@ class PackageBuilderOrchestrator:
         logger.info(f"PACMAN_POST_REPO_ENABLE_SY: START (count_before={self.post_repo_enable_sy_count})")
         
         try:
-            cmd = "sudo pacman -Sy --noconfirm"
             result = subprocess.run(
-                cmd,
-                shell=True,
+                ['sudo', 'pacman', '-Sy', '--noconfirm'],
                 capture_output=True,
                 text=True,
                 timeout=300,
@@ -312,32 +395,42 @@ class PackageBuilderOrchestrator:
         """Phase I: VPS State Fetch"""
         logger.info("PHASE I: VPS State Fetch")
         
+        # One authenticated SSH connection shared by every later ssh/rsync call
+        self.ssh_client.open_master()
+        
         if not self.ssh_client.test_ssh_connection():
             logger.warning("SSH connection test failed")
         
         self.ssh_client.ensure_remote_directory()
         
-        remote_packages = self.ssh_client.list_remote_packages()
-        self.vps_packages = remote_packages
+        # Materialize the inventory once; every Phase I consumer reuses this list
+        self._inventory = self.ssh_client.get_cached_inventory()
+        self.vps_packages = self._inventory
         
-        remote_signatures = self._get_vps_signatures()
+        # Signatures come from the same remote find as the package inventory
+        remote_signatures = self.ssh_client.get_cached_signatures()
         self.vps_files = self.vps_packages + remote_signatures
         
         logger.info(f"Found {len(self.vps_packages)} package files and {len(remote_signatures)} signatures on VPS")
         
-        self.version_tracker.build_remote_version_index(self.vps_packages)
+        self.version_tracker.build_remote_version_index(self._inventory)
         
         if not self._run_post_repo_enable_pacman_sy():
             logger.warning("Post-repo-enable pacman -Sy was blocked or failed")
         
         self.package_builder.set_vps_files(self.vps_files)
         
-        if self.vps_packages:
+        if self._inventory:
             logger.info("Mirroring remote packages locally (package files only)...")
+            # DB files are always regenerated; signatures only when signing is on
+            mirror_excludes = self.rsync_client.default_mirror_excludes(
+                include_signatures=self.gpg_handler.gpg_enabled
+            )
             success = self.rsync_client.mirror_remote_packages(
                 self.mirror_temp_dir,
                 self.output_dir,
-                self.vps_packages
+                self._inventory,
+                exclude=mirror_excludes
             )
             if not success:
                 logger.warning("Failed to mirror remote packages")
@@ -345,57 +438,56 @@ class PackageBuilderOrchestrator:
         
         return True
     
-    def _get_vps_signatures(self) -> List[str]:
-        """Get signature files from VPS for completeness check"""
-        logger.info("Fetching VPS signature file list...")
-        
-        ssh_key_path = "/home/builder/.ssh/id_ed25519"
-        if not os.path.exists(ssh_key_path):
-            logger.warning(f"SSH key not found")
-            return []
-        
-        ssh_cmd = [
-            "ssh",
-            f"{self.vps_user}@{self.vps_host}",
-            rf'find "{self.remote_dir}" -maxdepth 1 \( -type f -o -type l \) -name "*.sig" -printf "%f\\n" 2>/dev/null || echo "NO_FILES"'
-        ]
-        
-        try:
-            result = subprocess.run(
-                ssh_cmd,
-                capture_output=True,
-                text=True,
-                check=False
-            )
-            
-            if result.returncode == 0:
-                files = [f.strip() for f in result.stdout.split('\n') if f.strip() and f.strip() != 'NO_FILES']
-                logger.info(f"Found {len(files)} signature files on remote server")
-                return files
-            else:
-                logger.warning(f"SSH find for signatures returned error")
-                return []
-                
-        except Exception as e:
-            logger.warning(f"SSH command for signatures failed: {e}")
-            return []
-    
     def get_package_lists(self) -> Tuple[List[str], List[str]]:
         """Get package lists from packages.py"""
-        try:
-            import packages
-            logger.info("Using package lists from packages.py")
-            return packages.LOCAL_PACKAGES, packages.AUR_PACKAGES
-        except ImportError:
+        global _pkglists
+        if _pkglists is None:
             try:
-                import sys
                 sys.path.insert(0, str(self.repo_root))
-                import scripts.packages as packages
-                logger.info("Using package lists from packages.py")
-                return packages.LOCAL_PACKAGES, packages.AUR_PACKAGES
+                import scripts.packages as _loaded
+                _pkglists = _loaded
             except ImportError:
                 logger.error("Cannot load package lists from packages.py")
                 sys.exit(1)
+        logger.info("Using package lists from packages.py")
+        return _pkglists.LOCAL_PACKAGES, _pkglists.AUR_PACKAGES
+    
+    def _scan_local_package_dirs(self) -> Set[str]:
+        """
+        List directory names under the repository root with a single scandir.
+        
+        Returns:
+            Set of directory names (replaces one stat per local package)
+        """
+        try:
+            with os.scandir(self.repo_root) as entries:
+                return {entry.name for entry in entries if entry.is_dir()}
+        except OSError as e:
+            logger.warning(f"Could not scan repository root {self.repo_root}: {e}")
+            return set()
+    
+    def _list_output_files(self, refresh: bool = False) -> List[Path]:
+        """
+        Regular files in output_dir from one cached scandir.
+        
+        Args:
+            refresh: Rescan; pass True after a step that adds or removes files
+            
+        Returns:
+            Sorted list of file paths
+        """
+        if refresh or self._output_listing is None:
+            try:
+                with os.scandir(self.output_dir) as entries:
+                    names = sorted(entry.name for entry in entries if entry.is_file())
+            except FileNotFoundError:
+                names = []
+            self._output_listing = [self.output_dir / name for name in names]
+        return self._output_listing
+    
+    def _list_output_packages(self, refresh: bool = False) -> List[Path]:
+        """Package files (and their .sig files) in output_dir, from the cached scan."""
+        return [path for path in self._list_output_files(refresh) if '.pkg.tar.' in path.name]
     
     def phase_ii_dynamic_allowlist(self) -> bool:
         """Phase II: Dynamic Allowlist Generation"""
@@ -404,11 +496,11 @@ class PackageBuilderOrchestrator:
         local_packages, aur_packages = self.get_package_lists()
         
         package_sources = []
+        existing_dirs = self._scan_local_package_dirs()
         
         for pkg in local_packages:
-            pkg_dir = self.repo_root / pkg
-            if pkg_dir.exists():
-                package_sources.append(str(pkg_dir))
+            if pkg in existing_dirs:
+                package_sources.append(str(self.repo_root / pkg))
             else:
                 logger.warning(f"Local package directory not found: {pkg}")
         
@@ -416,9 +508,13 @@ class PackageBuilderOrchestrator:
             package_sources.append(pkg)
         
         logger.info(f"Processing {len(package_sources)} package sources...")
-        self.allowlist = ManifestFactory.build_allowlist(package_sources)
+        # Fetch every PKGBUILD once (AUR clones in parallel) and share the
+        # contents between the allowlist and the desired inventory
+        pkgbuilds = ManifestFactory.get_pkgbuilds(package_sources, max_workers=self.manifest_fetch_workers)
+        logger.info(f"PKGBUILD_FETCH count={len(pkgbuilds)} loaded={sum(1 for c in pkgbuilds.values() if c)} workers={self.manifest_fetch_workers}")
+        self.allowlist = ManifestFactory.build_allowlist(package_sources, pkgbuilds)
         
-        self.desired_inventory = self._build_desired_inventory(package_sources)
+        self.desired_inventory = self._build_desired_inventory(package_sources, pkgbuilds)
         logger.info(f"Desired inventory package names: {len(self.desired_inventory)}")
         if self.desired_inventory:
             first_ten = list(self.desired_inventory)[:10]
@@ -428,19 +524,23 @@ class PackageBuilderOrchestrator:
         
         return len(self.allowlist) > 0
     
-    def _build_desired_inventory(self, package_sources: List[str]) -> Set[str]:
-        """Build desired inventory set from all PKGBUILDs."""
+    def _build_desired_inventory(self, package_sources: List[str], pkgbuilds: Optional[Dict[str, Optional[str]]] = None) -> Set[str]:
+        """Build desired inventory set from all PKGBUILDs (pre-fetched contents when given)."""
         desired_inventory = set()
         
         for source in package_sources:
-            pkgbuild_content = ManifestFactory.get_pkgbuild(source)
+            if pkgbuilds is not None and source in pkgbuilds:
+                pkgbuild_content = pkgbuilds[source]
+            else:
+                pkgbuild_content = ManifestFactory.get_pkgbuild(source)
             
             if pkgbuild_content:
                 pkg_names = ManifestFactory.extract_pkgnames(pkgbuild_content)
                 
                 if pkg_names:
                     desired_inventory.update(pkg_names)
-                    logger.debug(f"Added to desired inventory from {source}: {pkg_names}")
+                    self.source_pkgnames[source] = pkg_names
+                    logger.debug("Added to desired inventory from %s: %s", source, pkg_names)
                 else:
                     logger.warning(f"No pkgname found in {source}")
             else:
@@ -448,7 +548,7 @@ class PackageBuilderOrchestrator:
         
         return desired_inventory
     
-    def phase_iv_version_audit_and_build(self) -> Tuple[List[str], List[str]]:
+    def phase_iv_version_audit_and_build(self) -> Tuple[List[Tuple[str, str]], List[Tuple[str, str]]]:
         """Phase IV: Version Audit & Build"""
         logger.info("PHASE IV: Version Audit & Build")
         
@@ -460,12 +560,12 @@ class PackageBuilderOrchestrator:
         
         local_packages_with_versions = []
         aur_packages_with_versions = []
+        existing_dirs = self._scan_local_package_dirs()
         
         for pkg_name in local_packages:
-            pkg_dir = self.repo_root / pkg_name
-            if pkg_dir.exists():
+            if pkg_name in existing_dirs:
                 remote_version = self.version_tracker.get_remote_version(pkg_name, [])
-                local_packages_with_versions.append((pkg_dir, remote_version))
+                local_packages_with_versions.append((self.repo_root / pkg_name, remote_version))
             else:
                 logger.warning(f"Local package directory not found: {pkg_name}")
         
@@ -474,6 +574,9 @@ class PackageBuilderOrchestrator:
             aur_packages_with_versions.append((pkg_name, remote_version))
         
         self.version_tracker.set_desired_inventory(self.desired_inventory)
+        self.package_builder.set_aur_pkgnames(
+            {pkg: self.source_pkgnames[pkg] for pkg in aur_packages if pkg in self.source_pkgnames}
+        )
         
         built_packages, skipped_packages, failed_packages = (
             self.package_builder.batch_audit_and_build(
@@ -547,6 +650,67 @@ class PackageBuilderOrchestrator:
         logger.info(f"Upload filtering complete: {len(filtered)} files to upload, {skipped_count} skipped (already on VPS)")
         return filtered
     
+    def _publish_fingerprint(self, files: List[Path]) -> str:
+        """
+        BLAKE2b over the (name, size) of every package and signature that feeds
+        the repository database. repo-add output itself is not byte-stable
+        (archive mtimes), so its inputs identify the published state instead.
+        
+        Args:
+            files: Candidate upload files from output_dir
+            
+        Returns:
+            Hex digest of the package set
+        """
+        digest = hashlib.blake2b(self.repo_name.encode(), digest_size=20)
+        for path in sorted(files):
+            if '.pkg.tar.' in path.name:
+                try:
+                    size = path.stat().st_size
+                except OSError:
+                    size = -1
+                digest.update(f"{path.name}\0{size}\n".encode())
+        return digest.hexdigest()
+    
+    def _last_upload_fingerprint(self) -> Optional[str]:
+        """Fingerprint recorded after the last fully verified upload, if any."""
+        try:
+            with open(self.build_tracking_dir / ".last_upload.json", 'r') as f:
+                return json.load(f).get('fingerprint')
+        except (OSError, ValueError, AttributeError):
+            return None
+    
+    def _record_upload_fingerprint(self, fingerprint: str):
+        """Persist the published fingerprint atomically (temp file + os.replace)."""
+        path = self.build_tracking_dir / ".last_upload.json"
+        tmp_path = path.with_name(path.name + ".tmp")
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp_path, 'w') as f:
+                json.dump({'fingerprint': fingerprint, 'run_id': self.current_run_id}, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"UPLOAD_FINGERPRINT_SAVE_FAIL=1 error={e}")
+    
+    def _published_state_unchanged(self) -> bool:
+        """
+        True when output_dir holds exactly the package set of the last verified
+        upload and all of it is present on the VPS (per the Phase I listing).
+        """
+        package_files = self._list_output_packages(refresh=True)
+        if not package_files:
+            return False
+        fingerprint = self._publish_fingerprint(package_files)
+        if fingerprint != self._last_upload_fingerprint():
+            return False
+        remote_names = self.ssh_client.get_cached_file_set()
+        missing = [path.name for path in package_files if path.name not in remote_names]
+        if missing:
+            logger.info(f"PUBLISH_SKIP=0 reason=vps_missing count={len(missing)} example={missing[0]}")
+            return False
+        logger.info(f"PUBLISH_SKIP_UNCHANGED=1 fingerprint={fingerprint[:12]} files={len(package_files)}")
+        return True
+    
     def phase_v_sign_and_update(self) -> bool:
         """
         Phase V: Sign and Update WITH STAGING PUBLISH, ATOMIC PROMOTION,
@@ -573,7 +737,7 @@ class PackageBuilderOrchestrator:
         self.ssh_client.cleanup_old_staging(max_age_hours=24)
         # ------------------------------------------------------------
         
-        local_packages = list(self.output_dir.glob("*.pkg.tar.*"))
+        local_packages = self._list_output_packages()
         if not local_packages:
             logger.info("No packages to process")
             return True
@@ -585,6 +749,18 @@ class PackageBuilderOrchestrator:
         logger.info("Executing authoritative cleanup before database generation...")
         self.cleanup_manager.revalidate_output_dir_before_database(self.allowlist)
         
+        # Step 2b: No-op run. Nothing was built, the package set matches the last
+        # verified upload and every package/signature is still on the VPS, so
+        # database generation, signing and upload would republish the same state
+        if not self.built_packages and self._published_state_unchanged():
+            self.gate_state['database_success'] = True
+            self.gate_state['signature_success'] = True
+            self.gate_state['upload_success'] = True
+            self.gate_state['up3_success'] = True
+            self.gate_state['promotion_success'] = True
+            self._run_safe_operations_only()
+            return True
+        
         # Step 3: Generate repository database
         logger.info("Generating repository database...")
         db_success = self.database_manager.generate_full_database(
@@ -611,9 +787,13 @@ class PackageBuilderOrchestrator:
         
         # Step 5: STAGING PUBLISH
         # 5a: Collect all files to upload
-        files_to_upload = []
-        for pattern in ["*.pkg.tar.*", f"{self.repo_name}.*"]:
-            files_to_upload.extend(self.output_dir.glob(pattern))
+        # One fresh scan covers packages, signatures and the repo database files
+        # (cleanup, database generation and signing changed output_dir)
+        db_prefix = f"{self.repo_name}."
+        files_to_upload = [
+            path for path in self._list_output_files(refresh=True)
+            if '.pkg.tar.' in path.name or path.name.startswith(db_prefix)
+        ]
         
         if not files_to_upload:
             logger.error("No files to upload")
@@ -621,8 +801,22 @@ class PackageBuilderOrchestrator:
             self._run_safe_operations_only()
             return False
         
+        publish_fingerprint = self._publish_fingerprint(files_to_upload)
+        
         # 5b: Filter files to upload (only new/modified compared to mirror)
         files_to_upload = self._filter_upload_files(files_to_upload)
+        
+        # Nothing built and no package differs from the mirror: the database
+        # describes the same package set as the last verified upload, so the
+        # regenerated db/sig files carry no change worth an rsync round-trip
+        only_metadata = not any(
+            '.pkg.tar.' in f.name and not f.name.endswith('.sig') for f in files_to_upload
+        )
+        if (files_to_upload and only_metadata and not self.built_packages and
+                publish_fingerprint == self._last_upload_fingerprint()):
+            logger.info(f"UPLOAD_SKIP_UNCHANGED=1 fingerprint={publish_fingerprint[:12]} files={len(files_to_upload)}")
+            files_to_upload = []
+        
         if not files_to_upload:
             logger.info("No new or modified files to upload after diffing against mirror")
             self.gate_state['upload_success'] = True
@@ -631,6 +825,9 @@ class PackageBuilderOrchestrator:
             self._run_safe_operations_only()
             return True
         
+        # Basenames are needed by every verification step below; build them once
+        expected_basenames = frozenset(f.name for f in files_to_upload)
+        
         # 5c: Generate unique run ID and staging path
         self.current_run_id = self._generate_run_id()
         staging_path = f"{self.remote_dir}/.staging/{self.current_run_id}"
@@ -654,7 +851,6 @@ class PackageBuilderOrchestrator:
         # 5f: PRE‑PROMOTE VERIFICATION (P0)
         promotion_success = False
         if upload_success:
-            expected_basenames = {f.name for f in files_to_upload}
             verify_ok, missing_files = self.ssh_client.verify_upload(expected_basenames, remote_path=staging_path)
             
             if not verify_ok:
@@ -669,6 +865,7 @@ class PackageBuilderOrchestrator:
             # 5g: Promote staging to live (with remote lock)
             logger.info(f"Promoting staging -> live...")
             promotion_success = self.ssh_client.promote_staging(self.current_run_id)
+            self.cleanup_manager.invalidate_vps_inventory()
             self.gate_state['promotion_success'] = promotion_success
             
             if not promotion_success:
@@ -684,12 +881,13 @@ class PackageBuilderOrchestrator:
         up3_success = False
         if overall_upload_success:
             # Verify that all expected files are now present in live remote_dir
-            expected_basenames = {f.name for f in files_to_upload}
             verify_ok, missing_files = self.ssh_client.verify_upload(expected_basenames, self.remote_dir)
             up3_success = verify_ok
             self.gate_state['up3_success'] = up3_success
             
-            if not up3_success:
+            if up3_success:
+                self._record_upload_fingerprint(publish_fingerprint)
+            else:
                 logger.error("UP3 POST-UPLOAD VERIFICATION FAILED: missing files after promotion")
         else:
             logger.error("Overall upload/promotion failed; skipping UP3 verification")
@@ -708,7 +906,15 @@ class PackageBuilderOrchestrator:
         # 5k: EXTRAS CLASSIFICATION (P0) - Log detailed summary of remote files not expected
         # Get current remote files list after promotion (or after upload if promotion failed)
         remote_files_after = self.ssh_client.list_remote_files(self.remote_dir)
-        expected_basenames = {f.name for f in files_to_upload}
+        if overall_upload_success and up3_success and remote_files_after:
+            # Invalidate: rebuild inventory + remote version index from the post-upload listing
+            self._inventory = self.ssh_client.update_cached_inventory(remote_files_after)
+            self.vps_packages = self._inventory
+            self.version_tracker.build_remote_version_index(self._inventory)
+        elif not remote_files_after:
+            # The listing failed; never let an empty listing become next run's inventory
+            logger.warning("POST_UPLOAD_LISTING_EMPTY=1 invalidating inventory cache")
+            self.ssh_client.invalidate_inventory_cache()
         extra_files = [f for f in remote_files_after if f not in expected_basenames]
         
         if extra_files:
@@ -823,6 +1029,8 @@ class PackageBuilderOrchestrator:
         """Main execution flow WITH STAGING PUBLISH AND NON-BLOCKING HOKIBOT + SAFETY UPGRADES"""
         logger.info("ARCH LINUX PACKAGE BUILDER - MODULAR ORCHESTRATION WITH STAGING PUBLISH + SAFETY UPGRADES")
         
+        self.ensure_ready()
+        
         try:
             # Phase I: VPS Sync
             if not self.phase_i_vps_sync():
@@ -838,7 +1046,7 @@ class PackageBuilderOrchestrator:
             built_packages, skipped_packages = self.phase_iv_version_audit_and_build()
             
             # Phase V: Sign and Update (with staging publish)
-            if built_packages or list(self.output_dir.glob("*.pkg.tar.*")):
+            if built_packages or self._list_output_packages(refresh=True):
                 if not self.phase_v_sign_and_update():
                     logger.error("Phase V failed or gates blocked operations")
                     return 1
@@ -868,15 +1076,14 @@ class PackageBuilderOrchestrator:
             
             if self.built_packages:
                 logger.info("Newly built packages:")
-                for pkg in self.built_packages:
-                    logger.info(f"  - {pkg}")
+                for pkg_name, version in self.built_packages:
+                    logger.info(f"  - {pkg_name} ({version})")
             
             logger.info("Build completed successfully!")
             return 0
             
         except Exception as e:
             logger.error(f"Build failed: {e}")
-            import traceback
             traceback.print_exc()
             return 1
         finally:
@@ -885,10 +1092,22 @@ class PackageBuilderOrchestrator:
                 self.gpg_handler.cleanup()
             # Fail-safe staging cleanup
             self._cleanup_staging_dir()
+            # Tear down the shared SSH master connection
+            if hasattr(self, 'ssh_client'):
+                self.ssh_client.close_master()
+            # Persist version metadata and build fingerprints for the next run
+            if hasattr(self, 'package_builder'):
+                self.package_builder.version_manager.save_meta_cache()
+                self.package_builder.save_build_cache()
 
 
 def main():
     """Main entry point"""
+    # NEW: --status prints cache state only (no env validation, SSH, GPG or build setup)
+    if '--status' in sys.argv[1:]:
+        orchestrator = PackageBuilderOrchestrator(validate_env=False)
+        print(json.dumps(orchestrator.status(), indent=2))
+        return 0
     orchestrator = PackageBuilderOrchestrator()
     return orchestrator.run()
 
@@ -21,6 +21,31 @@ SSH_OPTIONS = [
     "-o", "BatchMode=yes"
 ]
 
+# SSH connection multiplexing: every ssh/rsync call to the VPS reuses one
+# authenticated master connection (written into the builder's ssh config).
+# %C is a hash of local host, remote host, port and user (short socket path).
+SSH_CONTROL_PATH = "/tmp/ssh-cm-%C"
+SSH_CONTROL_PERSIST = 600  # seconds the idle master stays up
+
+# Parallel rsync processes for the staging upload (files are split into
+# size-balanced shards; 1 = single rsync)
+RSYNC_UPLOAD_STREAMS = 4
+
+# Parallel rsync processes for the mirror download of missing VPS packages
+# (files are split round-robin; 1 = single rsync)
+RSYNC_MIRROR_STREAMS = 4
+
+# Concurrent PKGBUILD fetches (AUR clones) when building the allowlist
+MANIFEST_FETCH_WORKERS = 8
+
+# Persist the VPS package listing in .buildtracking/inventory.json (BUILD_TRACKING_DIR,
+# kept across CI runs by the built-packages actions/cache step) and reuse
+# it while the remote directory mtime is unchanged (False = always list)
+REMOTE_INVENTORY_CACHE = True
+# Re-list anyway once the persisted listing is older than this many seconds,
+# as a bound on same-second mtime races (0 = no age limit)
+REMOTE_INVENTORY_MAX_AGE = 7 * 24 * 3600
+
 # Build timeouts (seconds)
 MAKEPKG_TIMEOUT = {
     "default": 7200,        # 1 hour for normal packages
@@ -46,6 +71,7 @@ REQUIRED_BUILD_TOOLS = [
 # Temporary directories (runtime-required, /tmp is POSIX invariant)
 MIRROR_TEMP_DIR = "/tmp/repo_mirror"
 SYNC_CLONE_DIR = "/tmp/repo-builder-gitclone"  # FIX: generic, no repo name
+SRCDEST_DIR = "/tmp/repo-builder-srcdest"  # makepkg SRCDEST root, one subdir per package (sources prefetched outside the build lock)
 
 # AUR configuration
 AUR_URLS = [
@@ -53,6 +79,18 @@ AUR_URLS = [
     "git://aur.archlinux.org/{pkg_name}.git"
 ]
 
+# AUR RPC endpoint; one batched info request answers the version of every
+# AUR package, so up-to-date non-VCS packages are skipped without a clone
+AUR_RPC_URL = "https://aur.archlinux.org/rpc/"
+AUR_RPC_PRECHECK = True
+
+# Fetch AUR build trees as cgit snapshot tarballs (one HTTPS GET, no git
+# objects or history); the git clone of AUR_URLS is the fallback
+AUR_SNAPSHOT_URL = "https://aur.archlinux.org/cgit/aur.git/snapshot/{pkg_name}.tar.gz"
+AUR_SNAPSHOT_FETCH = True
+# Concurrent RPC info requests when the AUR list spans several batches
+AUR_RPC_WORKERS = 4
+
 # Build directory names
 AUR_BUILD_DIR = "build_aur"
 
@@ -80,6 +118,40 @@ SIGN_PACKAGES = True  # Default toggle for individual package signing
 # Default behavior: install runtime depends during build in CI
 INSTALL_RUNTIME_DEPS_IN_CI = True
 
+# Dependency-aware rebuilds: when a local package is rebuilt in this run,
+# also rebuild local packages that depend on it (depends/makedepends/checkdepends),
+# even if their own version did not change. Local packages are always
+# processed in dependency order.
+REBUILD_LOCAL_DEPENDENTS = True
+
+# Number of packages audited concurrently (clone, .SRCINFO, version and
+# VCS upstream checks). Local packages are audited in dependency waves so a
+# package never runs before its local dependencies. Dependency installation
+# and makepkg are always serialized because they share the host pacman
+# state. 1 = fully serial, 0 = min(os.cpu_count(), 4).
+BUILD_AUDIT_WORKERS = 4
+
+# Reuse packages already in output_dir when a local package's sources are
+# byte-identical to the ones they were built from (fingerprint stored in
+# .buildtracking/.build-cache.json, which CI caches). VCS packages and forced
+# rebuilds always build.
+BUILD_FINGERPRINT_CACHE = True
+
+# Parallel make jobs passed to makepkg as MAKEFLAGS=-jN (Arch's makepkg.conf
+# leaves MAKEFLAGS unset, so compiles would use a single core). Builds stay
+# serialized; this parallelizes inside each build. 0 = os.cpu_count().
+# Lower it via the MAKEPKG_JOBS env var for memory-heavy packages.
+MAKEPKG_JOBS = int(os.getenv("MAKEPKG_JOBS", "0"))
+
+# Keep only this many trailing lines of makepkg stdout/stderr in memory
+# (output is streamed); failure diagnostics print the last 200 lines.
+MAKEPKG_OUTPUT_TAIL_LINES = 4096
+
+# Skip the AUR builder's initial pacman -Sy (and use -S instead of -Sy for
+# dependency installs) when the sync databases are younger than this many
+# seconds.
+PACMAN_SYNC_TTL = 900
+
 # Conflict resolution allowlist
 # Format: {"package-being-installed": ["conflicting-package-to-remove"]}
 # When installing the key package, if conflict suggests removing the value package,
@@ -2,14 +2,19 @@
 Artifact Manager Module - Handles package file management and cleanup
 """
 
+import os
 import shutil
 import tarfile
 import logging
 from pathlib import Path
 from datetime import datetime
+from typing import Dict, List
 
 logger = logging.getLogger(__name__)
 
+# Package archive suffixes makepkg produces (signatures end in .sig and never match)
+PKG_SUFFIXES = ('.pkg.tar.zst', '.pkg.tar.xz', '.pkg.tar.gz', '.pkg.tar')
+
 
 class ArtifactManager:
     """Handles package file management and workspace cleanup"""
@@ -36,22 +41,109 @@ class ArtifactManager:
             except Exception as e:
                 logger.warning(f"  Could not clean pkg/: {e}")
         
-        # Clean any leftover .tar.* files
-        for leftover in pkg_dir.glob("*.pkg.tar.*"):
-            try:
-                leftover.unlink()
-                logger.info(f"  Removed leftover package: {leftover.name}")
-            except Exception as e:
-                logger.warning(f"  Could not remove {leftover}: {e}")
+        # Clean any leftover .tar.* files (one scandir, no pathlib per entry)
+        with os.scandir(pkg_dir) as entries:
+            for entry in entries:
+                if '.pkg.tar.' not in entry.name:
+                    continue
+                try:
+                    os.unlink(entry.path)
+                    logger.info(f"  Removed leftover package: {entry.name}")
+                except Exception as e:
+                    logger.warning(f"  Could not remove {entry.path}: {e}")
 
-    def create_artifact_archive(self, built_packages_path: Path, log_path: Path) -> Path:
+    @staticmethod
+    def package_entries(directory: Path) -> List[os.DirEntry]:
+        """
+        List package files in a directory with one scandir (no pathlib/fnmatch per entry).
+        
+        Args:
+            directory: Directory to scan
+            
+        Returns:
+            DirEntry objects whose names end in one of PKG_SUFFIXES
+        """
+        try:
+            with os.scandir(directory) as entries:
+                return [entry for entry in entries if entry.name.endswith(PKG_SUFFIXES)]
+        except FileNotFoundError:
+            return []
+    
+    @staticmethod
+    def unsigned_package_entries(directory: Path) -> List[os.DirEntry]:
+        """
+        List package files that have no detached .sig next to them.
+        
+        One scandir pass: package names and signature bases are collected
+        together, so no per-package stat of the .sig path is needed.
+        
+        Args:
+            directory: Directory to scan
+            
+        Returns:
+            DirEntry objects of package files without a signature
         """
-        Create a .tar.gz archive of built packages and logs to avoid colon (:) characters
+        packages = []
+        signed = set()
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.name.endswith('.sig'):
+                        signed.add(entry.name[:-4])
+                    elif entry.name.endswith(PKG_SUFFIXES):
+                        packages.append(entry)
+        except FileNotFoundError:
+            return []
+        return [entry for entry in packages if entry.name not in signed]
+    
+    @staticmethod
+    def snapshot_packages(directory: Path) -> Dict[str, int]:
+        """
+        Snapshot package files (signatures excluded) in a directory.
+        
+        Args:
+            directory: Directory to scan (e.g. the makepkg PKGDEST)
+            
+        Returns:
+            Dict mapping package filename to its mtime in nanoseconds
+        """
+        snapshot = {}
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if '.pkg.tar.' in entry.name and not entry.name.endswith('.sig') and entry.is_file():
+                        snapshot[entry.name] = entry.stat().st_mtime_ns
+        except FileNotFoundError:
+            pass
+        return snapshot
+    
+    @staticmethod
+    def packages_changed_since(directory: Path, snapshot: Dict[str, int]) -> List[str]:
+        """
+        List package files that are new or rewritten since a snapshot.
+        
+        Args:
+            directory: Directory that was snapshotted
+            snapshot: Result of snapshot_packages() taken before the build
+            
+        Returns:
+            Sorted list of package filenames written by the build
+        """
+        current = ArtifactManager.snapshot_packages(directory)
+        return sorted(name for name, mtime in current.items() if snapshot.get(name) != mtime)
+    
+    def create_artifact_archive(self, built_packages_path: Path, log_path: Path, compression: str = "store") -> Path:
+        """
+        Create a tar archive of built packages and logs to avoid colon (:) characters
         in filenames during GitHub upload.
         
+        Packages are already zstd/xz compressed, so the default is a plain (stored)
+        .tar; "gz" keeps the old .tar.gz output.
+        
         Args:
             built_packages_path: Path to directory containing built packages
             log_path: Path to log file
+            compression: "store" (uncompressed .tar) or "gz" (.tar.gz)
             
         Returns:
             Path to created archive file
@@ -60,62 +152,60 @@ class ArtifactManager:
         
         # Generate timestamp for archive name
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        archive_name = f"artifacts_{timestamp}.tar.gz"
+        write_mode, extension = ("w:gz", "tar.gz") if compression == "gz" else ("w", "tar")
+        archive_name = f"artifacts_{timestamp}.{extension}"
         archive_path = built_packages_path.parent / archive_name
+        counts = {"packages": 0, "logs": 0, "databases": 0, "signatures": 0}
         
         try:
-            with tarfile.open(archive_path, "w:gz") as tar:
+            with tarfile.open(archive_path, write_mode) as tar:
                 # Add all built package files
                 for pkg_file in built_packages_path.glob("*.pkg.tar.*"):
                     # Sanitize filename for tar (remove colon characters)
                     sanitized_name = pkg_file.name.replace(":", "_")
                     arcname = f"packages/{sanitized_name}"
                     tar.add(pkg_file, arcname=arcname)
-                    logger.debug(f"Added to archive: {pkg_file.name} as {sanitized_name}")
+                    counts["packages"] += 1
+                    logger.debug("Added to archive: %s as %s", pkg_file.name, sanitized_name)
                 
                 # Add log file if it exists
                 if log_path.exists():
                     arcname = f"logs/{log_path.name}"
                     tar.add(log_path, arcname=arcname)
-                    logger.debug(f"Added to archive: {log_path.name}")
+                    counts["logs"] += 1
+                    logger.debug("Added to archive: %s", log_path.name)
                 
                 # Add repository database files if they exist
                 for db_file in built_packages_path.glob("*.db*"):
                     arcname = f"databases/{db_file.name}"
                     tar.add(db_file, arcname=arcname)
-                    logger.debug(f"Added to archive: {db_file.name}")
+                    counts["databases"] += 1
+                    logger.debug("Added to archive: %s", db_file.name)
                 
                 for files_db in built_packages_path.glob("*.files*"):
                     arcname = f"databases/{files_db.name}"
                     tar.add(files_db, arcname=arcname)
-                    logger.debug(f"Added to archive: {files_db.name}")
+                    counts["databases"] += 1
+                    logger.debug("Added to archive: %s", files_db.name)
                 
                 # Add GPG signatures if they exist
                 for sig_file in built_packages_path.glob("*.sig"):
                     arcname = f"signatures/{sig_file.name}"
                     tar.add(sig_file, arcname=arcname)
-                    logger.debug(f"Added to archive: {sig_file.name}")
+                    counts["signatures"] += 1
+                    logger.debug("Added to archive: %s", sig_file.name)
             
             # Verify archive was created
             if archive_path.exists():
                 size_mb = archive_path.stat().st_size / (1024 * 1024)
                 logger.info(f"✅ Created artifact archive: {archive_path.name} ({size_mb:.2f} MB)")
                 
-                # List contents for verification
-                with tarfile.open(archive_path, "r:gz") as tar:
-                    members = tar.getmembers()
-                    logger.info(f"Archive contains {len(members)} files")
-                    
-                    # Group files by type for summary
-                    packages = [m for m in members if m.name.startswith("packages/")]
-                    logs = [m for m in members if m.name.startswith("logs/")]
-                    databases = [m for m in members if m.name.startswith("databases/")]
-                    signatures = [m for m in members if m.name.startswith("signatures/")]
-                    
-                    logger.info(f"  Packages: {len(packages)} files")
-                    logger.info(f"  Logs: {len(logs)} files")
-                    logger.info(f"  Databases: {len(databases)} files")
-                    logger.info(f"  Signatures: {len(signatures)} files")
+                # Summarize from the counts gathered while writing (no re-read)
+                logger.info(f"Archive contains {sum(counts.values())} files (ARCHIVE_COMPRESSION={compression})")
+                logger.info(f"  Packages: {counts['packages']} files")
+                logger.info(f"  Logs: {counts['logs']} files")
+                logger.info(f"  Databases: {counts['databases']} files")
+                logger.info(f"  Signatures: {counts['signatures']} files")
                 
                 # Clean up original files with colons after archiving
                 self._cleanup_colon_files(built_packages_path)
@@ -137,14 +227,16 @@ class ArtifactManager:
         logger.info("🧹 Cleaning up files with colon characters...")
         
         removed_count = 0
-        for file_path in directory.glob("*.pkg.tar.*"):
-            if ":" in file_path.name:
+        for entry in self.package_entries(directory):
+            if ":" in entry.name:
                 try:
-                    file_path.unlink(missing_ok=True)
+                    os.unlink(entry.path)
                     removed_count += 1
-                    logger.debug(f"Removed file with colon: {file_path.name}")
+                    logger.debug(f"Removed file with colon: {entry.name}")
+                except FileNotFoundError:
+                    pass
                 except Exception as e:
-                    logger.warning(f"Could not remove {file_path}: {e}")
+                    logger.warning(f"Could not remove {entry.path}: {e}")
         
         if removed_count > 0:
             logger.info(f"✅ Removed {removed_count} files with colon characters")
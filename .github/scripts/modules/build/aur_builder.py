@@ -2,14 +2,29 @@
 AUR Builder Module - Handles AUR package building logic
 """
 
+import http.client
+import json
 import logging
 import os
+import threading
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 
 import config
 from modules.common.shell_executor import ShellExecutor
-from modules.common.dependency_installer import DependencyInstaller
+from modules.common.dependency_installer import DependencyInstaller, pacman_sync_age
+from modules.build.artifact_manager import ArtifactManager
+from modules.build.local_builder import makepkg_jobs_env
+
+# Optional faster JSON parser for bulk RPC payloads; stdlib json otherwise.
+# Both accept the raw response bytes.
+try:
+    import orjson as _json
+except ImportError:
+    _json = json
 
 logger = logging.getLogger(__name__)
 
@@ -20,8 +35,64 @@ class AURBuilder:
     def __init__(self, debug_mode: bool = False):
         self.debug_mode = debug_mode
         self._pacman_initialized = False
+        self._pacman_keydb_updated = False
         self.shell_executor = ShellExecutor(debug_mode=debug_mode)
         self.dependency_installer = DependencyInstaller(self.shell_executor, debug_mode)
+        # NEW: RPC results memoized per run; repeat lookups never hit the network
+        self._rpc_info_cache: Dict[str, Dict[str, Any]] = {}
+        # NEW: one keep-alive HTTPS connection per worker thread (no TLS handshake per request)
+        self._http_local = threading.local()
+    
+    def _rpc_get(self, url: str, timeout: int = 30) -> Dict[str, Any]:
+        """
+        GET a JSON document over this thread's persistent HTTPS connection.
+        
+        A stale keep-alive connection is reopened once before giving up.
+        Any non-200 answer (e.g. a 3xx redirect) closes the connection and
+        is retried through urlopen, which follows redirects.
+        
+        Args:
+            url: Full request URL
+            timeout: Socket timeout in seconds
+            
+        Returns:
+            Decoded JSON payload
+        """
+        parsed = urllib.parse.urlsplit(url)
+        path = parsed.path or '/'
+        if parsed.query:
+            path = f"{path}?{parsed.query}"
+        
+        for attempt in range(2):
+            conn = getattr(self._http_local, 'conn', None)
+            if conn is None or getattr(self._http_local, 'netloc', None) != parsed.netloc:
+                if conn is not None:
+                    conn.close()
+                conn_cls = http.client.HTTPSConnection if parsed.scheme == 'https' else http.client.HTTPConnection
+                conn = conn_cls(parsed.netloc, timeout=timeout)
+                self._http_local.conn = conn
+                self._http_local.netloc = parsed.netloc
+            try:
+                conn.request('GET', path, headers={'Accept': 'application/json'})
+                response = conn.getresponse()
+                body = response.read()
+            except (http.client.HTTPException, ConnectionError, OSError):
+                conn.close()
+                self._http_local.conn = None
+                if attempt:
+                    raise
+                continue
+            
+            if response.status == 200:
+                return _json.loads(body)
+            
+            logger.info(f"AUR_RPC_HTTP_FALLBACK status={response.status}")
+            conn.close()
+            self._http_local.conn = None
+            break
+        
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            return _json.loads(response.read())
     
     def _initialize_pacman_database(self) -> bool:
         """
@@ -34,10 +105,19 @@ class AURBuilder:
         if self._pacman_initialized:
             return True
         
+        # Skip the sync if the sync databases were refreshed recently
+        # (e.g. by the orchestrator's post-repo-enable pacman -Sy)
+        ttl = getattr(config, 'PACMAN_SYNC_TTL', 900)
+        age = self._pacman_sync_age()
+        if age is not None and age < ttl:
+            logger.info(f"PACMAN_SYNC_SKIP=1 reason=fresh age={int(age)}s ttl={ttl}s")
+            self._pacman_initialized = True
+            return True
+        
         logger.info("🔄 Initializing pacman database (REQUIRED PRECONDITION)...")
         
         # REQUIRED: Run pacman -Sy to initialize/update package database
-        cmd = "sudo LC_ALL=C pacman -Sy --noconfirm"
+        cmd = ['sudo', 'LC_ALL=C', 'pacman', '-Sy', '--noconfirm']
         logger.info("SHELL_EXECUTOR_USED=1")
         result = self.shell_executor.run_command(cmd, log_cmd=True, check=False, timeout=300)
         
@@ -51,6 +131,88 @@ class AURBuilder:
             self._pacman_initialized = True
             return True
     
+    def _refresh_pacman(self, force: bool = False) -> bool:
+        """
+        Single entry point for the pacman keyring + sync database refresh.
+        
+        Runs `pacman-key --updatedb` and the database sync at most once per
+        session instead of on every dependency installation.
+        
+        Args:
+            force: Re-run both steps even if they already ran this session
+            
+        Returns:
+            True if the sync database step succeeded (or was skipped as fresh)
+        """
+        if force:
+            self._pacman_keydb_updated = False
+            self._pacman_initialized = False
+        
+        if not self._pacman_keydb_updated:
+            logger.info("🔄 Updating pacman-key database...")
+            cmd = ['sudo', 'pacman-key', '--updatedb']
+            logger.info("SHELL_EXECUTOR_USED=1")
+            result = self.shell_executor.run_command(cmd, log_cmd=True, check=False, timeout=300)
+            if result.returncode != 0:
+                logger.warning(f"⚠️ pacman-key --updatedb warning: {result.stderr[:200]}")
+            self._pacman_keydb_updated = True
+        else:
+            logger.info("PACMAN_KEYDB_SKIP=1 reason=already_updated")
+        
+        if not self._initialize_pacman_database():
+            logger.error("❌ Failed to initialize pacman database")
+            # Try to continue anyway, as yay might work
+            return False
+        return True
+    
+    def _pacman_sync_age(self) -> Optional[float]:
+        """
+        Seconds since the newest pacman sync database was written, or None if
+        there are no sync databases yet (see dependency_installer.pacman_sync_age).
+        """
+        return pacman_sync_age()
+    
+    def fetch_rpc_info(self, pkg_names: List[str], batch_size: int = 200) -> Dict[str, Dict[str, Any]]:
+        """
+        Look up AUR metadata for many packages with batched RPC info requests.
+        
+        Batches run concurrently (AUR_RPC_WORKERS) and results are memoized,
+        so only names not seen earlier in the run are requested.
+        
+        Args:
+            pkg_names: AUR package names
+            batch_size: Names per request (keeps the query string under the AUR URL limit)
+            
+        Returns:
+            Dict mapping package name -> RPC result (Name, PackageBase, Version, ...).
+            Packages not on the AUR, or in a failed batch, are absent.
+        """
+        rpc_url = getattr(config, 'AUR_RPC_URL', 'https://aur.archlinux.org/rpc/')
+        missing = [name for name in dict.fromkeys(pkg_names) if name not in self._rpc_info_cache]
+        batches = [missing[start:start + batch_size] for start in range(0, len(missing), batch_size)]
+        
+        def fetch_batch(batch: List[str]) -> List[Dict[str, Any]]:
+            query = urllib.parse.urlencode([('v', '5'), ('type', 'info')] + [('arg[]', name) for name in batch])
+            try:
+                payload = self._rpc_get(f"{rpc_url}?{query}", timeout=30)
+            except Exception as e:
+                logger.warning(f"AUR_RPC_FAIL first={batch[0]} count={len(batch)} error={e}")
+                return []
+            return payload.get('results') or []
+        
+        if batches:
+            workers = max(1, min(int(getattr(config, 'AUR_RPC_WORKERS', 4)), len(batches)))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                for items in executor.map(fetch_batch, batches):
+                    for item in items:
+                        name = item.get('Name')
+                        if name:
+                            self._rpc_info_cache[name] = item
+        
+        results = {name: self._rpc_info_cache[name] for name in pkg_names if name in self._rpc_info_cache}
+        logger.info(f"AUR_RPC_INFO requested={len(pkg_names)} fetched={len(missing)} batches={len(batches)} found={len(results)}")
+        return results
+    
     def install_dependencies(self,
                             makedepends: List[str],
                             checkdepends: List[str],
@@ -85,18 +247,8 @@ class AURBuilder:
         if runtime_depends:
             logger.info(f"Runtime depends: {runtime_depends} (will be installed)")
         
-        # REQUIRED PRECONDITION: Initialize pacman database FIRST
-        if not self._initialize_pacman_database():
-            logger.error("❌ Failed to initialize pacman database")
-            # Try to continue anyway, as yay might work
-        
-        # CRITICAL FIX: Update pacman-key database first
-        print("🔄 Updating pacman-key database...")
-        cmd = "sudo pacman-key --updatedb"
-        logger.info("SHELL_EXECUTOR_USED=1")
-        result = self.shell_executor.run_command(cmd, log_cmd=True, check=False, timeout=300)
-        if result.returncode != 0:
-            logger.warning(f"⚠️ pacman-key --updatedb warning: {result.stderr[:200]}")
+        # REQUIRED PRECONDITION: keyring + sync databases, refreshed once per session
+        self._refresh_pacman()
         
         # Install build dependencies with AUR fallback enabled
         return self.dependency_installer.install_packages(
@@ -107,7 +259,8 @@ class AURBuilder:
     
     def build_aur_package(self, pkg_name: str, target_dir: Path, packager_id: str,
                           build_flags: str = "-d --noconfirm --clean --nocheck",
-                          timeout: int = 3600) -> List[str]:
+                          timeout: int = 3600, pkgdest: Optional[Path] = None,
+                          srcdest: Optional[Path] = None) -> List[str]:
         """
         Build AUR package including dependency installation.
         Per-package dependency session is managed by the caller (PackageBuilder).
@@ -118,6 +271,8 @@ class AURBuilder:
             packager_id: Packager identity string
             build_flags: makepkg flags
             timeout: Build timeout in seconds
+            pkgdest: Optional PKGDEST; packages are written there directly
+            srcdest: Optional SRCDEST; sources are read from / cached there
             
         Returns:
             List of built package filenames
@@ -137,6 +292,10 @@ class AURBuilder:
         else:
             logger.info(f"📦 No dependencies found for {pkg_name}")
         
+        download_env = {"PACKAGER": packager_id}
+        if srcdest:
+            download_env["SRCDEST"] = str(srcdest)
+        
         # Download sources with retry for transient errors
         logger.info("   Downloading sources (with retry)...")
         logger.info("SHELL_EXECUTOR_USED=1")
@@ -148,7 +307,7 @@ class AURBuilder:
                 capture=True,
                 check=False,
                 timeout=600,
-                extra_env={"PACKAGER": packager_id},
+                extra_env=download_env,
                 max_retries=5,
                 initial_delay=2.0,
                 user="builder"  # Run as builder user
@@ -167,6 +326,14 @@ class AURBuilder:
         logger.info("SHELL_EXECUTOR_USED=1")
         logger.info("MAKEPKG_SYNCDEPS_DISABLED=1")
         cmd = f"makepkg {build_flags}"
+        build_env = dict(download_env)
+        build_env.update(makepkg_jobs_env())
+        snapshot = {}
+        if pkgdest:
+            cmd += " -f"
+            build_env["PKGDEST"] = str(pkgdest)
+            snapshot = ArtifactManager.snapshot_packages(pkgdest)
+            logger.info(f"MAKEPKG_PKGDEST={pkgdest}")
         
         if self.debug_mode:
             print(f"🔧 [DEBUG] Running makepkg in {target_dir}: {cmd}", flush=True)
@@ -180,39 +347,24 @@ class AURBuilder:
                 subprocess.run(['chmod', '755', str(target_dir)], check=False)
                 subprocess.run(['chown', '-R', 'builder:builder', str(target_dir)], check=False)
             
+            def run_build():
+                return self.shell_executor.run_command(
+                    cmd,
+                    cwd=target_dir,
+                    capture=True,
+                    check=False,
+                    timeout=timeout,
+                    extra_env=build_env,
+                    log_cmd=self.debug_mode,
+                    tail_lines=getattr(config, 'MAKEPKG_OUTPUT_TAIL_LINES', 4096),
+                    user="builder"  # Run as builder user
+                )
+            
             # First build attempt
-            build_result = self.shell_executor.run_command(
-                cmd,
-                cwd=target_dir,
-                capture=True,
-                check=False,
-                timeout=timeout,
-                extra_env={"PACKAGER": packager_id},
-                log_cmd=self.debug_mode,
-                user="builder"  # Run as builder user
-            )
+            build_result = run_build()
             
-            # Retry logic for missing yasm
-            if build_result.returncode != 0:
-                error_output = (build_result.stderr or "") + "\n" + (build_result.stdout or "")
-                if "yasm: No such file or directory" in error_output:
-                    logger.info(f"BUILD_TOOL_AUTOINSTALL=1 tool=yasm reason=missing_binary")
-                    # Install yasm via dependency installer
-                    if self.dependency_installer.install_packages(["yasm"], allow_aur=True, mode="build"):
-                        logger.info("Retrying makepkg after installing yasm...")
-                        # Retry build ONCE
-                        build_result = self.shell_executor.run_command(
-                            cmd,
-                            cwd=target_dir,
-                            capture=True,
-                            check=False,
-                            timeout=timeout,
-                            extra_env={"PACKAGER": packager_id},
-                            log_cmd=self.debug_mode,
-                            user="builder"
-                        )
-                    else:
-                        logger.error("Failed to install yasm, cannot retry build")
+            # Shared fallback: yasm / missing dependencies, each retried ONCE
+            build_result = self.dependency_installer.retry_build_with_dependency_fixes(build_result, run_build, target_dir)
             
             # Log diagnostic information on failure
             if build_result.returncode != 0:
@@ -274,12 +426,10 @@ class AURBuilder:
                 print(f"🔧 [DEBUG] MAKEPKG EXIT CODE: {build_result.returncode}", flush=True)
             
             # Collect built packages (skip .sig files)
-            built_files = []
-            for pkg_file in target_dir.glob("*.pkg.tar.*"):
-                # Skip signature files
-                if pkg_file.name.endswith(".sig"):
-                    continue
-                built_files.append(pkg_file.name)
+            if pkgdest:
+                built_files = ArtifactManager.packages_changed_since(pkgdest, snapshot)
+            else:
+                built_files = sorted(ArtifactManager.snapshot_packages(target_dir))
             
             if built_files:
                 logger.info(f"✅ Successfully built {pkg_name}: {len(built_files)} package(s)")
@@ -2,8 +2,10 @@
 Build Tracker Module - Tracks build progress and statistics
 """
 
+import threading
 import time
-from typing import Dict, List, Optional
+from collections import Counter
+from typing import Dict, List, Optional, Set, Tuple
 import logging
 
 logger = logging.getLogger(__name__)
@@ -15,17 +17,16 @@ class BuildTracker:
     def __init__(self):
         # State
         self.hokibot_data = []
-        self.rebuilt_local_packages = []
-        self.skipped_packages = []
-        self.built_packages = []
+        self.rebuilt_local_packages: Set[str] = set()
+        # (pkg_name, version) records, formatted only when reported
+        self.skipped_packages: List[Tuple[str, str]] = []
+        self.built_packages: List[Tuple[str, str]] = []
         
-        # Statistics
-        self.stats = {
-            "aur_success": 0,
-            "local_success": 0,
-            "aur_failed": 0,
-            "local_failed": 0,
-        }
+        # Statistics (Counter: keys default to 0, so batch updates need no setup).
+        # Audits run in worker threads; the lock keeps multi-key updates and
+        # the summary snapshot consistent.
+        self.stats: Counter = Counter(aur_success=0, local_success=0, aur_failed=0, local_failed=0)
+        self._stats_lock = threading.Lock()
         
         # Start time
         self.start_time = time.time()
@@ -58,22 +59,40 @@ class BuildTracker:
     
     def record_built_package(self, pkg_name: str, version: str, is_aur: bool = False):
         """Record a successfully built package"""
-        self.built_packages.append(f"{pkg_name} ({version})")
-        if is_aur:
-            self.stats["aur_success"] += 1
-        else:
-            self.stats["local_success"] += 1
+        with self._stats_lock:
+            self.built_packages.append((pkg_name, version))
+            self.stats["aur_success" if is_aur else "local_success"] += 1
+    
+    def record_results_batch(self,
+                             built: List[Tuple[str, str]],
+                             skipped: List[Tuple[str, str]],
+                             failed: List[str],
+                             is_aur: bool = False):
+        """
+        Record one phase's results in a single update instead of per-package calls.
+        
+        Args:
+            built: (pkg_name, version) tuples of built packages
+            skipped: (pkg_name, version) tuples of up-to-date packages
+            failed: Names of packages that failed
+            is_aur: Whether the batch holds AUR packages
+        """
+        kind = "aur" if is_aur else "local"
+        with self._stats_lock:
+            self.built_packages.extend(built)
+            self.skipped_packages.extend(skipped)
+            self.stats.update({f"{kind}_success": len(built), f"{kind}_failed": len(failed)})
+        logger.info(f"BUILD_TRACKER_BATCH kind={kind} built={len(built)} skipped={len(skipped)} failed={len(failed)}")
     
     def record_failed_package(self, is_aur: bool = False):
         """Record a failed package build"""
-        if is_aur:
-            self.stats["aur_failed"] += 1
-        else:
-            self.stats["local_failed"] += 1
+        with self._stats_lock:
+            self.stats["aur_failed" if is_aur else "local_failed"] += 1
     
     def record_skipped_package(self, pkg_name: str, version: str):
         """Record a skipped package (already up-to-date)"""
-        self.skipped_packages.append(f"{pkg_name} ({version})")
+        with self._stats_lock:
+            self.skipped_packages.append((pkg_name, version))
     
     def get_elapsed_time(self) -> float:
         """Get elapsed time since tracking started"""
@@ -81,10 +100,13 @@ class BuildTracker:
     
     def get_summary(self) -> Dict:
         """Get build summary statistics"""
+        with self._stats_lock:
+            stats = dict(self.stats)
+            skipped = len(self.skipped_packages)
         return {
             "elapsed": self.get_elapsed_time(),
-            **self.stats,
-            "total_built": self.stats["aur_success"] + self.stats["local_success"],
-            "skipped": len(self.skipped_packages),
+            **stats,
+            "total_built": stats["aur_success"] + stats["local_success"],
+            "skipped": skipped,
             "hokibot_entries": len(self.hokibot_data)
         }
\ No newline at end of file
@@ -5,7 +5,8 @@ Local Builder Module - Handles local package building logic
 import subprocess
 import logging
 import os
-from typing import List
+from pathlib import Path
+from typing import Dict, List, Optional
 
 import config
 from modules.common.shell_executor import ShellExecutor
@@ -14,6 +15,19 @@ from modules.common.dependency_installer import DependencyInstaller
 logger = logging.getLogger(__name__)
 
 
+def makepkg_jobs_env() -> Dict[str, str]:
+    """
+    MAKEFLAGS for makepkg builds so compiles use every core.
+    
+    Returns:
+        {"MAKEFLAGS": "-jN"}, or {} when MAKEFLAGS is already set in the environment
+    """
+    if os.environ.get('MAKEFLAGS'):
+        return {}
+    jobs = getattr(config, 'MAKEPKG_JOBS', 0) or os.cpu_count() or 1
+    return {"MAKEFLAGS": f"-j{jobs}"}
+
+
 class LocalBuilder:
     """Handles local package building operations"""
     
@@ -64,9 +78,26 @@ class LocalBuilder:
             mode="build"
         )
     
-    def run_makepkg(self, pkg_dir: str, packager_id: str, flags: str = "-d --noconfirm --clean", timeout: int = 3600) -> subprocess.CompletedProcess:
-        """Run makepkg command with specified flags, with retry for missing yasm"""
+    def run_makepkg(self, pkg_dir: str, packager_id: str, flags: str = "-d --noconfirm --clean", timeout: int = 3600,
+                    pkgdest: Optional[str] = None, srcdest: Optional[str] = None) -> subprocess.CompletedProcess:
+        """
+        Run makepkg command with specified flags, with retry for missing yasm.
+        
+        When pkgdest is given, makepkg writes packages straight into it (PKGDEST)
+        and -f is added so a rebuild may overwrite an existing same-version file.
+        When srcdest is given, sources are read from / cached in it (SRCDEST).
+        The build step also gets MAKEFLAGS=-jN (see makepkg_jobs_env).
+        """
         cmd = f"makepkg {flags}"
+        download_env = {"PACKAGER": packager_id}
+        if srcdest:
+            download_env["SRCDEST"] = str(srcdest)
+        build_env = dict(download_env)
+        build_env.update(makepkg_jobs_env())
+        if pkgdest:
+            cmd += " -f"
+            build_env["PKGDEST"] = str(pkgdest)
+            logger.info(f"MAKEPKG_PKGDEST={pkgdest}")
         
         logger.info("MAKEPKG_INSTALL_DISABLED=1")
         logger.info("SHELL_EXECUTOR_USED=1")
@@ -90,7 +121,7 @@ class LocalBuilder:
                 capture=True,
                 check=False,
                 timeout=600,
-                extra_env={"PACKAGER": packager_id},
+                extra_env=download_env,
                 max_retries=5,
                 initial_delay=2.0,
                 user="builder"  # Run as builder user
@@ -111,26 +142,17 @@ class LocalBuilder:
                     capture=True,
                     check=False,
                     timeout=timeout,
-                    extra_env={"PACKAGER": packager_id},
+                    extra_env=build_env,
                     log_cmd=self.debug_mode,
+                    tail_lines=getattr(config, 'MAKEPKG_OUTPUT_TAIL_LINES', 4096),
                     user="builder"
                 )
             
             # First attempt
             result = run_build()
             
-            # Retry logic for missing yasm
-            if result.returncode != 0:
-                error_output = (result.stderr or "") + "\n" + (result.stdout or "")
-                if "yasm: No such file or directory" in error_output:
-                    logger.info(f"BUILD_TOOL_AUTOINSTALL=1 tool=yasm reason=missing_binary")
-                    # Install yasm via dependency installer
-                    if self.dependency_installer.install_packages(["yasm"], allow_aur=True, mode="build"):
-                        logger.info("Retrying makepkg after installing yasm...")
-                        # Retry build ONCE
-                        result = run_build()
-                    else:
-                        logger.error("Failed to install yasm, cannot retry build")
+            # Shared fallback: yasm / missing dependencies, each retried ONCE
+            result = self.dependency_installer.retry_build_with_dependency_fixes(result, run_build, Path(pkg_dir))
             
             # Log diagnostic information on failure
             if result.returncode != 0:
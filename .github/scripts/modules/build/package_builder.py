@@ -1,11 +1,22 @@
 import os
+import json
+import hashlib
+import queue
 import subprocess
 import shutil
+import tarfile
 import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional, Tuple, List, Dict, Any
+from typing import Optional, Tuple, List, Dict, Any, Set
 import logging
 import re
+import urllib.parse
+import urllib.request
+
+import config  # for REBUILD_LOCAL_DEPENDENTS, BUILD_AUDIT_WORKERS, SRCDEST_DIR, AUR_RPC_PRECHECK, AUR_SNAPSHOT_* and BUILD_FINGERPRINT_CACHE
 
 # Import required modules
 from modules.repo.manifest_factory import ManifestFactory
@@ -19,6 +30,13 @@ from modules.build.artifact_manager import ArtifactManager
 
 logger = logging.getLogger(__name__)
 
+# AUR naming convention for VCS packages; their AUR version lags upstream, so
+# they always go through the clone + upstream check
+_VCS_SUFFIXES = ('-git', '-svn', '-hg', '-bzr', '-darcs', '-cvs', '-fossil')
+
+# Splits a dependency spec ("foo>=1.2") into its name
+_DEP_CONSTRAINT_RE = re.compile(r'[<>=]')
+
 
 class PackageBuilder:
     """
@@ -39,7 +57,8 @@ class PackageBuilder:
         version_tracker,  # Added: VersionTracker for skipped package registration
         debug_mode: bool = False,
         vps_files: Optional[List[str]] = None,  # NEW: VPS file inventory for completeness check
-        build_tracker=None  # NEW: BuildTracker for hokibot data
+        build_tracker=None,  # NEW: BuildTracker for hokibot data
+        state_dir: Optional[Path] = None  # NEW: Where the build cache index lives (default: output_dir)
     ):
         """
         Initialize PackageBuilder with dependencies.
@@ -53,6 +72,7 @@ class PackageBuilder:
             debug_mode: Enable debug logging
             vps_files: List of files on VPS for completeness check
             build_tracker: BuildTracker instance for hokibot data
+            state_dir: Directory for the build cache index (defaults to output_dir)
         """
         self.version_manager = version_manager
         self.gpg_handler = gpg_handler
@@ -61,8 +81,24 @@ class PackageBuilder:
         self.version_tracker = version_tracker  # Store version tracker
         self.debug_mode = debug_mode
         self.vps_files = vps_files or []  # NEW: Store VPS file inventory
+        self._vps_file_set: Set[str] = set(self.vps_files)  # O(1) signature lookups
         self.build_tracker = build_tracker  # NEW: Store build tracker
         self._recently_built_files: List[str] = []  # NEW: Track files built in current session
+        self._output_dir_chowned = False  # makepkg writes into output_dir directly (PKGDEST)
+        self._build_lock = threading.Lock()  # Serializes dependency install + makepkg across audit workers
+        self.srcdest = Path(getattr(config, 'SRCDEST_DIR', '/tmp/repo-builder-srcdest'))
+        self._srcdest_lock = threading.Lock()
+        self._srcdest_ready = False
+        self._cleanup_queue: "queue.Queue[str]" = queue.Queue()  # AUR work dirs removed off the hot path
+        self._cleanup_thread: Optional[threading.Thread] = None
+        self._cleanup_lock = threading.Lock()
+        self._aur_rpc_info: Dict[str, Dict[str, Any]] = {}  # Filled once per batch (AUR_RPC_PRECHECK)
+        self._aur_pkgnames: Dict[str, List[str]] = {}  # AUR pkgbase -> pkgnames (from the Phase II PKGBUILDs)
+        # Source fingerprint -> package files it produced (index persisted in state_dir)
+        self._build_cache_path = (state_dir or self.output_dir) / ".build-cache.json"
+        self._build_cache: Dict[str, List[str]] = self._load_build_cache()
+        self._build_cache_lock = threading.Lock()
+        self._build_cache_dirty = False
         
         # Initialize modular components
         self.local_builder = LocalBuilder(debug_mode=debug_mode)
@@ -77,9 +113,108 @@ class PackageBuilder:
     def set_vps_files(self, vps_files: List[str]):
         """Set VPS file inventory for completeness check."""
         self.vps_files = vps_files or []
+        self._vps_file_set = set(self.vps_files)
         count = len(self.vps_files)
         logger.info(f"VPS_FILES_SET=1 count={count}")
     
+    def _load_build_cache(self) -> Dict[str, List[str]]:
+        """Load the fingerprint cache; a missing or corrupt file means a cold cache."""
+        if not getattr(config, 'BUILD_FINGERPRINT_CACHE', True):
+            return {}
+        try:
+            with open(self._build_cache_path, 'r') as f:
+                raw = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.warning(f"BUILD_CACHE_LOAD_FAIL=1 error={e}")
+            return {}
+        cache = {key: list(value) for key, value in raw.items() if isinstance(value, list)}
+        logger.info(f"BUILD_CACHE_ENTRIES={len(cache)}")
+        return cache
+    
+    def save_build_cache(self) -> bool:
+        """
+        Atomically persist the fingerprint cache (temp file + os.replace).
+        
+        Returns:
+            True if written or nothing changed, False on error
+        """
+        with self._build_cache_lock:
+            if not self._build_cache_dirty:
+                return True
+            # Drop entries whose packages are gone so the file does not grow forever
+            cache = {
+                key: files for key, files in self._build_cache.items()
+                if all((self.output_dir / name).exists() for name in files)
+            }
+            tmp_path = self._build_cache_path.with_name(self._build_cache_path.name + ".tmp")
+            try:
+                self._build_cache_path.parent.mkdir(parents=True, exist_ok=True)
+                with open(tmp_path, 'w') as f:
+                    json.dump(cache, f)
+                os.replace(tmp_path, self._build_cache_path)
+                self._build_cache_dirty = False
+                logger.info(f"BUILD_CACHE_SAVED={len(cache)}")
+                return True
+            except Exception as e:
+                logger.warning(f"BUILD_CACHE_SAVE_FAIL=1 error={e}")
+                return False
+    
+    def _source_fingerprint(self, pkg_dir: Path) -> Optional[str]:
+        """
+        BLAKE2b over the packager identity and every top-level file of the
+        package dir (PKGBUILD, .SRCINFO lines sorted, patches, install scripts).
+        
+        Args:
+            pkg_dir: Local package directory
+            
+        Returns:
+            Hex digest, or None if the directory cannot be read
+        """
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(self.packager_id.encode())
+        try:
+            entries = sorted(
+                (entry for entry in os.scandir(pkg_dir) if entry.is_file(follow_symlinks=False)),
+                key=lambda entry: entry.name
+            )
+            for entry in entries:
+                if '.pkg.tar' in entry.name or entry.name.endswith('.log'):
+                    continue
+                with open(entry.path, 'rb') as f:
+                    content = f.read()
+                if entry.name == ".SRCINFO":
+                    content = b"\n".join(sorted(content.splitlines()))
+                digest.update(entry.name.encode() + b"\0" + content + b"\0")
+        except OSError as e:
+            logger.debug(f"Fingerprint failed for {pkg_dir.name}: {e}")
+            return None
+        return digest.hexdigest()
+    
+    def _cached_build_files(self, fingerprint: Optional[str]) -> Optional[List[str]]:
+        """Return the package files built from identical sources if all are still in output_dir."""
+        if fingerprint is None:
+            return None
+        with self._build_cache_lock:
+            files = self._build_cache.get(fingerprint)
+        if files and all((self.output_dir / name).exists() for name in files):
+            return list(files)
+        return None
+    
+    def _store_build_fingerprint(self, fingerprint: Optional[str], built_files: List[str]):
+        """Remember which package files a source fingerprint produced."""
+        if fingerprint is None or not built_files:
+            return
+        with self._build_cache_lock:
+            self._build_cache[fingerprint] = list(built_files)
+            self._build_cache_dirty = True
+    
+    def set_aur_pkgnames(self, aur_pkgnames: Dict[str, List[str]]):
+        """Set the pkgname list of each AUR package (used by the RPC pre-check)."""
+        self._aur_pkgnames = dict(aur_pkgnames or {})
+        logger.info(f"AUR_PKGNAMES_SET=1 count={len(self._aur_pkgnames)}")
+    
     def _ensure_output_directory(self):
         """
         CRITICAL: Ensure output directory exists and is writable before any makepkg invocation.
@@ -101,6 +236,12 @@ class PackageBuilder:
             except (IOError, OSError):
                 writable = False
             
+            # makepkg runs as builder with PKGDEST=output_dir; hand the directory
+            # (including mirrored packages a rebuild may overwrite) to builder once
+            if not self._output_dir_chowned:
+                subprocess.run(['chown', '-R', 'builder:builder', str(self.output_dir)], check=False)
+                self._output_dir_chowned = True
+            
             # Log directory status
             logger.info(f"OUTPUT_DIR_EXISTS=1 path={self.output_dir} writable={writable}")
             
@@ -122,7 +263,8 @@ class PackageBuilder:
         self,
         pkg_dir: Path,
         remote_version: Optional[str],
-        skip_check: bool = False
+        skip_check: bool = False,
+        bump_pkgrel: bool = False
     ) -> Tuple[bool, Optional[str], Optional[Dict[str, str]], Optional[Dict[str, str]]]:
         """
         Audit and build local package.
@@ -132,6 +274,8 @@ class PackageBuilder:
             pkg_dir: Path to local package directory
             remote_version: Current version on mirror (None if not exists)
             skip_check: Skip version check and force build (for testing)
+            bump_pkgrel: Rebuild of an unchanged PKGBUILD (a local dependency
+                was rebuilt); raise pkgrel so the artifact gets a new filename
             
         Returns:
             Tuple of (built: bool, built_version: str, metadata: dict, artifact_versions: dict)
@@ -152,6 +296,16 @@ class PackageBuilder:
         # Step 2: Extract all package names from PKGBUILD
         pkg_names = self._extract_package_names(pkg_dir)
         
+        # Step 2b: A propagated rebuild must not republish the filename that is
+        # already in the repo (clients would never upgrade, caches would fail
+        # the checksum); the bumped pkgrel reaches the repo through hokibot
+        if bump_pkgrel and remote_version:
+            new_pkgrel = self._bump_pkgrel(pkg_dir, pkgver, pkgrel, epoch, remote_version)
+            if new_pkgrel is None:
+                return False, None, None, None
+            pkgrel = new_pkgrel
+            source_version = self.version_manager.get_full_version_string(pkgver, pkgrel, epoch)
+        
         # Step 3: Version comparison (skip if forced)
         if not skip_check and remote_version:
             should_build = self.version_manager.compare_versions(
@@ -195,124 +349,198 @@ class PackageBuilder:
         
         # --- We have decided to build ---
         
-        # Get dependency installer from local builder
-        dep_installer = self.local_builder.dependency_installer
+        # Identical sources already produced packages still in output_dir
+        # (e.g. a previous run whose upload failed): reuse them. Forced
+        # rebuilds (changed local dependencies) and VCS packages always build.
+        fingerprint = None
+        cached_files = None
+        if getattr(config, 'BUILD_FINGERPRINT_CACHE', True) and not skip_check:
+            is_vcs, _ = self.version_manager.detect_vcs_package(pkg_dir)
+            if not is_vcs:
+                fingerprint = self._source_fingerprint(pkg_dir)
+                cached_files = self._cached_build_files(fingerprint)
         
-        # Extract dependencies (makedepends, checkdepends, runtime_depends)
-        makedepends, checkdepends, runtime_depends = dep_installer.extract_dependencies(pkg_dir)
+        if cached_files is None:
+            # Fetch sources into the package SRCDEST while other packages build
+            self._prefetch_sources(pkg_dir, pkg_dir.name)
         
-        # Log runtime depends - they may be installed depending on config
-        if runtime_depends:
-            logger.info(f"📦 Runtime depends (will be installed if config flag is True): {runtime_depends}")
-        
-        # Start dependency session for this package
-        dep_installer.begin_session(pkg_dir.name)
-        try:
-            # Step 4: Install build dependencies (with configurable runtime deps)
-            logger.info(f"🔧 Installing dependencies for {pkg_dir.name}...")
-            if not self.local_builder.install_build_dependencies(
-                str(pkg_dir),
-                makedepends,
-                checkdepends,
-                runtime_depends
-            ):
-                logger.error(f"❌ Failed to install dependencies for {pkg_dir.name}")
-                return False, source_version, None, None
+        # Serialize the build section: dependency sessions, pacman and makepkg
+        # share host-wide state, while audits may run concurrently
+        with self._build_lock:
+            # Get dependency installer from local builder
+            dep_installer = self.local_builder.dependency_installer
             
-            # Step 5: Build package
-            logger.info(f"🔨 Building {pkg_dir.name} ({source_version})...")
-            logger.info("LOCAL_BUILDER_USED=1")
-            built_files, build_output = self._build_local_package(pkg_dir, source_version)
-            
-            if built_files:
-                # Step 6: Extract ACTUAL artifact versions from built files
-                # NEW: Prefer built_files-based helper first
-                artifact_versions = self.version_manager.extract_artifact_versions_from_files(built_files, pkg_names)
+            if cached_files is None:
+                # Extract dependencies (makedepends, checkdepends, runtime_depends)
+                makedepends, checkdepends, runtime_depends = dep_installer.extract_dependencies(pkg_dir)
                 
-                # Fallback to output_dir scan if built_files didn't yield versions
-                if not artifact_versions:
-                    artifact_versions = self.version_manager.extract_artifact_versions(self.output_dir, pkg_names)
+                # Log runtime depends - they may be installed depending on config
+                if runtime_depends:
+                    logger.info(f"📦 Runtime depends (will be installed if config flag is True): {runtime_depends}")
+                
+                # Start dependency session for this package
+                dep_installer.begin_session(pkg_dir.name)
+            try:
+                if cached_files is not None:
+                    logger.info(f"BUILD_CACHE_HIT=1 pkg={pkg_dir.name} files={len(cached_files)}")
+                    built_files, build_output = self._record_built_packages(cached_files), ""
+                else:
+                    # Step 4: Install build dependencies (with configurable runtime deps)
+                    logger.info(f"🔧 Installing dependencies for {pkg_dir.name}...")
+                    if not self.local_builder.install_build_dependencies(
+                        str(pkg_dir),
+                        makedepends,
+                        checkdepends,
+                        runtime_depends
+                    ):
+                        logger.error(f"❌ Failed to install dependencies for {pkg_dir.name}")
+                        return False, source_version, None, None
                     
-                    # Additional fallback: try to extract from makepkg output if artifact parsing fails
-                    if not artifact_versions and build_output:
-                        artifact_version = self.version_manager.get_artifact_version_from_makepkg(build_output)
-                        if artifact_version:
-                            for pkg_name in pkg_names:
-                                artifact_versions[pkg_name] = artifact_version
+                    # Step 5: Build package
+                    logger.info(f"🔨 Building {pkg_dir.name} ({source_version})...")
+                    logger.info("LOCAL_BUILDER_USED=1")
+                    built_files, build_output = self._build_local_package(pkg_dir, source_version)
+                    self._store_build_fingerprint(fingerprint, built_files)
                 
-                # Step 7: Determine which version to use (artifact truth vs PKGBUILD)
-                actual_version = None
-                if artifact_versions:
-                    # Use artifact version for the main package
-                    main_pkg = pkg_dir.name
-                    if main_pkg in artifact_versions:
-                        actual_version = artifact_versions[main_pkg]
-                        logger.info(f"[VERSION_TRUTH] PKGBUILD: {source_version}, Artifact: {actual_version}")
+                if built_files:
+                    # Step 6: Extract ACTUAL artifact versions from built files
+                    # NEW: Prefer built_files-based helper first
+                    artifact_versions = self.version_manager.extract_artifact_versions_from_files(built_files, pkg_names)
+                    
+                    # Fallback to output_dir scan if built_files didn't yield versions
+                    if not artifact_versions:
+                        artifact_versions = self.version_manager.extract_artifact_versions(self.output_dir, pkg_names)
                         
-                        # For VCS packages, update the source version with artifact truth
-                        if actual_version != source_version:
-                            logger.info(f"[VERSION_TRUTH] Using artifact version for VCS package: {actual_version}")
-                            # Parse the artifact version to update pkgver/pkgrel/epoch
-                            if ':' in actual_version:
-                                epoch_part, rest = actual_version.split(':', 1)
-                                if '-' in rest:
-                                    pkgver_actual, pkgrel_actual = rest.split('-', 1)
-                                else:
-                                    pkgver_actual = rest
-                                    pkgrel_actual = "1"
-                            else:
-                                epoch_part = "0"
-                                if '-' in actual_version:
-                                    pkgver_actual, pkgrel_actual = actual_version.split('-', 1)
-                                else:
-                                    pkgver_actual = actual_version
-                                    pkgrel_actual = "1"
+                        # Additional fallback: try to extract from makepkg output if artifact parsing fails
+                        if not artifact_versions and build_output:
+                            artifact_version = self.version_manager.get_artifact_version_from_makepkg(build_output)
+                            if artifact_version:
+                                for pkg_name in pkg_names:
+                                    artifact_versions[pkg_name] = artifact_version
+                    
+                    # Step 7: Determine which version to use (artifact truth vs PKGBUILD)
+                    actual_version = None
+                    if artifact_versions:
+                        # Use artifact version for the main package
+                        main_pkg = pkg_dir.name
+                        if main_pkg in artifact_versions:
+                            actual_version = artifact_versions[main_pkg]
+                            logger.info(f"[VERSION_TRUTH] PKGBUILD: {source_version}, Artifact: {actual_version}")
                             
-                            # Update metadata with artifact truth
-                            pkgver = pkgver_actual
-                            pkgrel = pkgrel_actual
-                            epoch = epoch_part if epoch_part != "0" else epoch
-                            source_version = actual_version
-                
-                # Use PKGBUILD version if no artifact version found
-                if not actual_version:
-                    actual_version = source_version
-                    logger.info(f"[VERSION_TRUTH] Using PKGBUILD version (no artifact found): {actual_version}")
-                
-                # Step 8: Sign ALL built package files (including split packages)
-                self._sign_built_packages(built_files, actual_version)
-                
-                # NEW: Register target version for ALL pkgname entries using ACTUAL version
-                self.version_tracker.register_split_packages(pkg_names, actual_version, is_built=True)
-                
-                # NEW: Record hokibot data for local package with ACTUAL version
-                if self.build_tracker:
-                    self.build_tracker.add_hokibot_data(
-                        pkg_name=pkg_dir.name,
-                        pkgver=pkgver,
-                        pkgrel=pkgrel,
-                        epoch=epoch,
-                        old_version=remote_version,
-                        new_version=actual_version
-                    )
-                
-                # Log version truth chain
-                logger.info(f"[VERSION_TRUTH_CHAIN] Package: {pkg_dir.name}")
-                logger.info(f"[VERSION_TRUTH_CHAIN] PKGBUILD/.SRCINFO: {source_version}")
-                logger.info(f"[VERSION_TRUTH_CHAIN] Artifact-derived: {actual_version}")
-                logger.info(f"[VERSION_TRUTH_CHAIN] Registered for prune/hokibot: {actual_version}")
+                            # For VCS packages, update the source version with artifact truth
+                            if actual_version != source_version:
+                                logger.info(f"[VERSION_TRUTH] Using artifact version for VCS package: {actual_version}")
+                                # Parse the artifact version to update pkgver/pkgrel/epoch
+                                if ':' in actual_version:
+                                    epoch_part, rest = actual_version.split(':', 1)
+                                    if '-' in rest:
+                                        pkgver_actual, pkgrel_actual = rest.split('-', 1)
+                                    else:
+                                        pkgver_actual = rest
+                                        pkgrel_actual = "1"
+                                else:
+                                    epoch_part = "0"
+                                    if '-' in actual_version:
+                                        pkgver_actual, pkgrel_actual = actual_version.split('-', 1)
+                                    else:
+                                        pkgver_actual = actual_version
+                                        pkgrel_actual = "1"
+                                
+                                # Update metadata with artifact truth
+                                pkgver = pkgver_actual
+                                pkgrel = pkgrel_actual
+                                epoch = epoch_part if epoch_part != "0" else epoch
+                                source_version = actual_version
+                    
+                    # Use PKGBUILD version if no artifact version found
+                    if not actual_version:
+                        actual_version = source_version
+                        logger.info(f"[VERSION_TRUTH] Using PKGBUILD version (no artifact found): {actual_version}")
+                    
+                    # Step 8: Sign ALL built package files (including split packages)
+                    self._sign_built_packages(built_files, actual_version)
+                    
+                    # NEW: Register target version for ALL pkgname entries using ACTUAL version
+                    self.version_tracker.register_split_packages(pkg_names, actual_version, is_built=True)
+                    
+                    # NEW: Record hokibot data for local package with ACTUAL version
+                    if self.build_tracker:
+                        self.build_tracker.add_hokibot_data(
+                            pkg_name=pkg_dir.name,
+                            pkgver=pkgver,
+                            pkgrel=pkgrel,
+                            epoch=epoch,
+                            old_version=remote_version,
+                            new_version=actual_version
+                        )
+                    
+                    # Log version truth chain
+                    logger.info(f"[VERSION_TRUTH_CHAIN] Package: {pkg_dir.name}")
+                    logger.info(f"[VERSION_TRUTH_CHAIN] PKGBUILD/.SRCINFO: {source_version}")
+                    logger.info(f"[VERSION_TRUTH_CHAIN] Artifact-derived: {actual_version}")
+                    logger.info(f"[VERSION_TRUTH_CHAIN] Registered for prune/hokibot: {actual_version}")
+                    
+                    return True, actual_version, {
+                        "pkgver": pkgver,
+                        "pkgrel": pkgrel,
+                        "epoch": epoch,
+                        "pkgnames": pkg_names
+                    }, artifact_versions
                 
-                return True, actual_version, {
-                    "pkgver": pkgver,
-                    "pkgrel": pkgrel,
-                    "epoch": epoch,
-                    "pkgnames": pkg_names
-                }, artifact_versions
-            
-            return False, source_version, None, None
-        finally:
-            # Always clean up dependencies added during this session
-            dep_installer.end_session()
+                return False, source_version, None, None
+            finally:
+                # Always clean up dependencies added during this session
+                dep_installer.end_session()
+    
+    def _bump_pkgrel(self, pkg_dir: Path, pkgver: str, pkgrel: str, epoch: Optional[str],
+                     remote_version: str) -> Optional[str]:
+        """
+        Raise pkgrel in the PKGBUILD (and .SRCINFO) of a package that is rebuilt
+        only because a local dependency changed.
+        
+        The new pkgrel is one above the integer part of the pkgrel published on
+        the mirror when it carries the same [epoch:]pkgver, otherwise one above
+        the source pkgrel.
+        
+        Args:
+            pkg_dir: Path to local package directory
+            pkgver: Source pkgver
+            pkgrel: Source pkgrel
+            epoch: Source epoch (optional)
+            remote_version: Version currently on the mirror
+            
+        Returns:
+            The new pkgrel, or None if the PKGBUILD could not be updated
+        """
+        base_rel = pkgrel
+        source_base = self.version_manager.get_full_version_string(pkgver, '', epoch).rstrip('-')
+        remote_base, _, remote_rel = remote_version.rpartition('-')
+        if remote_base == source_base and remote_rel:
+            base_rel = remote_rel
+        try:
+            new_pkgrel = str(max(int(base_rel.split('.')[0]), int(pkgrel.split('.')[0])) + 1)
+        except ValueError:
+            logger.error(f"PKGREL_BUMP_FAIL pkg={pkg_dir.name} reason=non_numeric pkgrel={pkgrel} remote={remote_version}")
+            return None
+        
+        pkgbuild_path = pkg_dir / "PKGBUILD"
+        try:
+            content = pkgbuild_path.read_text()
+            content, count = re.subn(r'^pkgrel=.*$', f"pkgrel={new_pkgrel}", content, count=1, flags=re.MULTILINE)
+            if not count:
+                logger.error(f"PKGREL_BUMP_FAIL pkg={pkg_dir.name} reason=no_pkgrel_line")
+                return None
+            pkgbuild_path.write_text(content)
+            srcinfo_path = pkg_dir / ".SRCINFO"
+            if srcinfo_path.is_file():
+                srcinfo = re.sub(r'^(\s*pkgrel\s*=\s*).*$', rf'\g<1>{new_pkgrel}', srcinfo_path.read_text(), flags=re.MULTILINE)
+                srcinfo_path.write_text(srcinfo)
+        except OSError as e:
+            logger.error(f"PKGREL_BUMP_FAIL pkg={pkg_dir.name} error={e}")
+            return None
+        
+        logger.info(f"PKGREL_BUMP pkg={pkg_dir.name} pkgrel={pkgrel}->{new_pkgrel} remote={remote_version}")
+        return new_pkgrel
     
     def audit_and_build_aur(
         self,
@@ -336,6 +564,14 @@ class PackageBuilder:
         """
         logger.info(f"🔍 Auditing AUR package: {aur_package_name}")
         
+        # Step 0: Skip the clone entirely when the AUR RPC already proves the
+        # mirror is up to date. Packages not yet on the mirror always build,
+        # so neither the precheck nor the completeness probe applies to them.
+        if not skip_check and remote_version:
+            precheck = self._aur_rpc_precheck(aur_package_name, remote_version)
+            if precheck is not None:
+                return precheck
+        
         # Step 1: Clone AUR package
         temp_dir = None
         try:
@@ -402,104 +638,165 @@ class PackageBuilder:
             
             # --- We have decided to build ---
             
-            # Get dependency installer from aur builder
-            dep_installer = self.aur_builder.dependency_installer
+            # Same fingerprint reuse as local packages: an unchanged AUR
+            # snapshot whose packages are still in output_dir is not rebuilt
+            fingerprint = None
+            cached_files = None
+            if getattr(config, 'BUILD_FINGERPRINT_CACHE', True) and not skip_check:
+                is_vcs, _ = self.version_manager.detect_vcs_package(temp_path)
+                if not is_vcs:
+                    fingerprint = self._source_fingerprint(temp_path)
+                    cached_files = self._cached_build_files(fingerprint)
             
-            # Start dependency session for this package
-            dep_installer.begin_session(aur_package_name)
-            try:
-                # Step 5: Build package (dependencies are installed inside build_aur_package)
-                logger.info(f"🔨 Building AUR {aur_package_name} ({source_version})...")
-                logger.info("AUR_BUILDER_USED=1")
-                built_files, build_output = self._build_aur_package(temp_path, aur_package_name, source_version)
+            if cached_files is None:
+                # Fetch sources into the package SRCDEST while other packages build
+                self._prefetch_sources(temp_path, aur_package_name)
+            
+            # Serialize the build section: dependency sessions, pacman and makepkg
+            # share host-wide state, while audits may run concurrently
+            with self._build_lock:
+                # Get dependency installer from aur builder
+                dep_installer = self.aur_builder.dependency_installer
                 
-                if built_files:
-                    # Step 6: Extract ACTUAL artifact versions from built files
-                    # NEW: Prefer built_files-based helper first
-                    artifact_versions = self.version_manager.extract_artifact_versions_from_files(built_files, pkg_names)
+                # Start dependency session for this package
+                if cached_files is None:
+                    dep_installer.begin_session(aur_package_name)
+                try:
+                    if cached_files is not None:
+                        logger.info(f"BUILD_CACHE_HIT=1 pkg={aur_package_name} files={len(cached_files)}")
+                        built_files, build_output = self._record_built_packages(cached_files), ""
+                    else:
+                        # Step 5: Build package (dependencies are installed inside build_aur_package)
+                        logger.info(f"🔨 Building AUR {aur_package_name} ({source_version})...")
+                        logger.info("AUR_BUILDER_USED=1")
+                        built_files, build_output = self._build_aur_package(temp_path, aur_package_name, source_version)
+                        self._store_build_fingerprint(fingerprint, built_files)
                     
-                    # Fallback to output_dir scan if built_files didn't yield versions
-                    if not artifact_versions:
-                        artifact_versions = self.version_manager.extract_artifact_versions(self.output_dir, pkg_names)
+                    if built_files:
+                        # Step 6: Extract ACTUAL artifact versions from built files
+                        # NEW: Prefer built_files-based helper first
+                        artifact_versions = self.version_manager.extract_artifact_versions_from_files(built_files, pkg_names)
                         
-                        # Additional fallback: try to extract from makepkg output if artifact parsing fails
-                        if not artifact_versions and build_output:
-                            artifact_version = self.version_manager.get_artifact_version_from_makepkg(build_output)
-                            if artifact_version:
-                                for pkg_name in pkg_names:
-                                    artifact_versions[pkg_name] = artifact_version
-                    
-                    # Step 7: Determine which version to use (artifact truth vs PKGBUILD)
-                    actual_version = None
-                    if artifact_versions:
-                        # Use artifact version for the main package
-                        if aur_package_name in artifact_versions:
-                            actual_version = artifact_versions[aur_package_name]
-                            logger.info(f"[VERSION_TRUTH] PKGBUILD: {source_version}, Artifact: {actual_version}")
+                        # Fallback to output_dir scan if built_files didn't yield versions
+                        if not artifact_versions:
+                            artifact_versions = self.version_manager.extract_artifact_versions(self.output_dir, pkg_names)
                             
-                            # For VCS packages, update the source version with artifact truth
-                            if actual_version != source_version:
-                                logger.info(f"[VERSION_TRUTH] Using artifact version for VCS package: {actual_version}")
-                                # Parse the artifact version to update pkgver/pkgrel/epoch
-                                if ':' in actual_version:
-                                    epoch_part, rest = actual_version.split(':', 1)
-                                    if '-' in rest:
-                                        pkgver_actual, pkgrel_actual = rest.split('-', 1)
-                                    else:
-                                        pkgver_actual = rest
-                                        pkgrel_actual = "1"
-                                else:
-                                    epoch_part = "0"
-                                    if '-' in actual_version:
-                                        pkgver_actual, pkgrel_actual = actual_version.split('-', 1)
-                                    else:
-                                        pkgver_actual = actual_version
-                                        pkgrel_actual = "1"
+                            # Additional fallback: try to extract from makepkg output if artifact parsing fails
+                            if not artifact_versions and build_output:
+                                artifact_version = self.version_manager.get_artifact_version_from_makepkg(build_output)
+                                if artifact_version:
+                                    for pkg_name in pkg_names:
+                                        artifact_versions[pkg_name] = artifact_version
+                        
+                        # Step 7: Determine which version to use (artifact truth vs PKGBUILD)
+                        actual_version = None
+                        if artifact_versions:
+                            # Use artifact version for the main package
+                            if aur_package_name in artifact_versions:
+                                actual_version = artifact_versions[aur_package_name]
+                                logger.info(f"[VERSION_TRUTH] PKGBUILD: {source_version}, Artifact: {actual_version}")
                                 
-                                # Update metadata with artifact truth
-                                pkgver = pkgver_actual
-                                pkgrel = pkgrel_actual
-                                epoch = epoch_part if epoch_part != "0" else epoch
-                                source_version = actual_version
-                    
-                    # Use PKGBUILD version if no artifact version found
-                    if not actual_version:
-                        actual_version = source_version
-                        logger.info(f"[VERSION_TRUTH] Using PKGBUILD version (no artifact found): {actual_version}")
-                    
-                    # Step 8: Sign ALL built package files (including split packages)
-                    self._sign_built_packages(built_files, actual_version)
-                    
-                    # NEW: Register target version for ALL pkgname entries using ACTUAL version
-                    self.version_tracker.register_split_packages(pkg_names, actual_version, is_built=True)
-                    
-                    # Note: AUR packages do NOT record hokibot data per requirements
-                    
-                    # Log version truth chain
-                    logger.info(f"[VERSION_TRUTH_CHAIN] Package: {aur_package_name}")
-                    logger.info(f"[VERSION_TRUTH_CHAIN] PKGBUILD/.SRCINFO: {source_version}")
-                    logger.info(f"[VERSION_TRUTH_CHAIN] Artifact-derived: {actual_version}")
-                    logger.info(f"[VERSION_TRUTH_CHAIN] Registered for prune/hokibot: {actual_version}")
+                                # For VCS packages, update the source version with artifact truth
+                                if actual_version != source_version:
+                                    logger.info(f"[VERSION_TRUTH] Using artifact version for VCS package: {actual_version}")
+                                    # Parse the artifact version to update pkgver/pkgrel/epoch
+                                    if ':' in actual_version:
+                                        epoch_part, rest = actual_version.split(':', 1)
+                                        if '-' in rest:
+                                            pkgver_actual, pkgrel_actual = rest.split('-', 1)
+                                        else:
+                                            pkgver_actual = rest
+                                            pkgrel_actual = "1"
+                                    else:
+                                        epoch_part = "0"
+                                        if '-' in actual_version:
+                                            pkgver_actual, pkgrel_actual = actual_version.split('-', 1)
+                                        else:
+                                            pkgver_actual = actual_version
+                                            pkgrel_actual = "1"
+                                    
+                                    # Update metadata with artifact truth
+                                    pkgver = pkgver_actual
+                                    pkgrel = pkgrel_actual
+                                    epoch = epoch_part if epoch_part != "0" else epoch
+                                    source_version = actual_version
+                        
+                        # Use PKGBUILD version if no artifact version found
+                        if not actual_version:
+                            actual_version = source_version
+                            logger.info(f"[VERSION_TRUTH] Using PKGBUILD version (no artifact found): {actual_version}")
+                        
+                        # Step 8: Sign ALL built package files (including split packages)
+                        self._sign_built_packages(built_files, actual_version)
+                        
+                        # NEW: Register target version for ALL pkgname entries using ACTUAL version
+                        self.version_tracker.register_split_packages(pkg_names, actual_version, is_built=True)
+                        
+                        # Note: AUR packages do NOT record hokibot data per requirements
+                        
+                        # Log version truth chain
+                        logger.info(f"[VERSION_TRUTH_CHAIN] Package: {aur_package_name}")
+                        logger.info(f"[VERSION_TRUTH_CHAIN] PKGBUILD/.SRCINFO: {source_version}")
+                        logger.info(f"[VERSION_TRUTH_CHAIN] Artifact-derived: {actual_version}")
+                        logger.info(f"[VERSION_TRUTH_CHAIN] Registered for prune/hokibot: {actual_version}")
+                        
+                        return True, actual_version, {
+                            "pkgver": pkgver,
+                            "pkgrel": pkgrel,
+                            "epoch": epoch,
+                            "pkgnames": pkg_names
+                        }, artifact_versions
                     
-                    return True, actual_version, {
-                        "pkgver": pkgver,
-                        "pkgrel": pkgrel,
-                        "epoch": epoch,
-                        "pkgnames": pkg_names
-                    }, artifact_versions
-                
-                return False, source_version, None, None
-            finally:
-                # Always clean up dependencies added during this session
-                dep_installer.end_session()
+                    return False, source_version, None, None
+                finally:
+                    # Always clean up dependencies added during this session
+                    dep_installer.end_session()
             
         except Exception as e:
             logger.error(f"❌ Error building AUR package {aur_package_name}: {e}")
             return False, None, None, None
         finally:
-            # Cleanup temporary directory
-            if temp_dir and Path(temp_dir).exists():
-                shutil.rmtree(temp_dir, ignore_errors=True)
+            # Cleanup temporary directory in the background
+            if temp_dir:
+                self._schedule_cleanup(temp_dir)
+    
+    def _cleanup_worker(self):
+        """Background worker: remove queued directories one by one."""
+        while True:
+            path = self._cleanup_queue.get()
+            try:
+                shutil.rmtree(path, ignore_errors=True)
+            finally:
+                self._cleanup_queue.task_done()
+    
+    def _schedule_cleanup(self, path: str):
+        """
+        Queue a directory for background removal.
+        
+        The directory is first renamed to a quarantine name (a single inode
+        operation), so the path is free immediately and the recursive delete
+        runs on the cleanup thread instead of the audit/build path.
+        """
+        quarantine = f"{path}.del.{os.getpid()}"
+        try:
+            os.rename(path, quarantine)
+        except FileNotFoundError:
+            return
+        except OSError:
+            quarantine = path
+        
+        if self._cleanup_thread is None:
+            with self._cleanup_lock:
+                if self._cleanup_thread is None:
+                    self._cleanup_thread = threading.Thread(target=self._cleanup_worker, name="dir-cleanup", daemon=True)
+                    self._cleanup_thread.start()
+        self._cleanup_queue.put(quarantine)
+    
+    def drain_cleanup(self):
+        """Block until every queued directory has been removed."""
+        if self._cleanup_thread is not None:
+            self._cleanup_queue.join()
+            logger.info("CLEANUP_QUEUE_DRAINED=1")
     
     def _check_split_package_completeness(self, pkgbuild_name: str, pkg_names: List[str], pkgver: str, pkgrel: str, epoch: Optional[str]) -> bool:
         """
@@ -519,32 +816,32 @@ class PackageBuilder:
             logger.warning(f"No VPS file inventory available for {pkgbuild_name} - skipping completeness verification")
             return True  # Fail-safe: If we can't verify, assume complete
         
+        # Short-circuit: none of the split packages has any file on the VPS
+        if not any(self.version_tracker.get_inventory_files(pkg_name) for pkg_name in pkg_names):
+            logger.warning(f"FORCE BUILD (incomplete VPS): {pkgbuild_name} has no packages on VPS for {len(pkg_names)} pkgnames")
+            return False
+        
         missing_artifacts = []
         
+        # FIXED: Build correct version segment with colon for epoch (same for
+        # every split package, so computed once)
+        if epoch and epoch != '0':
+            version_segment = f"{epoch}:{pkgver}-{pkgrel}"
+        else:
+            version_segment = f"{pkgver}-{pkgrel}"
+        
         for pkg_name in pkg_names:
-            # FIXED: Build correct version segment with colon for epoch
-            if epoch and epoch != '0':
-                version_segment = f"{epoch}:{pkgver}-{pkgrel}"
+            # Package files (any architecture, any compression) of exactly this
+            # version: one lookup in the (name, version) remote index;
+            # signatures are looked up in _vps_file_set
+            vps_files = self.version_tracker.get_inventory_files_for_version(pkg_name, version_segment)
+            if vps_files:
+                # Check for corresponding signature
+                sig_file = vps_files[0] + '.sig'
+                if sig_file not in self._vps_file_set:
+                    missing_artifacts.append(sig_file)
             else:
-                version_segment = f"{pkgver}-{pkgrel}"
-            
-            # Build base pattern with correct version formatting
-            base_pattern = f"{pkg_name}-{version_segment}"
-            
-            # Check for package files (any architecture, any compression)
-            package_found = False
-            for vps_file in self.vps_files:
-                # Check if file starts with base_pattern and has package extension
-                if vps_file.startswith(base_pattern) and (vps_file.endswith('.pkg.tar.zst') or vps_file.endswith('.pkg.tar.xz')):
-                    package_found = True
-                    # Check for corresponding signature
-                    sig_file = vps_file + '.sig'
-                    if sig_file not in self.vps_files:
-                        missing_artifacts.append(f"{vps_file}.sig")
-                    break
-            
-            if not package_found:
-                missing_artifacts.append(f"{base_pattern}-*.pkg.tar.*")
+                missing_artifacts.append(f"{pkg_name}-{version_segment}-*.pkg.tar.*")
         
         if missing_artifacts:
             example = missing_artifacts[0] if missing_artifacts else "unknown"
@@ -554,6 +851,56 @@ class PackageBuilder:
         logger.info(f"SKIP OK (complete VPS): {pkgbuild_name} all split artifacts present")
         return True
     
+    def _aur_rpc_precheck(
+        self,
+        aur_package_name: str,
+        remote_version: Optional[str]
+    ) -> Optional[Tuple[bool, Optional[str], Optional[Dict[str, str]], Optional[Dict[str, str]]]]:
+        """
+        Decide SKIP from AUR RPC metadata without cloning.
+        
+        Only the unambiguous case is handled here: a non-VCS package whose AUR
+        version equals the mirror version and whose split artifacts (pkgnames
+        from the Phase II PKGBUILD) are all on the VPS. Everything else returns
+        None and goes through the normal clone + compare path.
+        
+        Args:
+            aur_package_name: AUR package (pkgbase) name
+            remote_version: Current version on mirror (None if not exists)
+            
+        Returns:
+            The audit_and_build_aur result tuple for a skip, or None
+        """
+        info = self._aur_rpc_info.get(aur_package_name)
+        if not info or not remote_version or not self.vps_files:
+            return None
+        if info.get('PackageBase') != aur_package_name or aur_package_name.endswith(_VCS_SUFFIXES):
+            return None
+        
+        aur_version = info.get('Version')
+        if not aur_version or '-' not in aur_version:
+            return None
+        if (self.version_manager.normalize_version_string(aur_version)
+                != self.version_manager.normalize_version_string(remote_version)):
+            return None
+        
+        epoch, _, rest = aur_version.rpartition(':')
+        pkgver, pkgrel = rest.rsplit('-', 1)
+        epoch = epoch or None
+        pkg_names = self._aur_pkgnames.get(aur_package_name) or [aur_package_name]
+        
+        if not self._check_split_package_completeness(aur_package_name, pkg_names, pkgver, pkgrel, epoch):
+            return None
+        
+        logger.info(f"AUR_RPC_SKIP=1 pkg={aur_package_name} aur_ver={aur_version} remote_ver={remote_version} pkgnames={len(pkg_names)}")
+        self.version_tracker.register_split_packages(pkg_names, remote_version, is_built=False)
+        return False, aur_version, {
+            "pkgver": pkgver,
+            "pkgrel": pkgrel,
+            "epoch": epoch,
+            "pkgnames": pkg_names
+        }, None
+    
     def _extract_package_names(self, pkg_dir: Path) -> List[str]:
         """
         Extract all package names from PKGBUILD.
@@ -576,8 +923,61 @@ class PackageBuilder:
         # Fallback: use directory name
         return [pkg_dir.name]
     
+    def _fetch_aur_snapshot(self, pkg_name: str, target_dir: Path) -> bool:
+        """
+        Unpack the AUR cgit snapshot tarball of a package into target_dir.
+        
+        The tarball holds the same files as a checkout of the package
+        repository under a single top-level directory, which is stripped.
+        
+        Args:
+            pkg_name: AUR package (pkgbase) name
+            target_dir: Empty destination directory
+            
+        Returns:
+            True if a PKGBUILD was unpacked into target_dir
+        """
+        url = getattr(config, 'AUR_SNAPSHOT_URL',
+                      "https://aur.archlinux.org/cgit/aur.git/snapshot/{pkg_name}.tar.gz")
+        url = url.format(pkg_name=urllib.parse.quote(pkg_name))
+        try:
+            with urllib.request.urlopen(url, timeout=30) as response:
+                with tarfile.open(fileobj=response, mode='r|gz') as tar:
+                    for member in tar:
+                        _, _, rel_path = member.name.partition('/')
+                        parts = Path(rel_path).parts
+                        if not rel_path or Path(rel_path).is_absolute() or '..' in parts:
+                            continue
+                        if not (member.isfile() or member.isdir()):
+                            continue
+                        dest = target_dir / rel_path
+                        if member.isdir():
+                            dest.mkdir(parents=True, exist_ok=True)
+                            continue
+                        dest.parent.mkdir(parents=True, exist_ok=True)
+                        with tar.extractfile(member) as src, open(dest, 'wb') as dst:
+                            shutil.copyfileobj(src, dst)
+                        os.chmod(dest, member.mode & 0o755)
+        except Exception as e:
+            logger.warning(f"⚠️ AUR snapshot fetch failed for {pkg_name}: {e}")
+            return False
+        
+        if not (target_dir / "PKGBUILD").is_file():
+            # cgit serves unknown packages as an empty or HTML response
+            logger.warning(f"⚠️ AUR snapshot for {pkg_name} has no PKGBUILD")
+            return False
+        return True
+    
     def _clone_aur_package(self, pkg_name: str, target_dir: Path) -> bool:
         """Clone AUR package from Arch Linux AUR using GitClient."""
+        if getattr(config, 'AUR_SNAPSHOT_FETCH', True):
+            if self._fetch_aur_snapshot(pkg_name, target_dir):
+                logger.info(f"AUR_SNAPSHOT_OK=1 pkg={pkg_name}")
+                return True
+            # git clone needs an empty target
+            shutil.rmtree(target_dir, ignore_errors=True)
+            target_dir.mkdir(parents=True, exist_ok=True)
+        
         logger.info(f"📥 Cloning {pkg_name} from AUR")
         
         # Try different AUR URLs
@@ -589,8 +989,8 @@ class PackageBuilder:
         for aur_url in aur_urls:
             try:
                 # Use GitClient to clone
-                self.git_client.repo_url = aur_url
-                if self.git_client.clone_repository(str(target_dir), depth=1):
+                # Pass the URL per call: the shared GitClient is used by concurrent audits
+                if self.git_client.clone_repository(str(target_dir), depth=1, repo_url=aur_url):
                     logger.info(f"✅ Successfully cloned {pkg_name}")
                     return True
                 else:
@@ -601,6 +1001,84 @@ class PackageBuilder:
         logger.error(f"❌ Failed to clone {pkg_name} from any AUR URL")
         return False
     
+    def _ensure_srcdest(self) -> bool:
+        """Create the shared SRCDEST once and hand it to the builder user."""
+        with self._srcdest_lock:
+            if not self._srcdest_ready:
+                try:
+                    self.srcdest.mkdir(parents=True, exist_ok=True)
+                    subprocess.run(['chown', 'builder:builder', str(self.srcdest)], check=False)
+                    self._srcdest_ready = True
+                    logger.info(f"SRCDEST_READY=1 path={self.srcdest}")
+                except Exception as e:
+                    logger.warning(f"Could not prepare SRCDEST {self.srcdest}: {e}")
+            return self._srcdest_ready
+    
+    def _package_srcdest(self, pkg_name: str) -> Optional[Path]:
+        """
+        Per-package SRCDEST under the shared root.
+        
+        Concurrent prefetches of different packages never write the same
+        download target (makepkg downloads to a fixed .part name), and the
+        build of a package reads the sources its own prefetch verified.
+        
+        Args:
+            pkg_name: Package (base) name, used as the subdirectory name
+            
+        Returns:
+            Path of the package SRCDEST, or None if it could not be prepared
+        """
+        if not self._ensure_srcdest():
+            return None
+        path = self.srcdest / pkg_name
+        try:
+            path.mkdir(parents=True, exist_ok=True)
+            subprocess.run(['chown', 'builder:builder', str(path)], check=False)
+        except Exception as e:
+            logger.warning(f"Could not prepare SRCDEST {path}: {e}")
+            return None
+        return path
+    
+    def _prefetch_sources(self, pkg_dir: Path, pkg_name: str) -> bool:
+        """
+        Download and verify sources into the package SRCDEST outside the build lock.
+        
+        Runs makepkg --verifysource (no extraction, no prepare(), no deps), so
+        it can overlap another package's build. Failure is not fatal: the
+        build step downloads again (with retry) from the same SRCDEST.
+        
+        Args:
+            pkg_dir: Directory containing the PKGBUILD
+            pkg_name: Package name (for logging)
+            
+        Returns:
+            True if sources were prefetched, False otherwise
+        """
+        srcdest = self._package_srcdest(pkg_name)
+        if srcdest is None:
+            return False
+        
+        start_time = time.time()
+        try:
+            result = self.shell_executor.run_command_with_retry(
+                "makepkg --verifysource --noconfirm -d",
+                cwd=pkg_dir,
+                capture=True,
+                check=False,
+                timeout=600,
+                extra_env={"PACKAGER": self.packager_id, "SRCDEST": str(srcdest)},
+                max_retries=3,
+                initial_delay=2.0,
+                user="builder"
+            )
+            ok = result.returncode == 0
+        except Exception as e:
+            logger.warning(f"Source prefetch error for {pkg_name}: {e}")
+            ok = False
+        
+        logger.info(f"SOURCE_PREFETCH pkg={pkg_name} ok={int(ok)} seconds={time.time() - start_time:.1f}")
+        return ok
+    
     def _build_local_package(self, pkg_dir: Path, version: str) -> Tuple[List[str], str]:
         """Build local package using LocalBuilder and return list of built files and output."""
         try:
@@ -620,11 +1098,15 @@ class PackageBuilder:
                 build_flags += " --nocheck"
                 logger.info("   Skipping check for gtk2 (long)")
             
+            snapshot = self.artifact_manager.snapshot_packages(self.output_dir)
+            srcdest = self._package_srcdest(pkg_dir.name)
             build_result = self.local_builder.run_makepkg(
                 pkg_dir=str(pkg_dir),
                 packager_id=self.packager_id,
                 flags=build_flags,
-                timeout=3600
+                timeout=3600,
+                pkgdest=str(self.output_dir),
+                srcdest=str(srcdest) if srcdest else None
             )
             
             build_output = build_result.stdout if build_result else ""
@@ -633,8 +1115,10 @@ class PackageBuilder:
                 logger.error(f"❌ Build failed: {build_result.stderr[:500]}")
                 return [], build_output
             
-            # Move built packages to output directory and return list
-            built_files = self._move_built_packages(pkg_dir, pkg_dir.name, version)
+            # Packages were written straight into output_dir (PKGDEST)
+            built_files = self._record_built_packages(
+                self.artifact_manager.packages_changed_since(self.output_dir, snapshot)
+            )
             
             if built_files:
                 logger.info(f"✅ Successfully built {pkg_dir.name}")
@@ -661,20 +1145,22 @@ class PackageBuilder:
             logger.info("AUR_BUILDER_USED=1")
             
             # Use AURBuilder for the entire build process
+            srcdest = self._package_srcdest(pkg_name)
             built_files = self.aur_builder.build_aur_package(
                 pkg_name=pkg_name,
                 target_dir=pkg_dir,
                 packager_id=self.packager_id,
                 build_flags="-d --noconfirm --clean --nocheck",
-                timeout=3600
+                timeout=3600,
+                pkgdest=self.output_dir,
+                srcdest=srcdest
             )
             
             build_output = ""  # AURBuilder doesn't return output, would need to modify
             
             if built_files:
-                # Move built packages to output directory and return list
-                moved_files = self._move_built_packages(pkg_dir, pkg_name, version)
-                return moved_files, build_output
+                # Packages were written straight into output_dir (PKGDEST)
+                return self._record_built_packages(built_files), build_output
             else:
                 logger.error(f"❌ No package files created for {pkg_name}")
                 return [], build_output
@@ -683,27 +1169,12 @@ class PackageBuilder:
             logger.error(f"❌ Error building {pkg_name}: {e}")
             return [], ""
     
-    def _move_built_packages(self, source_dir: Path, pkg_name: str, version: str) -> List[str]:
-        """Move built packages to output directory and return list of moved files."""
-        moved_files = []
-        
-        for pkg_file in source_dir.glob("*.pkg.tar.*"):
-            # Skip signature files
-            if pkg_file.suffix == '.sig':
-                continue
-                
-            dest = self.output_dir / pkg_file.name
-            try:
-                shutil.move(str(pkg_file), str(dest))
-                logger.info(f"   Moved: {pkg_file.name}")
-                moved_files.append(pkg_file.name)
-                
-                # Also track for signing
-                self._recently_built_files.append(pkg_file.name)
-            except Exception as e:
-                logger.error(f"   Failed to move {pkg_file.name}: {e}")
-        
-        return moved_files
+    def _record_built_packages(self, built_files: List[str]) -> List[str]:
+        """Log packages makepkg wrote into output_dir and track them for signing."""
+        for name in built_files:
+            logger.info(f"   Built: {name}")
+            self._recently_built_files.append(name)
+        return built_files
     
     def _sign_built_packages(self, built_files: List[str], version: str):
         """
@@ -724,38 +1195,32 @@ class PackageBuilder:
         signed_count = 0
         failed_count = 0
         
-        # First, sign the files we just built
+        # Files we just built, plus cached/mirrored packages of this version
+        # that are still missing a signature; all are signed in one parallel batch
+        to_sign = []
+        labels = {}
         for built_file in built_files:
             pkg_file = self.output_dir / built_file
             if pkg_file.exists():
-                if self.gpg_handler.sign_package(str(pkg_file)):
-                    signed_count += 1
-                    logger.info(f"✅ Signed built package: {built_file}")
-                else:
-                    failed_count += 1
-                    logger.error(f"❌ Failed to sign built package: {built_file}")
+                to_sign.append(str(pkg_file))
+                labels[str(pkg_file)] = ("built package", built_file)
             else:
                 logger.warning(f"Built file not found in output_dir: {built_file}")
         
-        # Second, check for any other packages with this version that might be missing signatures
-        # This catches cached/mirrored packages that were skipped but need signatures
-        for pkg_file in self.output_dir.glob("*.pkg.tar.*"):
-            # Skip signature files
-            if pkg_file.suffix == '.sig':
-                continue
-            
-            # Check if this file has the version we just built/skipped
-            if version_in_filename in pkg_file.name:
-                sig_file = pkg_file.with_suffix(pkg_file.suffix + '.sig')
-                if not sig_file.exists():
-                    # This is a package with our version but no signature
-                    if pkg_file.name not in built_files:  # Not already signed above
-                        if self.gpg_handler.sign_package(str(pkg_file)):
-                            signed_count += 1
-                            logger.info(f"✅ Signed existing package: {pkg_file.name}")
-                        else:
-                            failed_count += 1
-                            logger.error(f"❌ Failed to sign existing package: {pkg_file.name}")
+        for pkg_file in ArtifactManager.unsigned_package_entries(self.output_dir):
+            # Unsigned package with the version we just built/skipped
+            if version_in_filename in pkg_file.name and pkg_file.name not in built_files:  # Not already signed above
+                to_sign.append(pkg_file.path)
+                labels[pkg_file.path] = ("existing package", pkg_file.name)
+        
+        for path, ok in self.gpg_handler.sign_packages(to_sign).items():
+            kind, name = labels[path]
+            if ok:
+                signed_count += 1
+                logger.info(f"✅ Signed {kind}: {name}")
+            else:
+                failed_count += 1
+                logger.error(f"❌ Failed to sign {kind}: {name}")
         
         if signed_count > 0:
             logger.info(f"✅ Signed {signed_count} packages for version {version}")
@@ -802,12 +1267,69 @@ class PackageBuilder:
             logger.error(f"Error extracting package metadata from {pkg_dir}: {e}")
             return None
     
+    def _order_local_packages_by_dependencies(
+        self,
+        local_packages: List[Tuple[Path, Optional[str]]]
+    ) -> Tuple[List[List[Tuple[Path, Optional[str]]]], Dict[str, Set[str]]]:
+        """
+        Group local packages into dependency waves.
+        
+        Dependencies are read from .SRCINFO (depends, makedepends, checkdepends)
+        and mapped onto local PKGBUILD directories via their pkgname entries.
+        Every package in a wave depends only on packages of earlier waves, so
+        a wave can be audited concurrently. Order inside a wave follows the
+        input order; cycle members are appended as single-package waves.
+        
+        Args:
+            local_packages: List of (pkg_dir, remote_version) tuples
+            
+        Returns:
+            Tuple of (list of waves, map pkg_dir name -> local dir names it depends on)
+        """
+        dep_installer = self.local_builder.dependency_installer
+        
+        # Map every produced pkgname to the directory that builds it
+        provider_dir: Dict[str, str] = {}
+        for pkg_dir, _ in local_packages:
+            for pkg_name in self._extract_package_names(pkg_dir):
+                provider_dir[pkg_name] = pkg_dir.name
+        
+        local_deps: Dict[str, Set[str]] = {}
+        for pkg_dir, _ in local_packages:
+            makedepends, checkdepends, depends = dep_installer.extract_dependencies(pkg_dir)
+            deps = set()
+            for dep in makedepends + checkdepends + depends:
+                dep_name = _DEP_CONSTRAINT_RE.split(dep, 1)[0].strip()
+                dir_name = provider_dir.get(dep_name)
+                if dir_name and dir_name != pkg_dir.name:
+                    deps.add(dir_name)
+            local_deps[pkg_dir.name] = deps
+        
+        # Kahn's algorithm, stable with respect to the input order
+        remaining = list(local_packages)
+        waves: List[List[Tuple[Path, Optional[str]]]] = []
+        done: Set[str] = set()
+        while remaining:
+            ready = [item for item in remaining if local_deps[item[0].name] <= done]
+            if not ready:
+                cycle = [item[0].name for item in remaining]
+                logger.warning(f"DEP_ORDER_CYCLE packages={cycle}")
+                waves.extend([item] for item in remaining)
+                break
+            waves.append(ready)
+            done.update(item[0].name for item in ready)
+            remaining = [item for item in remaining if item[0].name not in done]
+        
+        edges = sum(len(d) for d in local_deps.values())
+        logger.info(f"DEP_ORDER local_packages={len(local_packages)} local_edges={edges} waves={len(waves)}")
+        return waves, local_deps
+    
     def batch_audit_and_build(
         self,
         local_packages: List[Tuple[Path, Optional[str]]],
         aur_packages: List[Tuple[str, Optional[str]]],
         aur_build_dir: Optional[Path] = None
-    ) -> Tuple[List[str], List[str], List[str]]:
+    ) -> Tuple[List[Tuple[str, str]], List[Tuple[str, str]], List[str]]:
         """
         Batch audit and build multiple packages.
         
@@ -817,10 +1339,11 @@ class PackageBuilder:
             aur_build_dir: Directory for AUR builds (creates temp if None)
             
         Returns:
-            Tuple of (built_packages, skipped_packages, failed_packages)
+            Tuple of (built_packages, skipped_packages, failed_packages); built and
+            skipped entries are (name, version) tuples
         """
-        built_packages = []
-        skipped_packages = []
+        built_packages: List[Tuple[str, str]] = []
+        skipped_packages: List[Tuple[str, str]] = []
         failed_packages = []
         
         # Create AUR build directory if needed
@@ -828,54 +1351,115 @@ class PackageBuilder:
             aur_build_dir = Path(tempfile.mkdtemp(prefix="aur_build_"))
         aur_build_dir.mkdir(exist_ok=True, parents=True)
         
-        # Process local packages
-        logger.info(f"📦 Auditing {len(local_packages)} local packages...")
-        for pkg_dir, remote_version in local_packages:
+        # One batched RPC lookup for all AUR versions instead of a clone per
+        # package; started now so it overlaps the local package phase
+        rpc_executor = None
+        rpc_future = None
+        if aur_packages and getattr(config, 'AUR_RPC_PRECHECK', True):
+            rpc_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="aur-rpc")
+            rpc_future = rpc_executor.submit(self.aur_builder.fetch_rpc_info, [name for name, _ in aur_packages])
+        
+        # Local packages and AUR packages share one bounded pool: audits run
+        # concurrently, the build section itself is serialized by _build_lock
+        workers = int(getattr(config, 'BUILD_AUDIT_WORKERS', 1))
+        if workers <= 0:
+            workers = min(os.cpu_count() or 1, 4)
+        
+        # Process local packages in dependency waves; a rebuilt package marks
+        # its local dependents (always in a later wave) dirty so they are
+        # rebuilt against it
+        waves, local_deps = self._order_local_packages_by_dependencies(local_packages)
+        propagate = getattr(config, 'REBUILD_LOCAL_DEPENDENTS', True)
+        rebuilt_dirs: Set[str] = set()
+        
+        def process_local(pkg_dir: Path, remote_version: Optional[str], force: bool):
             try:
-                built, version, metadata, artifact_versions = self.audit_and_build_local(
-                    pkg_dir, remote_version
-                )
+                return self.audit_and_build_local(pkg_dir, remote_version, skip_check=force, bump_pkgrel=force)
+            except Exception as e:
+                logger.error(f"❌ Error processing local package {pkg_dir.name}: {e}")
+                return False, None, None, None
+        
+        logger.info(f"📦 Auditing {len(local_packages)} local packages (workers={workers})...")
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for wave in waves:
+                futures = []
+                for pkg_dir, remote_version in wave:
+                    dirty_deps = sorted(local_deps.get(pkg_dir.name, set()) & rebuilt_dirs) if propagate else []
+                    if dirty_deps:
+                        logger.info(f"DEP_PROPAGATE pkg={pkg_dir.name} rebuilt_deps={','.join(dirty_deps)} decision=BUILD")
+                    futures.append((pkg_dir, executor.submit(process_local, pkg_dir, remote_version, bool(dirty_deps))))
                 
-                if built:
-                    built_packages.append(f"{pkg_dir.name} ({version})")
-                    # Note: Target versions are now registered in audit_and_build_local
-                elif version:
-                    skipped_packages.append(f"{pkg_dir.name} ({version})")
-                    # Note: Skipped packages are now registered in audit_and_build_local
-                else:
-                    failed_packages.append(pkg_dir.name)
+                # Collect in submission order so reports stay deterministic
+                for pkg_dir, future in futures:
+                    built, version, metadata, artifact_versions = future.result()
                     
+                    if built:
+                        rebuilt_dirs.add(pkg_dir.name)
+                        built_packages.append((pkg_dir.name, version))
+                        # Note: Target versions are now registered in audit_and_build_local
+                    elif version:
+                        skipped_packages.append((pkg_dir.name, version))
+                        # Note: Skipped packages are now registered in audit_and_build_local
+                    else:
+                        failed_packages.append(pkg_dir.name)
+        
+        # Hand the local phase's results to the tracker in one batch
+        local_counts = (len(built_packages), len(skipped_packages), len(failed_packages))
+        if self.build_tracker:
+            self.build_tracker.record_results_batch(built_packages, skipped_packages, failed_packages, is_aur=False)
+        
+        # Process AUR packages: audits (clone, .SRCINFO, version/VCS checks) run
+        # concurrently on the same bounded pool size
+        logger.info(f"📦 Auditing {len(aur_packages)} AUR packages (workers={workers})...")
+        
+        # Collect the RPC prefetch started before the local phase
+        if rpc_future is not None:
+            try:
+                self._aur_rpc_info = rpc_future.result()
             except Exception as e:
-                logger.error(f"❌ Error processing local package {pkg_dir.name}: {e}")
-                failed_packages.append(pkg_dir.name)
+                logger.warning(f"AUR_RPC_PREFETCH_FAIL error={e}")
+                self._aur_rpc_info = {}
+            finally:
+                rpc_executor.shutdown(wait=False)
         
-        # Process AUR packages
-        logger.info(f"📦 Auditing {len(aur_packages)} AUR packages...")
-        for aur_name, remote_version in aur_packages:
+        def process_aur(aur_name: str, remote_version: Optional[str]):
             try:
-                built, version, metadata, artifact_versions = self.audit_and_build_aur(
-                    aur_name, remote_version, aur_build_dir
-                )
+                return self.audit_and_build_aur(aur_name, remote_version, aur_build_dir)
+            except Exception as e:
+                logger.error(f"❌ Error processing AUR package {aur_name}: {e}")
+                return False, None, None, None
+        
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                (aur_name, executor.submit(process_aur, aur_name, remote_version))
+                for aur_name, remote_version in aur_packages
+            ]
+            # Collect in submission order so reports stay deterministic
+            for aur_name, future in futures:
+                built, version, metadata, artifact_versions = future.result()
                 
                 if built:
-                    built_packages.append(f"{aur_name} ({version})")
+                    built_packages.append((aur_name, version))
                     # Note: Target versions are now registered in audit_and_build_aur
                 elif version:
-                    skipped_packages.append(f"{aur_name} ({version})")
+                    skipped_packages.append((aur_name, version))
                     # Note: Skipped packages are now registered in audit_and_build_aur
                 else:
                     failed_packages.append(aur_name)
-                    
-            except Exception as e:
-                logger.error(f"❌ Error processing AUR package {aur_name}: {e}")
-                failed_packages.append(aur_name)
         
-        # Cleanup temporary AUR build directory
-        try:
-            if aur_build_dir.exists():
-                shutil.rmtree(aur_build_dir, ignore_errors=True)
-        except Exception:
-            pass
+        if self.build_tracker:
+            self.build_tracker.record_results_batch(
+                built_packages[local_counts[0]:],
+                skipped_packages[local_counts[1]:],
+                failed_packages[local_counts[2]:],
+                is_aur=True
+            )
+        
+        # Finish background removal of per-package AUR work directories
+        self.drain_cleanup()
+        
+        # Cleanup temporary AUR build directory (missing directory is ignored)
+        shutil.rmtree(aur_build_dir, ignore_errors=True)
         
         return built_packages, skipped_packages, failed_packages
 
@@ -891,7 +1475,8 @@ def create_package_builder(
     debug_mode: bool = False,
     version_tracker = None,  # Added: VersionTracker for skipped package registration
     vps_files: Optional[List[str]] = None,  # NEW: VPS file inventory for completeness check
-    build_tracker = None  # NEW: BuildTracker for hokibot data
+    build_tracker = None,  # NEW: BuildTracker for hokibot data
+    state_dir: Optional[Path] = None  # NEW: Directory for the build cache index
 ) -> PackageBuilder:
     """
     Create a PackageBuilder instance with all dependencies.
@@ -907,6 +1492,7 @@ def create_package_builder(
         version_tracker: VersionTracker instance for tracking skipped packages
         vps_files: VPS file inventory for completeness check
         build_tracker: BuildTracker instance for hokibot data
+        state_dir: Directory for the build cache index (defaults to output_dir)
         
     Returns:
         PackageBuilder instance
@@ -943,5 +1529,6 @@ def create_package_builder(
         version_tracker=version_tracker,  # Pass version tracker
         debug_mode=debug_mode,
         vps_files=vps_files,  # NEW: Pass VPS file inventory
-        build_tracker=build_tracker  # NEW: Pass build tracker
+        build_tracker=build_tracker,  # NEW: Pass build tracker
+        state_dir=state_dir
     )
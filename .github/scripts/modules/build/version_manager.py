@@ -3,6 +3,8 @@ Version Manager Module - Handles version extraction, comparison, and management
 """
 
 import os
+import json
+import hashlib
 import subprocess
 import logging
 from pathlib import Path
@@ -12,23 +14,135 @@ import urllib.parse
 
 logger = logging.getLogger(__name__)
 
+# Version keys of a .SRCINFO, matched in one findall over the whole text
+_SRCINFO_VERSION_RE = re.compile(r'^\s*(pkgver|pkgrel|epoch)\s*=\s*(.*?)\s*$', re.MULTILINE)
+# Architecture suffix, stripped only as the final token
+_ARCH_SUFFIX_RE = re.compile(r'-(?:x86_64|any|i686|aarch64|armv7h|armv6h)$')
+# Package filename as printed by makepkg's "Finished making" lines
+_MAKEPKG_ARTIFACT_RE = re.compile(r'([a-zA-Z0-9_.-]+-([0-9]+:)?[a-zA-Z0-9_.+-]+-(?:x86_64|any|i686|aarch64|armv7h|armv6h)\.pkg\.tar\.(?:zst|xz))')
+# PKGBUILD shapes used by VCS detection and variable extraction
+_PKGVER_FUNC_RE = re.compile(r'^\s*pkgver\s*\(\)\s*\{', re.MULTILINE)
+_FUNC_DEF_RE = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*\s*\(\)\s*(?:\{|$)')
+_ASSIGNMENT_RE = re.compile(r'^([A-Za-z_][A-Za-z0-9_]*)=(.*)$')
+
+
+def _artifact_version_re(pkg_name: str) -> "re.Pattern":
+    """Pattern capturing the version of pkg_name's package files."""
+    return re.compile(rf'^{re.escape(pkg_name)}-(.+?)-(?:x86_64|any|i686|aarch64|armv7h|armv6h)\.pkg\.tar\.(?:zst|xz)$')
+
 
 class VersionManager:
     """Handles package version extraction, comparison, and management"""
     
+    def __init__(self):
+        # Parsed .SRCINFO versions keyed by (path, mtime_ns, size); a rewritten
+        # .SRCINFO gets a new key, so stale entries are never served
+        self._srcinfo_version_cache: Dict[Tuple[str, int, int], Tuple[str, str, Optional[str]]] = {}
+        # Persistent printsrcinfo results keyed by "<pkgdir>:<size>:<sha1 of PKGBUILD>"
+        # (content based, since fresh clones reset mtimes between runs)
+        self._meta_cache: Dict[str, Tuple[str, str, Optional[str]]] = {}
+        self._meta_cache_path: Optional[Path] = None
+        self._meta_cache_dirty = False
+        # git ls-remote results keyed by (url, branch); upstream heads are
+        # treated as fixed for the duration of one run
+        self._upstream_head_cache: Dict[Tuple[str, Optional[str]], Tuple[Optional[str], Optional[str]]] = {}
+    
+    def load_meta_cache(self, cache_path: Path) -> int:
+        """
+        Load the persistent version metadata cache (missing or corrupt file = cold cache).
+        
+        Args:
+            cache_path: JSON cache file location
+            
+        Returns:
+            Number of cached entries loaded
+        """
+        self._meta_cache_path = Path(cache_path)
+        try:
+            with open(self._meta_cache_path, 'r') as f:
+                raw = json.load(f)
+            self._meta_cache = {
+                key: (value[0], value[1], value[2])
+                for key, value in raw.items()
+                if isinstance(value, list) and len(value) == 3
+            }
+        except FileNotFoundError:
+            self._meta_cache = {}
+        except Exception as e:
+            logger.warning(f"META_CACHE_LOAD_FAIL=1 path={self._meta_cache_path} error={e}")
+            self._meta_cache = {}
+        logger.info(f"META_CACHE_ENTRIES={len(self._meta_cache)}")
+        return len(self._meta_cache)
+    
+    def save_meta_cache(self) -> bool:
+        """
+        Atomically write the metadata cache back (write temp file + os.replace).
+        
+        Returns:
+            True if written or nothing to write, False on error
+        """
+        if self._meta_cache_path is None or not self._meta_cache_dirty:
+            return True
+        tmp_path = self._meta_cache_path.with_name(self._meta_cache_path.name + ".tmp")
+        try:
+            self._meta_cache_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp_path, 'w') as f:
+                json.dump({key: list(value) for key, value in self._meta_cache.items()}, f)
+            os.replace(tmp_path, self._meta_cache_path)
+            self._meta_cache_dirty = False
+            logger.info(f"META_CACHE_SAVED={len(self._meta_cache)}")
+            return True
+        except Exception as e:
+            logger.warning(f"META_CACHE_SAVE_FAIL=1 path={self._meta_cache_path} error={e}")
+            return False
+    
+    @staticmethod
+    def _meta_cache_key(pkg_dir: Path) -> Optional[str]:
+        """Return the content-based cache key for a package dir, or None without a PKGBUILD."""
+        try:
+            with open(os.path.join(str(pkg_dir), "PKGBUILD"), 'rb') as f:
+                content = f.read()
+        except OSError:
+            return None
+        return f"{os.path.basename(str(pkg_dir))}:{len(content)}:{hashlib.sha1(content).hexdigest()}"
+    
+    @staticmethod
+    def _srcinfo_cache_key(srcinfo_path: Path) -> Optional[Tuple[str, int, int]]:
+        """Return the (path, mtime_ns, size) cache key, or None if the file is missing."""
+        try:
+            st = os.stat(srcinfo_path)
+        except OSError:
+            return None
+        return str(srcinfo_path), st.st_mtime_ns, st.st_size
+    
     def extract_version_from_srcinfo(self, pkg_dir: Path) -> Tuple[str, str, Optional[str]]:
-        """Extract pkgver, pkgrel, and epoch from .SRCINFO or makepkg --printsrcinfo output"""
+        """
+        Extract pkgver, pkgrel, and epoch from .SRCINFO or makepkg --printsrcinfo output.
+        Parsed results are memoized per .SRCINFO (path, mtime_ns, size).
+        """
         srcinfo_path = pkg_dir / ".SRCINFO"
         
-        # First try to read existing .SRCINFO
-        if srcinfo_path.exists():
+        # First try to read existing .SRCINFO (one stat doubles as the existence check)
+        cache_key = self._srcinfo_cache_key(srcinfo_path)
+        if cache_key is not None:
+            cached = self._srcinfo_version_cache.get(cache_key)
+            if cached is not None:
+                return cached
             try:
                 with open(srcinfo_path, 'r') as f:
                     srcinfo_content = f.read()
-                return self._parse_srcinfo_content(srcinfo_content)
+                version = self._parse_srcinfo_content(srcinfo_content)
+                self._srcinfo_version_cache[cache_key] = version
+                return version
             except Exception as e:
                 logger.warning(f"Failed to parse existing .SRCINFO: {e}")
         
+        # No .SRCINFO: a previous run may already have evaluated this exact PKGBUILD
+        meta_key = self._meta_cache_key(pkg_dir) if self._meta_cache_path is not None else None
+        if meta_key is not None and meta_key in self._meta_cache:
+            logger.info(f"META_CACHE_HIT=1 pkg={pkg_dir.name}")
+            return self._meta_cache[meta_key]
+        
         # Generate .SRCINFO using makepkg --printsrcinfo
         try:
             result = subprocess.run(
@@ -43,7 +157,14 @@ class VersionManager:
                 # Also write to .SRCINFO for future use
                 with open(srcinfo_path, 'w') as f:
                     f.write(result.stdout)
-                return self._parse_srcinfo_content(result.stdout)
+                version = self._parse_srcinfo_content(result.stdout)
+                cache_key = self._srcinfo_cache_key(srcinfo_path)
+                if cache_key is not None:
+                    self._srcinfo_version_cache[cache_key] = version
+                if meta_key is not None:
+                    self._meta_cache[meta_key] = version
+                    self._meta_cache_dirty = True
+                return version
             else:
                 logger.warning(f"makepkg --printsrcinfo failed: {result.stderr}")
                 raise RuntimeError(f"Failed to generate .SRCINFO: {result.stderr}")
@@ -54,29 +175,11 @@ class VersionManager:
     
     def _parse_srcinfo_content(self, srcinfo_content: str) -> Tuple[str, str, Optional[str]]:
         """Parse SRCINFO content to extract version information"""
-        pkgver = None
-        pkgrel = None
-        epoch = None
-        
-        lines = srcinfo_content.strip().split('\n')
-        
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-            
-            # Handle key-value pairs
-            if '=' in line:
-                key, value = line.split('=', 1)
-                key = key.strip()
-                value = value.strip()
-                
-                if key == 'pkgver':
-                    pkgver = value
-                elif key == 'pkgrel':
-                    pkgrel = value
-                elif key == 'epoch':
-                    epoch = value
+        # Later occurrences win, as with the previous line-by-line parse
+        fields = dict(_SRCINFO_VERSION_RE.findall(srcinfo_content))
+        pkgver = fields.get('pkgver')
+        pkgrel = fields.get('pkgrel')
+        epoch = fields.get('epoch')
         
         if not pkgver or not pkgrel:
             raise ValueError("Could not extract pkgver and pkgrel from .SRCINFO")
@@ -104,9 +207,7 @@ class VersionManager:
             
         # Remove known architecture suffixes from the end
         # These are only stripped if they appear as the final token
-        arch_patterns = [r'-x86_64$', r'-any$', r'-i686$', r'-aarch64$', r'-armv7h$', r'-armv6h$']
-        for pattern in arch_patterns:
-            version_string = re.sub(pattern, '', version_string)
+        version_string = _ARCH_SUFFIX_RE.sub('', version_string)
         
         # Ensure epoch format: if no epoch, prepend "0:"
         if ':' not in version_string:
@@ -134,13 +235,14 @@ class VersionManager:
         artifact_versions = {}
         
         for pkg_name in pkg_names:
+            version_re = _artifact_version_re(pkg_name)
             for built_file in built_files:
                 # Skip signature files
                 if built_file.endswith('.sig'):
                     continue
                 
                 # Parse version from filename
-                match = re.match(rf'^{re.escape(pkg_name)}-(.+?)-(?:x86_64|any|i686|aarch64|armv7h|armv6h)\.pkg\.tar\.(?:zst|xz)$', built_file)
+                match = version_re.match(built_file)
                 if match:
                     version = match.group(1)
                     artifact_versions[pkg_name] = version
@@ -163,18 +265,23 @@ class VersionManager:
         """
         artifact_versions = {}
         
+        # One scandir for all packages instead of a glob per package
+        try:
+            with os.scandir(output_dir) as entries:
+                artifact_names = [e.name for e in entries if '.pkg.tar.' in e.name and not e.name.endswith('.sig')]
+        except FileNotFoundError:
+            artifact_names = []
+        
         for pkg_name in pkg_names:
             # Collect ALL matching artifacts for this package
             candidates = []
             bad_candidates = 0
+            prefix = f"{pkg_name}-"
+            version_re = _artifact_version_re(pkg_name)
             
-            for artifact in output_dir.glob(f"{pkg_name}-*.pkg.tar.*"):
-                # Skip signature files
-                if artifact.name.endswith('.sig'):
-                    continue
-                
+            for artifact in (output_dir / name for name in artifact_names if name.startswith(prefix)):
                 # Parse version from filename
-                match = re.match(rf'^{re.escape(pkg_name)}-(.+?)-(?:x86_64|any|i686|aarch64|armv7h|armv6h)\.pkg\.tar\.(?:zst|xz)$', artifact.name)
+                match = version_re.match(artifact.name)
                 if match:
                     version = match.group(1)
                     candidates.append((artifact, version))
@@ -245,7 +352,7 @@ class VersionManager:
         for line in lines:
             if '==> Finished making:' in line or '==> Finished creating package' in line:
                 # Extract package filename and parse version
-                match = re.search(r'([a-zA-Z0-9_.-]+-([0-9]+:)?[a-zA-Z0-9_.+-]+-(?:x86_64|any|i686|aarch64|armv7h|armv6h)\.pkg\.tar\.(?:zst|xz))', line)
+                match = _MAKEPKG_ARTIFACT_RE.search(line)
                 if match:
                     filename = match.group(1)
                     # Parse version from filename
@@ -278,8 +385,8 @@ class VersionManager:
         Returns:
             Tuple of (is_vcs: bool, reason: str)
         """
-        pkgbuild_path = pkg_dir / "PKGBUILD"
-        if not pkgbuild_path.exists():
+        pkgbuild_path = os.path.join(str(pkg_dir), "PKGBUILD")
+        if not os.path.exists(pkgbuild_path):
             return False, "no_pkgbuild"
         
         try:
@@ -287,7 +394,7 @@ class VersionManager:
                 pkgbuild_content = f.read()
             
             # Check for pkgver() function
-            has_pkgver_fn = bool(re.search(r'^\s*pkgver\s*\(\)\s*\{', pkgbuild_content, re.MULTILINE))
+            has_pkgver_fn = bool(_PKGVER_FUNC_RE.search(pkgbuild_content))
             
             # Check for at least one git source URL in the source=() array.
             # We reuse _parse_git_source_from_pkgbuild which already handles
@@ -381,8 +488,7 @@ class VersionManager:
                 # Track function bodies so we don't treat locals as top-level
                 # assignments.
                 if not in_function:
-                    if re.match(r'^[A-Za-z_][A-Za-z0-9_]*\s*\(\)\s*\{?\s*$', stripped) or \
-                       re.match(r'^[A-Za-z_][A-Za-z0-9_]*\s*\(\)\s*\{', stripped):
+                    if _FUNC_DEF_RE.match(stripped):
                         in_function = True
                         brace_depth = stripped.count('{') - stripped.count('}')
                         continue
@@ -395,7 +501,7 @@ class VersionManager:
                 if not stripped or stripped.startswith('#'):
                     continue
                 
-                m = re.match(r'^([A-Za-z_][A-Za-z0-9_]*)=(.*)$', stripped)
+                m = _ASSIGNMENT_RE.match(stripped)
                 if not m:
                     continue
                 name = m.group(1)
@@ -685,6 +791,30 @@ class VersionManager:
         return git_url
     
     def _get_upstream_head_commit(self, git_url: str, pkg_name: str, branch: Optional[str] = None) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Get upstream HEAD commit hash, memoized per (url, branch) for the run.
+        
+        Split and sibling VCS packages often track the same upstream; each
+        repository/ref pair is queried with git ls-remote only once.
+        
+        Args:
+            git_url: Git repository URL
+            pkg_name: Package name for logging
+            branch: Optional branch name (defaults to HEAD)
+            
+        Returns:
+            Tuple of (full_commit_hash, short_commit_hash) or (None, None) if failed
+        """
+        key = (git_url, branch)
+        cached = self._upstream_head_cache.get(key)
+        if cached is not None:
+            logger.info(f"VCS_UPSTREAM_CACHE_HIT=1 pkg={pkg_name} url={self._sanitize_git_url(git_url)} commit={cached[1] or 'NONE'}")
+            return cached
+        result = self._query_upstream_head_commit(git_url, pkg_name, branch)
+        self._upstream_head_cache[key] = result
+        return result
+    
+    def _query_upstream_head_commit(self, git_url: str, pkg_name: str, branch: Optional[str] = None) -> Tuple[Optional[str], Optional[str]]:
         """
         Get upstream HEAD commit hash using git ls-remote.
         
@@ -852,8 +982,8 @@ class VersionManager:
             Tuple of (hash_source, full_hash) where full_hash is the exact
             hash string (7-40 hex characters) from the PKGBUILD.
         """
-        pkgbuild_path = pkg_dir / "PKGBUILD"
-        if not pkgbuild_path.exists():
+        pkgbuild_path = os.path.join(str(pkg_dir), "PKGBUILD")
+        if not os.path.exists(pkgbuild_path):
             return None, None
         
         try:
@@ -914,8 +1044,8 @@ class VersionManager:
         pkg_name = pkg_dir.name
         
         try:
-            pkgbuild_path = pkg_dir / "PKGBUILD"
-            if not pkgbuild_path.exists():
+            pkgbuild_path = os.path.join(str(pkg_dir), "PKGBUILD")
+            if not os.path.exists(pkgbuild_path):
                 logger.info(f"VCS_UPSTREAM_CHECK=0 pkg={pkg_name} reason=no_pkgbuild fallback=version_compare")
                 return False, "no_pkgbuild"
             
@@ -165,6 +165,13 @@ class ConfigLoader:
                 'aur_urls': getattr(config_module, 'AUR_URLS', ["https://aur.archlinux.org/{pkg_name}.git", "git://aur.archlinux.org/{pkg_name}.git"]),
                 'aur_build_dir': getattr(config_module, 'AUR_BUILD_DIR', 'build_aur'),
                 'ssh_options': getattr(config_module, 'SSH_OPTIONS', ["-o", "StrictHostKeyChecking=no", "-o", "ConnectTimeout=30", "-o", "BatchMode=yes"]),
+                'ssh_control_path': getattr(config_module, 'SSH_CONTROL_PATH', '/tmp/ssh-cm-%C'),
+                'ssh_control_persist': getattr(config_module, 'SSH_CONTROL_PERSIST', 600),
+                'rsync_upload_streams': getattr(config_module, 'RSYNC_UPLOAD_STREAMS', 4),
+                'rsync_mirror_streams': getattr(config_module, 'RSYNC_MIRROR_STREAMS', 4),
+                'manifest_fetch_workers': getattr(config_module, 'MANIFEST_FETCH_WORKERS', 8),
+                'remote_inventory_cache': getattr(config_module, 'REMOTE_INVENTORY_CACHE', True),
+                'remote_inventory_max_age': getattr(config_module, 'REMOTE_INVENTORY_MAX_AGE', 7 * 24 * 3600),
                 'github_repo': os.getenv('GITHUB_REPOSITORY', getattr(config_module, 'GITHUB_REPO', '')),
                 'debug_mode': getattr(config_module, 'DEBUG_MODE', False),
                 'sign_packages': getattr(config_module, 'SIGN_PACKAGES', True),
@@ -179,6 +186,13 @@ class ConfigLoader:
                 'aur_urls': ["https://aur.archlinux.org/{pkg_name}.git", "git://aur.archlinux.org/{pkg_name}.git"],
                 'aur_build_dir': 'build_aur',
                 'ssh_options': ["-o", "StrictHostKeyChecking=no", "-o", "ConnectTimeout=30", "-o", "BatchMode=yes"],
+                'ssh_control_path': '/tmp/ssh-cm-%C',
+                'ssh_control_persist': 600,
+                'rsync_upload_streams': 4,
+                'rsync_mirror_streams': 4,
+                'manifest_fetch_workers': 8,
+                'remote_inventory_cache': True,
+                'remote_inventory_max_age': 7 * 24 * 3600,
                 'github_repo': os.getenv('GITHUB_REPOSITORY', ''),
                 'debug_mode': False,
                 'sign_packages': True,
@@ -3,16 +3,46 @@ Dependency Installer Module - CI-safe dependency installation with fallback
 Now with per-package session tracking + conflict resolution.
 """
 
+import os
 import re
 import time
+import shlex
 import logging
-from typing import List, Tuple, Optional, Dict, Set
+from typing import Callable, List, Tuple, Optional, Dict, Set
 from pathlib import Path
 
 import config  # for INSTALL_RUNTIME_DEPS_IN_CI and CONFLICT_REMOVE_ALLOWLIST
 
 logger = logging.getLogger(__name__)
 
+# Compiled once at import: version constraint suffix, alnum probe, and the
+# pacman/yay/makepkg "missing dependency" messages (one group per form)
+_VERSION_CONSTRAINT_RE = re.compile(r'[<=>].*')
+_ALNUM_RE = re.compile(r'[a-zA-Z0-9]')
+_MISSING_DEP_RE = re.compile(
+    r"error: target not found: (\S+)|:: Unable to find (\S+)|makepkg: cannot find the '([^']+)'"
+)
+
+
+def pacman_sync_age() -> Optional[float]:
+    """
+    Seconds since the newest pacman sync database was written, or None if
+    there are no sync databases yet.
+    
+    Uses max(mtime, ctime): pacman stamps downloaded databases with the
+    server's Last-Modified time, which moves mtime into the past but
+    updates ctime to the moment of the sync.
+    """
+    try:
+        with os.scandir('/var/lib/pacman/sync') as entries:
+            stats = [entry.stat() for entry in entries if entry.name.endswith('.db')]
+    except OSError:
+        return None
+    if not stats:
+        return None
+    newest = max(max(st.st_mtime, st.st_ctime) for st in stats)
+    return time.time() - newest
+
 
 class DependencyInstaller:
     """CI-safe dependency installer with pacman -> yay fallback and session cleanup"""
@@ -130,13 +160,28 @@ class DependencyInstaller:
         else:
             return "unknown"
     
+    @staticmethod
+    def extract_missing_dependencies(output: str) -> Set[str]:
+        """
+        Collect dependency names reported as missing in pacman/yay/makepkg output.
+        
+        Args:
+            output: Combined stdout/stderr text
+            
+        Returns:
+            Set of missing package names (single regex pass)
+        """
+        if not output:
+            return set()
+        return {name for match in _MISSING_DEP_RE.finditer(output) for name in match.groups() if name}
+    
     def _clean_package_names(self, packages: List[str]) -> List[str]:
-        """Clean and validate package names"""
-        clean_deps = []
+        """Clean and validate package names (deduplicated, sorted for a deterministic command line)"""
+        clean_deps: Set[str] = set()
         
         for dep in packages:
             # Remove version constraints
-            dep_clean = re.sub(r'[<=>].*', '', dep).strip()
+            dep_clean = _VERSION_CONSTRAINT_RE.sub('', dep).strip()
             
             # Skip empty or malformed
             if not dep_clean or not dep_clean.strip():
@@ -147,27 +192,18 @@ class DependencyInstaller:
                 continue
             
             # Must contain at least one alphanumeric character
-            if not re.search(r'[a-zA-Z0-9]', dep_clean):
+            if not _ALNUM_RE.search(dep_clean):
                 continue
             
             # Handle known phantom packages
             if dep_clean == 'lgi':
                 logger.warning("⚠️ Found phantom package 'lgi' - will be replaced with 'lua-lgi'")
-                if 'lua-lgi' not in clean_deps:
-                    clean_deps.append('lua-lgi')
+                clean_deps.add('lua-lgi')
                 continue
             
-            clean_deps.append(dep_clean)
+            clean_deps.add(dep_clean)
         
-        # Remove duplicates while preserving order
-        seen = set()
-        unique_deps = []
-        for dep in clean_deps:
-            if dep not in seen:
-                seen.add(dep)
-                unique_deps.append(dep)
-        
-        return unique_deps
+        return sorted(clean_deps)
     
     def _handle_conflicts(self, packages: List[str]) -> bool:
         """
@@ -230,14 +266,29 @@ class DependencyInstaller:
         Returns:
             True if installation successful, False otherwise
         """
+        return self._install_packages(packages, allow_aur, mode)[0]
+    
+    def _install_packages(self, packages: List[str], allow_aur: bool, mode: str) -> Tuple[bool, bool]:
+        """
+        Body of install_packages that also reports whether a transaction ran.
+        
+        Args:
+            packages: List of package names to install
+            allow_aur: Whether to allow fallback to AUR (yay)
+            mode: Installation mode ("build" or "runtime")
+            
+        Returns:
+            Tuple of (success, installed) where installed is False when
+            nothing needed installing (everything already satisfied)
+        """
         if not packages:
-            return True
+            return True, False
         
         clean_packages = self._clean_package_names(packages)
         
         if not clean_packages:
             logger.info("No valid packages to install after cleaning")
-            return True
+            return True, False
         
         # --- Deterministic provider resolution ---
         # Replace any exact match from PROVIDER_MAP
@@ -252,10 +303,21 @@ class DependencyInstaller:
         clean_packages = resolved_packages
         # -----------------------------------------
         
+        # --- Pre-resolve: one pacman -T drops already satisfied entries ---
+        # so a fully satisfied build skips the pacman transaction entirely
+        if mode == "build":
+            unsatisfied = self.find_unsatisfied_dependencies(clean_packages)
+            if not unsatisfied:
+                logger.info(f"DEP_INSTALL_SKIP=1 reason=all_satisfied count={len(clean_packages)}")
+                return True, False
+            if len(unsatisfied) < len(clean_packages):
+                logger.info(f"DEP_PRERESOLVE satisfied={len(clean_packages) - len(unsatisfied)} missing={len(unsatisfied)}")
+            clean_packages = unsatisfied
+        
         # --- Conflict resolution ---
         if not self._handle_conflicts(clean_packages):
             logger.error("Conflict resolution failed, aborting installation")
-            return False
+            return False, False
         
         logger.info(f"DEP_INSTALL_START=1 count={len(clean_packages)} mode={mode}")
         
@@ -264,7 +326,15 @@ class DependencyInstaller:
         
         # --- FIRST ATTEMPT: Try pacman ---
         logger.info(f"DEP_INSTALL_ATTEMPT=1 manager=pacman")
-        cmd = f"sudo LC_ALL=C pacman -Sy --needed --noconfirm --ask=4 {pkgs_str}"
+        # Sync databases refreshed within PACMAN_SYNC_TTL (post-repo-enable -Sy
+        # or an earlier install) are reused: -S avoids re-downloading every
+        # repo database on each dependency install
+        ttl = getattr(config, 'PACMAN_SYNC_TTL', 900)
+        age = pacman_sync_age()
+        sync_flag = '-S' if age is not None and age < ttl else '-Sy'
+        if sync_flag == '-S':
+            logger.info(f"PACMAN_SYNC_SKIP=1 reason=fresh age={int(age)}s ttl={ttl}s")
+        cmd = ['sudo', 'LC_ALL=C', 'pacman', sync_flag, '--needed', '--noconfirm', '--ask=4', *clean_packages]
         
         result = self.shell_executor.run_command(
             cmd,
@@ -275,18 +345,19 @@ class DependencyInstaller:
         
         if result.returncode == 0:
             logger.info(f"DEP_INSTALL_OK=1 manager=pacman count={len(clean_packages)}")
-            return True
+            return True, True
         
         # Analyze failure
         combined_output = result.stdout + "\n" + result.stderr
         failure_reason = self._detect_failure_reason(combined_output)
         
-        logger.warning(f"DEP_INSTALL_PACMAN_FAIL=1 reason={failure_reason} exitcode={result.returncode}")
+        missing = self.extract_missing_dependencies(combined_output)
+        logger.warning(f"DEP_INSTALL_PACMAN_FAIL=1 reason={failure_reason} exitcode={result.returncode} missing={','.join(sorted(missing)) or 'NONE'}")
         
         # Don't fallback to yay if AUR not allowed
         if not allow_aur:
             logger.error("DEP_INSTALL_YAY_SKIP=1 reason=aur_not_allowed")
-            return False
+            return False, False
         
         # --- SECOND ATTEMPT: Fallback to yay ---
         logger.info(f"DEP_INSTALL_ATTEMPT=2 manager=yay")
@@ -304,14 +375,15 @@ class DependencyInstaller:
         
         if result.returncode == 0:
             logger.info(f"DEP_INSTALL_OK=1 manager=yay count={len(clean_packages)}")
-            return True
+            return True, True
         
         # Analyze yay failure
         yay_output = result.stdout + "\n" + result.stderr
         yay_failure_reason = self._detect_failure_reason(yay_output)
         
-        logger.error(f"DEP_INSTALL_YAY_FAIL=1 reason={yay_failure_reason} exitcode={result.returncode}")
-        return False
+        missing = self.extract_missing_dependencies(yay_output)
+        logger.error(f"DEP_INSTALL_YAY_FAIL=1 reason={yay_failure_reason} exitcode={result.returncode} missing={','.join(sorted(missing)) or 'NONE'}")
+        return False, False
     
     def extract_dependencies(self, pkg_dir: Path) -> Tuple[List[str], List[str], List[str]]:
         """
@@ -383,4 +455,108 @@ class DependencyInstaller:
                 elif key == 'depends':
                     depends.append(value)
         
-        return makedepends, checkdepends, depends
\ No newline at end of file
+        return makedepends, checkdepends, depends
+    
+    def find_unsatisfied_dependencies(self, dependencies: List[str]) -> List[str]:
+        """
+        Return the dependencies that are not satisfied on the system.
+        Uses a single `pacman -T` call, which prints only unsatisfied entries.
+        
+        Args:
+            dependencies: Dependency strings (version constraints allowed)
+            
+        Returns:
+            List of unsatisfied dependency strings
+        """
+        if not dependencies:
+            return []
+        
+        cmd = "LC_ALL=C pacman -T " + " ".join(shlex.quote(d) for d in dependencies)
+        result = self.shell_executor.run_command(cmd, log_cmd=False, check=False, timeout=60)
+        
+        # pacman -T: rc 0 = all satisfied, rc 127 = some unsatisfied (listed on stdout)
+        if result.returncode == 0:
+            return []
+        if result.returncode == 127:
+            return sorted({line.strip() for line in (result.stdout or "").splitlines() if line.strip()})
+        
+        logger.warning(f"DEP_CHECK_FAIL rc={result.returncode}, assuming all dependencies unsatisfied")
+        return list(dependencies)
+    
+    def install_missing_declared_dependencies(self, pkg_dir: Path) -> bool:
+        """
+        Install declared dependencies (depends/makedepends/checkdepends) of a
+        package that are not yet satisfied, in one batched install.
+        Used as the fallback after a failed makepkg run.
+        
+        Args:
+            pkg_dir: Path to package directory
+            
+        Returns:
+            True if missing dependencies were found and installed (a retry is
+            worthwhile), False otherwise
+        """
+        makedepends, checkdepends, depends = self.extract_dependencies(pkg_dir)
+        declared: Set[str] = set(makedepends)
+        declared.update(checkdepends)
+        declared.update(depends)
+        missing = self.find_unsatisfied_dependencies(sorted(declared))
+        
+        if not missing:
+            logger.info(f"DEP_FALLBACK_SKIP=1 pkg={pkg_dir.name} reason=all_declared_deps_satisfied declared={len(declared)}")
+            return False
+        
+        logger.info(f"DEP_FALLBACK_INSTALL=1 pkg={pkg_dir.name} missing={len(missing)} deps={' '.join(missing)}")
+        ok, installed = self._install_packages(missing, allow_aur=True, mode="build")
+        return ok and installed
+    
+    def retry_build_with_dependency_fixes(self, result, run_build: Callable, pkg_dir: Path):
+        """
+        Shared makepkg failure fallback for local and AUR builds.
+        
+        Scans the failed build output once and retries the build ONCE per fix:
+        1. missing yasm binary -> install yasm
+        2. dependencies reported missing in the output (single regex pass), or
+           otherwise any unsatisfied declared dependency (pacman -T)
+        
+        Args:
+            result: CompletedProcess of the failed makepkg run
+            run_build: Zero-argument callable that re-runs makepkg
+            pkg_dir: Package directory (PKGBUILD/.SRCINFO location)
+            
+        Returns:
+            CompletedProcess of the last makepkg run
+        """
+        if result.returncode == 0:
+            return result
+        
+        error_output = (result.stderr or "") + "\n" + (result.stdout or "")
+        if "yasm: No such file or directory" in error_output:
+            logger.info("BUILD_TOOL_AUTOINSTALL=1 tool=yasm reason=missing_binary")
+            ok, installed = self._install_packages(["yasm"], allow_aur=True, mode="build")
+            if ok and installed:
+                logger.info("Retrying makepkg after installing yasm...")
+                result = run_build()
+                if result.returncode == 0:
+                    return result
+                error_output = (result.stderr or "") + "\n" + (result.stdout or "")
+            elif not ok:
+                logger.error("Failed to install yasm, cannot retry build")
+        
+        reported = self.extract_missing_dependencies(error_output)
+        if reported:
+            logger.info(f"DEP_FALLBACK_INSTALL=1 pkg={pkg_dir.name} source=build_output deps={' '.join(sorted(reported))}")
+            ok, installed = self._install_packages(sorted(reported), allow_aur=True, mode="build")
+            installed = ok and installed
+        else:
+            installed = self.install_missing_declared_dependencies(pkg_dir)
+        
+        # Retry only after something was actually installed; an already
+        # satisfied dependency set means the failure is a real build error
+        if installed:
+            logger.info("Retrying makepkg after installing missing dependencies...")
+            result = run_build()
+        else:
+            logger.info(f"DEP_FALLBACK_NO_RETRY=1 pkg={pkg_dir.name} reason=nothing_installed")
+        
+        return result
@@ -7,6 +7,8 @@ import sys
 import re
 import logging
 
+from modules.common.logging_utils import section_header
+
 logger = logging.getLogger(__name__)
 
 
@@ -16,9 +18,7 @@ class EnvironmentValidator:
     @staticmethod
     def validate_env() -> None:
         """Comprehensive pre-flight environment validation - check for all required variables"""
-        print("\n" + "=" * 60)
-        print("PRE-FLIGHT ENVIRONMENT VALIDATION")
-        print("=" * 60)
+        print(section_header("PRE-FLIGHT ENVIRONMENT VALIDATION"))
         
         required_vars = [
             'REPO_NAME',
@@ -4,6 +4,14 @@ Logging Utilities Module - Configures and manages logging
 
 import logging
 
+# Horizontal rule used by console section headers
+_HR = "=" * 60
+
+
+def section_header(title: str) -> str:
+    """Return a ruled console header as one string, so it is emitted with a single write."""
+    return f"\n{_HR}\n{title}\n{_HR}"
+
 
 def setup_logging():
     """Configure logging for the application"""
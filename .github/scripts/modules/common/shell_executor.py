@@ -3,9 +3,12 @@ Shell Executor Module - Handles shell command execution with comprehensive loggi
 """
 
 import os
+import signal
 import subprocess
+import threading
 import time
 import logging
+from collections import deque
 from pathlib import Path
 import shlex
 
@@ -104,14 +107,103 @@ class ShellExecutor:
         # Should never reach here
         raise last_exception or RuntimeError("Max retries exceeded")
     
+    @staticmethod
+    def _run_streaming(args, shell, cwd, env, check, timeout, tail_lines: int) -> subprocess.CompletedProcess:
+        """
+        Run a command while draining stdout/stderr line by line, keeping only
+        the last tail_lines lines of each stream in memory.
+        
+        Mirrors subprocess.run(capture_output=True, text=True): raises
+        TimeoutExpired after killing the process, CalledProcessError if check.
+        """
+        proc = subprocess.Popen(
+            args,
+            shell=shell,
+            cwd=cwd,
+            env=env,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            errors='replace',
+            bufsize=1 << 16,
+            # Own process group, so a timeout can kill the whole tree
+            # (sudo -> makepkg -> compilers), not just the direct child
+            start_new_session=True
+        )
+        tails = {'stdout': deque(maxlen=tail_lines), 'stderr': deque(maxlen=tail_lines)}
+        
+        def drain(stream, tail):
+            for line in stream:
+                tail.append(line)
+            stream.close()
+        
+        readers = [
+            threading.Thread(target=drain, args=(proc.stdout, tails['stdout']), daemon=True),
+            threading.Thread(target=drain, args=(proc.stderr, tails['stderr']), daemon=True),
+        ]
+        for reader in readers:
+            reader.start()
+        
+        try:
+            returncode = proc.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            try:
+                os.killpg(proc.pid, signal.SIGKILL)
+            except (ProcessLookupError, PermissionError):
+                proc.kill()
+            proc.wait()
+            # A descendant that escaped the group may still hold the pipes
+            # open; never let the drain threads block the timeout path
+            for reader in readers:
+                reader.join(timeout=10)
+            raise subprocess.TimeoutExpired(args, timeout, ''.join(tails['stdout']), ''.join(tails['stderr']))
+        
+        for reader in readers:
+            reader.join()
+        
+        stdout = ''.join(tails['stdout'])
+        stderr = ''.join(tails['stderr'])
+        if check and returncode != 0:
+            raise subprocess.CalledProcessError(returncode, args, stdout, stderr)
+        return subprocess.CompletedProcess(args, returncode, stdout, stderr)
+    
+    def _execute(self, args, shell, cwd, env, capture, check, timeout, tail_lines):
+        """Dispatch to subprocess.run, or to the bounded streaming reader when tail_lines is set."""
+        if capture and tail_lines:
+            return self._run_streaming(args, shell, cwd, env, check, timeout, tail_lines)
+        return subprocess.run(
+            args,
+            cwd=cwd,
+            shell=shell,
+            capture_output=capture,
+            text=True,
+            check=check,
+            env=env,
+            timeout=timeout
+        )
+    
     def run_command(self, cmd, cwd=None, capture=True, check=True, shell=True, user=None, 
-                   log_cmd=False, timeout=1800, extra_env=None):
-        """Run command with comprehensive logging, timeout, and optional extra environment variables"""
+                   log_cmd=False, timeout=1800, extra_env=None, tail_lines=None):
+        """
+        Run command with comprehensive logging, timeout, and optional extra environment variables.
+        
+        When tail_lines is set (and capture is True), output is streamed and only
+        the last tail_lines lines of stdout/stderr are kept, bounding memory for
+        very chatty commands such as makepkg.
+        
+        cmd may be a shell string or an argv list; a list always runs with
+        shell=False, skipping the intermediate /bin/sh and its quoting rules.
+        """
+        if isinstance(cmd, (list, tuple)):
+            cmd = [str(arg) for arg in cmd]
+            shell = False
+        cmd_display = cmd if isinstance(cmd, str) else shlex.join(cmd)
+        
         if log_cmd or self.debug_mode:
             if self.debug_mode:
-                print(f"🔧 [SHELL DEBUG] RUNNING COMMAND: {cmd}", flush=True)
+                print(f"🔧 [SHELL DEBUG] RUNNING COMMAND: {cmd_display}", flush=True)
             else:
-                logger.info(f"RUNNING COMMAND: {cmd}")
+                logger.info(f"RUNNING COMMAND: {cmd_display}")
         
         if cwd is None:
             cwd = Path.cwd()
@@ -141,31 +233,17 @@ class ShellExecutor:
                 # Full sudo command with explicit env and cd
                 sudo_cmd = f'sudo -u {user} bash -c "cd {shlex.quote(str(cwd))} && {env_prefix}{cmd}"'
             else:
-                # For non-shell commands, we cannot use env prefix easily; fallback to original method
+                # Argv form: env(1) carries extra_env, sudo keeps the working directory
                 sudo_cmd = ['sudo', '-u', user]
+                if extra_env:
+                    sudo_cmd.append('env')
+                    sudo_cmd.extend(f"{k}={v}" for k, v in extra_env.items())
                 sudo_cmd.extend(cmd)
             
             try:
                 # For shell=True case, pass as string; for shell=False case, pass as list
-                if shell:
-                    result = subprocess.run(
-                        sudo_cmd,
-                        shell=True,
-                        capture_output=capture,
-                        text=True,
-                        check=check,
-                        env=env,  # env still used for the sudo process itself (may be ignored)
-                        timeout=timeout
-                    )
-                else:
-                    result = subprocess.run(
-                        sudo_cmd,
-                        capture_output=capture,
-                        text=True,
-                        check=check,
-                        env=env,
-                        timeout=timeout
-                    )
+                # env still used for the sudo process itself (may be ignored)
+                result = self._execute(sudo_cmd, shell, None if shell else cwd, env, capture, check, timeout, tail_lines)
                 
                 # CRITICAL FIX: When in debug mode, bypass logger for critical output
                 if log_cmd or self.debug_mode:
@@ -184,7 +262,7 @@ class ShellExecutor:
                 
                 # CRITICAL: If command failed and we're in debug mode, print full output
                 if result.returncode != 0 and self.debug_mode:
-                    print(f"❌ [SHELL DEBUG] COMMAND FAILED: {cmd}", flush=True)
+                    print(f"❌ [SHELL DEBUG] COMMAND FAILED: {cmd_display}", flush=True)
                     if result.stdout and len(result.stdout) > 500:
                         print(f"❌ [SHELL DEBUG] FULL STDOUT (truncated):\n{result.stdout[:2000]}", flush=True)
                     if result.stderr and len(result.stderr) > 500:
@@ -192,14 +270,14 @@ class ShellExecutor:
                 
                 return result
             except subprocess.TimeoutExpired as e:
-                error_msg = f"⚠️ Command timed out after {timeout} seconds: {cmd}"
+                error_msg = f"⚠️ Command timed out after {timeout} seconds: {cmd_display}"
                 if self.debug_mode:
                     print(f"❌ [SHELL DEBUG] {error_msg}", flush=True)
                 logger.error(error_msg)
                 raise
             except subprocess.CalledProcessError as e:
                 if log_cmd or self.debug_mode:
-                    error_msg = f"Command failed: {cmd}"
+                    error_msg = f"Command failed: {cmd_display}"
                     if self.debug_mode:
                         print(f"❌ [SHELL DEBUG] {error_msg}", flush=True)
                         if hasattr(e, 'stdout') and e.stdout:
@@ -215,16 +293,7 @@ class ShellExecutor:
             try:
                 env['LC_ALL'] = 'C'
                 
-                result = subprocess.run(
-                    cmd,
-                    cwd=cwd,
-                    shell=shell,
-                    capture_output=capture,
-                    text=True,
-                    check=check,
-                    env=env,
-                    timeout=timeout
-                )
+                result = self._execute(cmd, shell, cwd, env, capture, check, timeout, tail_lines)
                 
                 # CRITICAL FIX: When in debug mode, bypass logger for critical output
                 if log_cmd or self.debug_mode:
@@ -243,7 +312,7 @@ class ShellExecutor:
                 
                 # CRITICAL: If command failed and we're in debug mode, print full output
                 if result.returncode != 0 and self.debug_mode:
-                    print(f"❌ [SHELL DEBUG] COMMAND FAILED: {cmd}", flush=True)
+                    print(f"❌ [SHELL DEBUG] COMMAND FAILED: {cmd_display}", flush=True)
                     if result.stdout and len(result.stdout) > 500:
                         print(f"❌ [SHELL DEBUG] FULL STDOUT (truncated):\n{result.stdout[:2000]}", flush=True)
                     if result.stderr and len(result.stderr) > 500:
@@ -251,14 +320,14 @@ class ShellExecutor:
                 
                 return result
             except subprocess.TimeoutExpired as e:
-                error_msg = f"⚠️ Command timed out after {timeout} seconds: {cmd}"
+                error_msg = f"⚠️ Command timed out after {timeout} seconds: {cmd_display}"
                 if self.debug_mode:
                     print(f"❌ [SHELL DEBUG] {error_msg}", flush=True)
                 logger.error(error_msg)
                 raise
             except subprocess.CalledProcessError as e:
                 if log_cmd or self.debug_mode:
-                    error_msg = f"Command failed: {cmd}"
+                    error_msg = f"Command failed: {cmd_display}"
                     if self.debug_mode:
                         print(f"❌ [SHELL DEBUG] {error_msg}", flush=True)
                         if hasattr(e, 'stdout') and e.stdout:
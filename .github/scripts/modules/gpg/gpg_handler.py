@@ -7,7 +7,9 @@ import subprocess
 import shutil
 import tempfile
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import Dict, List, Optional
 import shlex
 
 logger = logging.getLogger(__name__)
@@ -26,6 +28,7 @@ class GPGHandler:
         # Builder-specific GPG environment
         self.builder_gpg_home = None
         self.builder_gpg_env = None
+        self._agents_launched = set()  # GNUPGHOMEs whose gpg-agent was started (see _launch_agent)
         
         # Safe logging - no sensitive information
         if self.gpg_key_id:
@@ -423,7 +426,7 @@ class GPGHandler:
             )
         
         if verify_process.returncode == 0:
-            logger.debug(f"✅ Signature verification passed for {package_path.name}")
+            logger.debug("✅ Signature verification passed for %s", package_path.name)
             return True
         else:
             logger.error(f"❌ Signature verification failed for {package_path.name}")
@@ -450,6 +453,50 @@ class GPGHandler:
             logger.error(f"❌ Cannot sign {package_path}: Builder user cannot access GPG key")
             return False
         
+        return self._sign_package_file(package_path)
+    
+    def sign_packages(self, package_paths: List[str]) -> Dict[str, bool]:
+        """
+        Sign many package files concurrently.
+        
+        Builder access to the key is checked once and the builder's gpg-agent
+        is started up front; each file then gets its own gpg process, bounded
+        by the CPU count.
+        
+        Args:
+            package_paths: Paths to package files
+            
+        Returns:
+            Dict mapping each path to True (signed and verified) or False
+        """
+        if not package_paths:
+            return {}
+        if not self.sign_packages_enabled:
+            logger.debug(f"Package signing disabled, skipping {len(package_paths)} packages")
+            return {path: True for path in package_paths}
+        
+        if not self._verify_builder_can_sign():
+            logger.error(f"❌ Cannot sign {len(package_paths)} packages: Builder user cannot access GPG key")
+            return {path: False for path in package_paths}
+        
+        self._launch_agent(self.builder_gpg_env, as_user='builder')
+        workers = max(1, min(os.cpu_count() or 4, len(package_paths)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(self._sign_package_file, package_paths))
+        logger.info(f"GPG_PARALLEL_SIGN files={len(package_paths)} workers={workers} ok={results.count(True)}")
+        return dict(zip(package_paths, results))
+    
+    def _sign_package_file(self, package_path) -> bool:
+        """
+        Create and verify the detached signature of one package file
+        (builder access to the key must already be verified).
+        
+        Args:
+            package_path: Path to the package file (.pkg.tar.zst)
+        
+        Returns:
+            bool: True if signing successful AND verification passes, False on error
+        """
         try:
             package_path_obj = Path(package_path)
             
@@ -465,7 +512,7 @@ class GPGHandler:
             if sig_file.exists():
                 try:
                     sig_file.unlink()
-                    logger.debug(f"Removed existing signature: {sig_file.name}")
+                    logger.debug("Removed existing signature: %s", sig_file.name)
                 except Exception as e:
                     logger.warning(f"Could not remove existing signature {sig_file.name}: {e}")
             
@@ -478,6 +525,7 @@ class GPGHandler:
             sign_cmd = (
                 f'sudo -u builder env {env_vars} gpg '
                 f'--homedir {shlex.quote(str(self.builder_gpg_home))} '
+                f'--batch --pinentry-mode loopback '
                 f'--detach-sign --no-armor '
                 f'--default-key {shlex.quote(self.gpg_key_id)} '
                 f'--output {shlex.quote(str(sig_file))} '
@@ -553,7 +601,7 @@ class GPGHandler:
             package_file = directory / sig_file.name[:-4]
             
             if package_file.exists():
-                logger.debug(f"🔍 Verifying signature: {sig_file.name}")
+                logger.debug("🔍 Verifying signature: %s", sig_file.name)
                 # Use builder environment for package signature verification
                 if self._verify_signature(package_file, sig_file,
                                          env=self.builder_gpg_env,
@@ -577,8 +625,96 @@ class GPGHandler:
         
         return results
     
+    def _launch_agent(self, env: dict, as_user: Optional[str] = None) -> None:
+        """
+        Start gpg-agent for a keyring up front, so parallel gpg processes
+        connect to one running agent instead of racing to autostart it.
+        
+        Args:
+            env: Environment holding the GNUPGHOME of the keyring
+            as_user: Run gpgconf as this user (sudo -u) when the keyring belongs to it
+        """
+        home = env.get('GNUPGHOME', '')
+        if home in self._agents_launched:
+            return
+        cmd = ['gpgconf', '--launch', 'gpg-agent']
+        if as_user:
+            cmd = ['sudo', '-u', as_user, 'env', f"HOME={env.get('HOME', '')}", f"GNUPGHOME={home}"] + cmd
+        try:
+            result = subprocess.run(
+                cmd,
+                capture_output=True,
+                text=True,
+                env=env,
+                check=False,
+                timeout=30
+            )
+            logger.info(f"GPG_AGENT_PREWARM rc={result.returncode}")
+        except Exception as e:
+            logger.warning(f"GPG_AGENT_PREWARM_FAIL error={e}")
+        self._agents_launched.add(home)
+    
+    def _sign_repository_file(self, file_to_sign: Path) -> Optional[bool]:
+        """
+        Create and verify the detached signature of one repository file.
+        
+        Args:
+            file_to_sign: Repository database file
+            
+        Returns:
+            True if signed and verified, False on failure, None if the file is missing
+        """
+        if not file_to_sign.exists():
+            logger.warning(f"Repository file not found for signing: {file_to_sign.name}")
+            return None
+        
+        logger.info(f"Signing repository database: {file_to_sign.name}")
+        
+        # Delete existing .sig file before signing
+        sig_file = file_to_sign.with_suffix(file_to_sign.suffix + '.sig')
+        if sig_file.exists():
+            try:
+                sig_file.unlink()
+                logger.info(f"🗑️ Removed existing signature: {sig_file.name}")
+            except Exception as e:
+                logger.warning(f"Could not remove existing signature {sig_file.name}: {e}")
+        
+        # Create detached signature
+        sign_process = subprocess.run(
+            [
+                'gpg', '--detach-sign',
+                '--default-key', self.gpg_key_id,
+                '--output', str(sig_file),
+                str(file_to_sign)
+            ],
+            capture_output=True,
+            text=True,
+            env=self.gpg_env,
+            check=False
+        )
+        
+        if sign_process.returncode != 0:
+            logger.warning(f"⚠️ Failed to sign {file_to_sign.name}: {sign_process.stderr[:200]}")
+            return False
+        
+        logger.info(f"✅ Created signature: {sig_file.name}")
+        
+        # Verify the signature using temporary GPG environment
+        if self._verify_signature(file_to_sign, sig_file,
+                                 env=self.gpg_env,
+                                 homedir=self.gpg_home):
+            return True
+        
+        # Delete invalid signature
+        logger.error(f"❌ Signature verification failed for {file_to_sign.name}")
+        try:
+            sig_file.unlink()
+        except Exception as e:
+            logger.warning(f"Could not delete invalid signature: {e}")
+        return False
+    
     def sign_repository_files(self, repo_name: str, output_dir: str) -> bool:
-        """Sign repository database files with GPG"""
+        """Sign repository database files with GPG (files are signed in parallel)"""
         if not self.gpg_enabled:
             logger.info("GPG signing disabled - skipping repository signing")
             return False
@@ -596,59 +732,13 @@ class GPGHandler:
                 output_path / f"{repo_name}.files.tar.gz"
             ]
             
-            signed_count = 0
-            failed_count = 0
+            # Each file gets its own .sig, so the signatures are independent
+            self._launch_agent(self.gpg_env)
+            with ThreadPoolExecutor(max_workers=len(files_to_sign)) as executor:
+                results = list(executor.map(self._sign_repository_file, files_to_sign))
             
-            for file_to_sign in files_to_sign:
-                if not file_to_sign.exists():
-                    logger.warning(f"Repository file not found for signing: {file_to_sign.name}")
-                    continue
-                
-                logger.info(f"Signing repository database: {file_to_sign.name}")
-                
-                # Delete existing .sig file before signing
-                sig_file = file_to_sign.with_suffix(file_to_sign.suffix + '.sig')
-                if sig_file.exists():
-                    try:
-                        sig_file.unlink()
-                        logger.info(f"🗑️ Removed existing signature: {sig_file.name}")
-                    except Exception as e:
-                        logger.warning(f"Could not remove existing signature {sig_file.name}: {e}")
-                
-                # Create detached signature
-                sign_process = subprocess.run(
-                    [
-                        'gpg', '--detach-sign',
-                        '--default-key', self.gpg_key_id,
-                        '--output', str(sig_file),
-                        str(file_to_sign)
-                    ],
-                    capture_output=True,
-                    text=True,
-                    env=self.gpg_env,
-                    check=False
-                )
-                
-                if sign_process.returncode == 0:
-                    logger.info(f"✅ Created signature: {sig_file.name}")
-                    
-                    # Verify the signature using temporary GPG environment
-                    if self._verify_signature(file_to_sign, sig_file,
-                                             env=self.gpg_env,
-                                             homedir=self.gpg_home):
-                        signed_count += 1
-                    else:
-                        # Delete invalid signature
-                        try:
-                            sig_file.unlink()
-                            logger.error(f"❌ Signature verification failed for {file_to_sign.name}")
-                            failed_count += 1
-                        except Exception as e:
-                            logger.warning(f"Could not delete invalid signature: {e}")
-                            failed_count += 1
-                else:
-                    logger.warning(f"⚠️ Failed to sign {file_to_sign.name}: {sign_process.stderr[:200]}")
-                    failed_count += 1
+            signed_count = results.count(True)
+            failed_count = results.count(False)
             
             if signed_count > 0:
                 logger.info(f"✅ Successfully signed {signed_count} repository file(s)")
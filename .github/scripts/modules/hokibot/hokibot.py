@@ -18,6 +18,9 @@ from modules.common.config_loader import ConfigLoader
 
 logger = logging.getLogger(__name__)
 
+# pkgver/pkgrel lines of generated .SRCINFO output, collected in one pass
+_SRCINFO_VERSION_KEYS_RE = re.compile(r'^\s*(pkgver|pkgrel)\s*=(.*)$', re.MULTILINE)
+
 
 class HokibotRunner:
     """Handles automatic version bumping for local packages with non-blocking fail-safe"""
@@ -732,12 +735,17 @@ class HokibotRunner:
                 for i, line in enumerate(stderr_lines[:20]):
                     logger.info(f"    line {i+1}: {repr(line[:200])}")
             
-            # Diagnostic regex checks (do not change pass/fail)
-            pkgver_pattern = r'(^|\n)\s*pkgver\s*=\s*'
-            pkgrel_pattern = r'(^|\n)\s*pkgrel\s*=\s*'
+            # Diagnostic regex checks (do not change pass/fail); one scan
+            # records which keys are present and which carry a value
+            present_keys = set()
+            valued_keys = set()
+            for key, value in _SRCINFO_VERSION_KEYS_RE.findall(result.stdout):
+                present_keys.add(key)
+                if value:
+                    valued_keys.add(key)
             
-            pkgver_match = re.search(pkgver_pattern, result.stdout) is not None
-            pkgrel_match = re.search(pkgrel_pattern, result.stdout) is not None
+            pkgver_match = 'pkgver' in present_keys
+            pkgrel_match = 'pkgrel' in present_keys
             
             logger.info(f"  pkgver_regex_match={pkgver_match}")
             logger.info(f"  pkgrel_regex_match={pkgrel_match}")
@@ -750,15 +758,11 @@ class HokibotRunner:
             if not result.stdout.strip():
                 return "makepkg --printsrcinfo produced empty output"
             
-            # Check for key fields in the output using robust regex
-            srcinfo_content = result.stdout
-            
-            # Check pkgver with regex that tolerates leading whitespace
-            if not re.search(r'(?m)^\s*pkgver\s*=\s*.+$', srcinfo_content):
+            # Key fields must be present with a value (leading whitespace tolerated)
+            if 'pkgver' not in valued_keys:
                 return "Missing pkgver in generated .SRCINFO"
             
-            # Check pkgrel with regex that tolerates leading whitespace
-            if not re.search(r'(?m)^\s*pkgrel\s*=\s*.+$', srcinfo_content):
+            if 'pkgrel' not in valued_keys:
                 return "Missing pkgrel in generated .SRCINFO"
             
             return None  # Validation successful
@@ -4,7 +4,7 @@ State Module - Manages application state and configuration
 
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Set, Tuple
 
 
 @dataclass
@@ -25,10 +25,10 @@ class BuildState:
     repo_exists: bool = False
     has_packages: bool = False
     
-    # Build results
-    built_packages: List[str] = None
-    skipped_packages: List[str] = None
-    rebuilt_local_packages: List[str] = None
+    # Build results: (pkg_name, version) records, formatted only when reported
+    built_packages: List[Tuple[str, str]] = None
+    skipped_packages: List[Tuple[str, str]] = None
+    rebuilt_local_packages: Set[str] = None
     
     def __post_init__(self):
         if self.remote_files is None:
@@ -38,7 +38,7 @@ class BuildState:
         if self.skipped_packages is None:
             self.skipped_packages = []
         if self.rebuilt_local_packages is None:
-            self.rebuilt_local_packages = []
+            self.rebuilt_local_packages = set()
     
     def add_remote_file(self, filename: str):
         """Add a remote file to the state"""
@@ -46,12 +46,12 @@ class BuildState:
     
     def add_built_package(self, pkg_name: str, version: str):
         """Add a built package to the state"""
-        self.built_packages.append(f"{pkg_name} ({version})")
+        self.built_packages.append((pkg_name, version))
     
     def add_skipped_package(self, pkg_name: str, version: str):
         """Add a skipped package to the state"""
-        self.skipped_packages.append(f"{pkg_name} ({version})")
+        self.skipped_packages.append((pkg_name, version))
     
     def add_rebuilt_local_package(self, pkg_name: str):
         """Add a rebuilt local package to the state"""
-        self.rebuilt_local_packages.append(pkg_name)
+        self.rebuilt_local_packages.add(pkg_name)
@@ -16,7 +16,8 @@ import hashlib
 import logging
 from pathlib import Path
 from typing import List, Optional, Set, Tuple, Dict
-import re
+
+from modules.repo.version_tracker import PKG_FILENAME_RE, package_file_version
 
 logger = logging.getLogger(__name__)
 
@@ -44,6 +45,7 @@ class CleanupManager:
                 - mirror_temp_dir: Temporary mirror directory
                 - vps_user: VPS username
                 - vps_host: VPS hostname
+                - ssh_options: SSH options list (optional; carries the ControlMaster settings)
         """
         self.repo_name = config['repo_name']
         self.output_dir = Path(config['output_dir'])
@@ -51,6 +53,16 @@ class CleanupManager:
         self.mirror_temp_dir = Path(config.get('mirror_temp_dir', '/tmp/repo_mirror'))
         self.vps_user = config['vps_user']
         self.vps_host = config['vps_host']
+        self.ssh_options = config.get('ssh_options') or []
+        # VPS listing shared by hygiene, orphan sweep and version prune; any
+        # remote deletion (or an upload, via invalidate_vps_inventory) marks it dirty
+        self._vps_inventory: Optional[List[str]] = None
+        self._orphan_sweep_result: Optional[Tuple[int, int, int]] = None  # last sweep on the clean inventory
+    
+    def invalidate_vps_inventory(self):
+        """Mark the cached VPS listing dirty after remote_dir was changed outside this manager."""
+        self._vps_inventory = None
+        self._orphan_sweep_result = None
     
     def revalidate_output_dir_before_database(self, allowlist: Optional[Set[str]] = None):
         """
@@ -303,8 +315,12 @@ class CleanupManager:
             logger.info("No VPS files found")
             return [], []
         
-        # Get local files from output_dir
-        local_files = set(f.name for f in self.output_dir.glob("*"))
+        # Get local file names from output_dir (names only, no Path objects)
+        try:
+            with os.scandir(self.output_dir) as entries:
+                local_files = {entry.name for entry in entries}
+        except FileNotFoundError:
+            local_files = set()
         
         # Identify files to delete (on VPS but not locally)
         files_to_delete = []
@@ -325,7 +341,7 @@ class CleanupManager:
             
             if filename in local_files:
                 files_to_keep.append(vps_file)
-                logger.debug(f"Keeping {filename} (exists locally)")
+                logger.debug("Keeping %s (exists locally)", filename)
             else:
                 files_to_delete.append(vps_file)
                 logger.info(f"Marking for deletion: {filename} (not in local output)")
@@ -337,18 +353,22 @@ class CleanupManager:
         """Remove orphaned .sig files that don't have a corresponding package"""
         logger.info("🔍 Checking for orphaned signature files...")
         
+        # One scandir: a signature is orphaned when its base name is not listed
+        try:
+            with os.scandir(self.output_dir) as entries:
+                names = {entry.name for entry in entries}
+        except FileNotFoundError:
+            names = set()
+        
         orphaned_count = 0
-        for sig_file in self.output_dir.glob("*.sig"):
-            # Corresponding package file (remove .sig extension)
-            pkg_file = sig_file.with_suffix('')
-            
-            if not pkg_file.exists():
-                try:
-                    sig_file.unlink()
-                    logger.info(f"Removed orphaned signature: {sig_file.name}")
-                    orphaned_count += 1
-                except Exception as e:
-                    logger.warning(f"Could not delete orphaned signature {sig_file}: {e}")
+        for sig_name in sorted(n for n in names if n.endswith('.sig') and n[:-4] not in names):
+            sig_file = self.output_dir / sig_name
+            try:
+                sig_file.unlink()
+                logger.info(f"Removed orphaned signature: {sig_file.name}")
+                orphaned_count += 1
+            except Exception as e:
+                logger.warning(f"Could not delete orphaned signature {sig_file}: {e}")
         
         if orphaned_count > 0:
             logger.info(f"✅ Removed {orphaned_count} orphaned signature files")
@@ -363,6 +383,11 @@ class CleanupManager:
         Returns:
             Tuple of (package_count, signature_count, deleted_orphan_count)
         """
+        # Nothing was deleted or uploaded since a sweep that found no orphans
+        if self._orphan_sweep_result is not None:
+            logger.info("ORPHAN_SWEEP_SKIP=1 reason=inventory_clean")
+            return self._orphan_sweep_result
+        
         # Generate privacy-safe hash for logging
         remote_dir_hash = hashlib.sha256(self.remote_dir.encode()).hexdigest()[:8]
         logger.info(f"Starting VPS orphan signature sweep (remote_dir_hash: {remote_dir_hash})...")
@@ -405,7 +430,8 @@ class CleanupManager:
         
         if not orphaned_signatures:
             logger.info("✅ No orphaned signatures found on VPS")
-            return len(package_files), len(signature_files), 0
+            self._orphan_sweep_result = (len(package_files), len(signature_files), 0)
+            return self._orphan_sweep_result
         
         logger.info(f"Found {len(orphaned_signatures)} orphaned signatures to delete")
         
@@ -499,7 +525,11 @@ class CleanupManager:
         return deleted_count
     
     def _get_vps_file_inventory(self) -> Optional[List[str]]:
-        """Get complete inventory of all files on VPS"""
+        """Get complete inventory of all files on VPS (cached until a deletion or invalidation)"""
+        if self._vps_inventory is not None:
+            logger.info(f"VPS_INVENTORY_CACHE_HIT=1 count={len(self._vps_inventory)}")
+            return list(self._vps_inventory)
+        
         logger.info("Getting complete VPS file inventory...")
         
         remote_cmd = rf"""
@@ -509,6 +539,7 @@ class CleanupManager:
         
         ssh_cmd = [
             "ssh",
+            *self.ssh_options,
             f"{self.vps_user}@{self.vps_host}",
             remote_cmd
         ]
@@ -529,11 +560,13 @@ class CleanupManager:
             vps_files_raw = result.stdout.strip()
             if not vps_files_raw:
                 logger.info("No files found on VPS")
+                self._vps_inventory = []
                 return []
             
-            vps_files = [f.strip() for f in vps_files_raw.split('\n') if f.strip()]
+            vps_files = [f for f in map(str.strip, vps_files_raw.splitlines()) if f]
             logger.info(f"Found {len(vps_files)} files on VPS")
-            return vps_files
+            self._vps_inventory = vps_files
+            return list(vps_files)
             
         except subprocess.TimeoutExpired:
             logger.error("SSH timeout getting VPS file inventory")
@@ -547,6 +580,9 @@ class CleanupManager:
         if not files_to_delete:
             return True
         
+        # Remote state changes (even a failed batch may have removed some files)
+        self.invalidate_vps_inventory()
+        
         # Quote each filename for safety
         quoted_files = [f"'{f}'" for f in files_to_delete]
         files_to_delete_str = ' '.join(quoted_files)
@@ -558,6 +594,7 @@ class CleanupManager:
         # Execute the deletion command
         ssh_delete = [
             "ssh",
+            *self.ssh_options,
             f"{self.vps_user}@{self.vps_host}",
             delete_cmd
         ]
@@ -625,35 +662,10 @@ class CleanupManager:
         Works with both .pkg.tar.zst and .pkg.tar.xz.
         Returns (pkgname, version) where version is pkgver-pkgrel (with possible epoch).
         """
-        # Remove extensions
-        if filename.endswith('.pkg.tar.zst'):
-            base = filename[:-12]
-        elif filename.endswith('.pkg.tar.xz'):
-            base = filename[:-11]
-        else:
+        m = PKG_FILENAME_RE.match(filename)
+        if not m:
             return None, None
-        
-        # Remove known architecture suffixes from the end
-        arch_patterns = [r'-x86_64$', r'-any$', r'-i686$', r'-aarch64$', r'-armv7h$', r'-armv6h$']
-        for pattern in arch_patterns:
-            base = re.sub(pattern, '', base)
-        
-        # Split by hyphens
-        parts = base.split('-')
-        if len(parts) < 3:
-            return None, None
-        
-        # Find where version starts: the part before the last three fields (pkgver, pkgrel, arch)
-        # After stripping arch, the last two parts are pkgver and pkgrel.
-        # So pkgname is everything before the last two parts.
-        # But epoch may be present, making pkgver contain ':'.
-        # The last part is pkgrel, the second-last is pkgver.
-        pkgrel = parts[-1]
-        pkgver = parts[-2]
-        # pkgname is everything before that
-        pkgname = '-'.join(parts[:-2])
-        version = f"{pkgver}-{pkgrel}"
-        return pkgname, version
+        return m['name'], package_file_version(m)
     
     def run_vps_hygiene(self, remote_dir: str, repo_name: str, desired_inventory: Set[str],
                         keep_latest_versions: int = 1, dry_run: bool = True,
@@ -9,6 +9,8 @@ import logging
 from pathlib import Path
 from typing import List, Tuple
 
+from modules.common.logging_utils import section_header
+
 logger = logging.getLogger(__name__)
 
 
@@ -39,9 +41,7 @@ class DatabaseManager:
         
         🚨 KRITIKUS: Run final validation BEFORE repo-add
         """
-        print("\n" + "=" * 60)
-        print("PHASE: Repository Database Generation")
-        print("=" * 60)
+        print(section_header("PHASE: Repository Database Generation"))
         
         # 🚨 KRITIKUS: Final validation to remove zombie packages
         cleanup_manager.revalidate_output_dir_before_database()
@@ -53,8 +53,8 @@ class DatabaseManager:
             logger.info("No packages available for database generation")
             return False
         
-        # Log the packages being included (first 10)
-        package_names = [os.path.basename(pkg) for pkg in all_packages]
+        # Log the packages being included (first 10); entries are already basenames
+        package_names = all_packages
         logger.info(f"Database input packages ({len(package_names)}): {package_names[:10]}{'...' if len(package_names) > 10 else ''}")
         
         old_cwd = os.getcwd()
@@ -151,28 +151,26 @@ class DatabaseManager:
         """
         print("\n🔍 Getting complete package list from local directory...")
         
-        # Get all files matching package patterns
-        package_files = []
-        
-        # Include only real package files
-        for ext in ['.pkg.tar.zst', '.pkg.tar.xz', '.pkg.tar.gz', '.pkg.tar.bz2', '.pkg.tar.lzo']:
-            package_files.extend(self.output_dir.glob(f"*{ext}"))
-        
-        # Filter out signature files
-        package_files = [f for f in package_files if not f.name.endswith('.sig')]
-        
-        # Filter out database artifacts (even if they somehow match patterns)
-        package_files = [
-            f for f in package_files 
-            if not (f.name.startswith(f"{self.repo_name}.db") or f.name.startswith(f"{self.repo_name}.files"))
-        ]
+        # Include only real package files (.sig never matches these suffixes);
+        # one scandir instead of a glob per compression suffix
+        package_exts = ('.pkg.tar.zst', '.pkg.tar.xz', '.pkg.tar.gz', '.pkg.tar.bz2', '.pkg.tar.lzo')
+        db_prefixes = (f"{self.repo_name}.db", f"{self.repo_name}.files")
+        try:
+            with os.scandir(self.output_dir) as entries:
+                local_filenames = sorted(
+                    entry.name for entry in entries
+                    if entry.name.endswith(package_exts)
+                    # Filter out database artifacts (even if they somehow match patterns)
+                    and not entry.name.startswith(db_prefixes)
+                    and entry.is_file()
+                )
+        except FileNotFoundError:
+            local_filenames = []
         
-        if not package_files:
+        if not local_filenames:
             logger.info("ℹ️ No real package files found locally (excluding .sig files and database artifacts)")
             return []
         
-        local_filenames = [f.name for f in package_files]
-        
         logger.info(f"📊 Local package count (excluding .sig files): {len(local_filenames)}")
         logger.info(f"Sample real packages (no .sig): {local_filenames[:10]}")
         
@@ -180,9 +178,7 @@ class DatabaseManager:
     
     def check_database_files(self) -> Tuple[List[str], List[str]]:
         """Check if repository database files exist on server"""
-        print("\n" + "=" * 60)
-        print("STEP 2: Checking existing database files on server")
-        print("=" * 60)
+        print(section_header("STEP 2: Checking existing database files on server"))
         
         db_files = [
             f"{self.repo_name}.db",
@@ -1,10 +1,15 @@
 import os
 import re
-from pathlib import Path
 from typing import List, Set, Dict, Any, Optional
 import subprocess
 import tempfile
 import shutil
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from modules.scm.git_client import GIT_NETWORK_ENV
 
 
 class ManifestFactory:
@@ -26,9 +31,9 @@ class ManifestFactory:
         """
         try:
             # Check if source is a local directory
-            pkgbuild_path = Path(source) / "PKGBUILD"
+            pkgbuild_path = os.path.join(str(source), "PKGBUILD")
             
-            if pkgbuild_path.exists():
+            if os.path.exists(pkgbuild_path):
                 # Local PKGBUILD
                 with open(pkgbuild_path, 'r', encoding='utf-8') as f:
                     return f.read()
@@ -40,17 +45,73 @@ class ManifestFactory:
             print(f"Error loading PKGBUILD from {source}: {e}")
             return None
     
+    @staticmethod
+    def get_pkgbuilds(sources: List[str], max_workers: int = 8) -> Dict[str, Optional[str]]:
+        """
+        Load PKGBUILD content for many sources concurrently.
+        
+        AUR sources are network-bound clones, so they are fetched in a thread
+        pool; the result can be shared by every pass over the same sources.
+        
+        Args:
+            sources: Local PKGBUILD directories or AUR package names
+            max_workers: Maximum concurrent fetches (1 = serial)
+            
+        Returns:
+            Dict mapping source -> PKGBUILD content (None if it could not be loaded)
+        """
+        unique_sources = list(dict.fromkeys(sources))
+        if not unique_sources:
+            return {}
+        workers = max(1, min(max_workers, len(unique_sources)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            contents = list(executor.map(ManifestFactory.get_pkgbuild, unique_sources))
+        return dict(zip(unique_sources, contents))
+    
+    @staticmethod
+    def _fetch_aur_plain(pkg_name: str, filename: str = "PKGBUILD") -> Optional[str]:
+        """
+        Fetch one file of an AUR package over plain HTTPS (cgit), without git.
+        
+        Args:
+            pkg_name: AUR package (pkgbase) name
+            filename: File at the tip of the package repository
+            
+        Returns:
+            File content as string, or None if the request failed
+        """
+        url = (f"https://aur.archlinux.org/cgit/aur.git/plain/{urllib.parse.quote(filename)}"
+               f"?h={urllib.parse.quote(pkg_name)}")
+        try:
+            with urllib.request.urlopen(url, timeout=15) as response:
+                if response.status != 200:
+                    return None
+                content = response.read().decode('utf-8', errors='replace')
+        except Exception:
+            return None
+        # cgit answers unknown packages with an HTML error page
+        if not content or content.lstrip().startswith('<'):
+            return None
+        return content
+    
     @staticmethod
     def _fetch_aur_pkgbuild(pkg_name: str) -> Optional[str]:
         """
         Fetch PKGBUILD from AUR.
         
+        A single HTTPS GET of the cgit plain view is tried first; the git
+        clone is only the fallback when that request fails.
+        
         Args:
             pkg_name: AUR package name
             
         Returns:
             PKGBUILD content as string, or None if failed
         """
+        content = ManifestFactory._fetch_aur_plain(pkg_name, "PKGBUILD")
+        if content:
+            return content
+        
         temp_dir = None
         try:
             # Create temporary directory for cloning
@@ -64,22 +125,33 @@ class ManifestFactory:
             
             for aur_url in aur_urls:
                 try:
-                    # Clone the AUR package (shallow clone)
+                    # Shallow, blobless clone without checkout: only commit and
+                    # tree objects are transferred, then the single PKGBUILD
+                    # blob is fetched on demand by git show
                     result = subprocess.run(
-                        ["git", "clone", "--depth", "1", aur_url, temp_dir],
+                        ["git", "-c", "protocol.version=2", "clone", "--depth", "1",
+                         "--single-branch", "--no-tags", "--filter=blob:none", "--no-checkout",
+                         aur_url, temp_dir],
                         capture_output=True,
                         text=True,
-                        timeout=60
+                        timeout=60,
+                        env={**os.environ, **GIT_NETWORK_ENV}
                     )
                     
                     if result.returncode == 0:
-                        # Read PKGBUILD
-                        pkgbuild_path = Path(temp_dir) / "PKGBUILD"
-                        if pkgbuild_path.exists():
-                            with open(pkgbuild_path, 'r', encoding='utf-8') as f:
-                                content = f.read()
-                            shutil.rmtree(temp_dir, ignore_errors=True)
-                            return content
+                        # Read PKGBUILD straight from HEAD
+                        show = subprocess.run(
+                            ["git", "-C", temp_dir, "show", "HEAD:PKGBUILD"],
+                            capture_output=True,
+                            text=True,
+                            timeout=60
+                        )
+                        if show.returncode == 0 and show.stdout:
+                            return show.stdout
+                    
+                    # Reset for the next URL (git clone needs an empty target)
+                    shutil.rmtree(temp_dir, ignore_errors=True)
+                    os.makedirs(temp_dir, exist_ok=True)
                     
                 except (subprocess.TimeoutExpired, subprocess.CalledProcessError):
                     continue
@@ -90,8 +162,8 @@ class ManifestFactory:
             print(f"Error fetching AUR PKGBUILD for {pkg_name}: {e}")
             return None
         finally:
-            # Cleanup
-            if temp_dir and Path(temp_dir).exists():
+            # Cleanup (rmtree with ignore_errors already tolerates a missing dir)
+            if temp_dir:
                 shutil.rmtree(temp_dir, ignore_errors=True)
     
     @staticmethod
@@ -100,12 +172,22 @@ class ManifestFactory:
         Parse pkgname values from PKGBUILD text.
         Handles both single values and arrays.
         
+        The same PKGBUILD is parsed by the allowlist, desired-inventory,
+        dependency-ordering and audit passes; results are memoized by content
+        so each distinct text is parsed (and possibly sourced by bash) once.
+        
         Args:
             pkgbuild_text: PKGBUILD content as string
             
         Returns:
             List of package names extracted from PKGBUILD
         """
+        return list(ManifestFactory._extract_pkgnames_cached(pkgbuild_text))
+    
+    @staticmethod
+    @lru_cache(maxsize=1024)
+    def _extract_pkgnames_cached(pkgbuild_text: str) -> tuple:
+        """Memoized body of extract_pkgnames; returns an immutable tuple."""
         pkg_names = []
         
         # Remove comments
@@ -164,9 +246,7 @@ class ManifestFactory:
                 pass
         
         # Remove duplicates and empty strings
-        pkg_names = list(dict.fromkeys([name for name in pkg_names if name]))
-        
-        return pkg_names
+        return tuple(dict.fromkeys([name for name in pkg_names if name]))
     
     @staticmethod
     def _parse_with_bash(pkgbuild_text: str) -> List[str]:
@@ -213,12 +293,13 @@ class ManifestFactory:
                 os.unlink(tmp_path)
     
     @staticmethod
-    def build_allowlist(package_sources: List[str]) -> Set[str]:
+    def build_allowlist(package_sources: List[str], pkgbuilds: Optional[Dict[str, Optional[str]]] = None) -> Set[str]:
         """
         Build allowlist of valid package names from all PKGBUILDs.
         
         Args:
             package_sources: List of package sources (local paths or AUR package names)
+            pkgbuilds: Optional pre-fetched source -> PKGBUILD content (see get_pkgbuilds)
             
         Returns:
             Set of all valid package names from all PKGBUILDs
@@ -226,7 +307,10 @@ class ManifestFactory:
         allowlist = set()
         
         for source in package_sources:
-            pkgbuild_content = ManifestFactory.get_pkgbuild(source)
+            if pkgbuilds is not None and source in pkgbuilds:
+                pkgbuild_content = pkgbuilds[source]
+            else:
+                pkgbuild_content = ManifestFactory.get_pkgbuild(source)
             
             if pkgbuild_content:
                 pkg_names = ManifestFactory.extract_pkgnames(pkgbuild_content)
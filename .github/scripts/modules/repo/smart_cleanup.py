@@ -15,9 +15,12 @@ import logging
 from pathlib import Path
 from typing import List, Set, Tuple, Optional, Dict
 
+from modules.repo.version_tracker import PKG_FILENAME_RE, package_file_version
+
 logger = logging.getLogger(__name__)
 
 
+
 class SmartCleanup:
     """
     Authoritative cleanup system for repository management.
@@ -40,44 +43,81 @@ class SmartCleanup:
         """
         self.repo_name = repo_name
         self.output_dir = output_dir
+        # NEW: pkgname -> [(version, path)] built from a single scandir pass
+        self._output_index: Dict[str, List[Tuple[str, Path]]] = self._build_output_index()
+    
+    def _build_output_index(self) -> Dict[str, List[Tuple[str, Path]]]:
+        """
+        Index package files in output_dir by package name in one directory pass.
+        
+        Returns:
+            Dictionary of pkgname -> list of (version, path); version keeps the
+            epoch prefix (e.g. '2:26.1.9-1') so vercmp ordering stays correct
+        """
+        index: Dict[str, List[Tuple[str, Path]]] = {}
+        try:
+            with os.scandir(self.output_dir) as entries:
+                for entry in entries:
+                    match = PKG_FILENAME_RE.match(entry.name)
+                    if not match:
+                        if entry.name.endswith(('.pkg.tar.zst', '.pkg.tar.xz')):
+                            logger.warning(f"Could not parse package filename {entry.name}")
+                        continue
+                    if not entry.is_file():
+                        continue
+                    index.setdefault(match.group('name'), []).append((package_file_version(match), Path(entry.path)))
+        except FileNotFoundError:
+            pass
+        
+        # The file total walks the whole index; only pay for it when DEBUG is on
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("OUTPUT_INDEX_BUILT packages=%d files=%d", len(index), sum(len(v) for v in index.values()))
+        return index
+    
+    def refresh_output_index(self):
+        """Rescan output_dir after new artifacts have been written."""
+        self._output_index = self._build_output_index()
     
     @staticmethod
-    def extract_package_name_from_filename(filename: str) -> Optional[str]:
+    def _delete_package_file(pkg_file: Path, reason: str) -> bool:
         """
-        Extract package name from package filename.
+        Delete a package file and its detached signature.
         
         Args:
-            filename: Package filename (e.g., 'package-1.0-1-x86_64.pkg.tar.zst')
+            pkg_file: Package file to delete
+            reason: Log prefix describing why the file is removed
             
         Returns:
-            Package name or None if cannot parse
+            True if the package file was deleted
         """
         try:
-            # Remove extensions
-            base = filename.replace('.pkg.tar.zst', '').replace('.pkg.tar.xz', '')
-            parts = base.split('-')
+            pkg_file.unlink()
+            logger.info(f"{reason}: {pkg_file.name}")
             
-            # Package name is everything before version-release-arch
-            # Handle both standard and epoch formats
-            for i in range(len(parts) - 3, 0, -1):
-                potential_name = '-'.join(parts[:i])
-                
-                # Check if remaining parts look like version-release-arch
-                remaining = parts[i:]
-                if len(remaining) >= 3:
-                    # Check for epoch format (e.g., "2-26.1.9-1")
-                    if remaining[0].isdigit() and '-' in '-'.join(remaining[1:]):
-                        # Valid epoch format
-                        return potential_name
-                    # Standard format (e.g., "26.1.9-1")
-                    elif any(c.isdigit() for c in remaining[0]) and remaining[1].isdigit():
-                        # Valid standard format
-                        return potential_name
-        
+            sig_file = pkg_file.with_name(pkg_file.name + '.sig')
+            try:
+                sig_file.unlink()
+                logger.info(f"Removed signature: {sig_file.name}")
+            except FileNotFoundError:
+                pass
+            return True
         except Exception as e:
-            logger.debug(f"Could not parse filename {filename}: {e}")
+            logger.warning(f"Could not delete {pkg_file}: {e}")
+            return False
+    
+    @staticmethod
+    def extract_package_name_from_filename(filename: str) -> Optional[str]:
+        """
+        Extract package name from package filename.
         
-        return None
+        Args:
+            filename: Package filename (e.g., 'package-1.0-1-x86_64.pkg.tar.zst')
+            
+        Returns:
+            Package name or None if cannot parse
+        """
+        match = PKG_FILENAME_RE.match(filename)
+        return match.group('name') if match else None
     
     @staticmethod
     def extract_version_from_filename(filename: str, pkg_name: str) -> Optional[str]:
@@ -91,32 +131,10 @@ class SmartCleanup:
         Returns:
             Version string (e.g., '26.1.9-1') or None if cannot parse
         """
-        try:
-            # Remove extensions
-            base = filename.replace('.pkg.tar.zst', '').replace('.pkg.tar.xz', '')
-            parts = base.split('-')
-            
-            # Find where package name ends
-            for i in range(len(parts) - 2, 0, -1):
-                possible_name = '-'.join(parts[:i])
-                if possible_name == pkg_name or possible_name.startswith(pkg_name + '-'):
-                    # Remaining parts: version-release-architecture
-                    if len(parts) >= i + 3:
-                        version_part = parts[i]
-                        release_part = parts[i+1]
-                        
-                        # Check for epoch (e.g., "2-26.1.9-1" -> "2:26.1.9-1")
-                        if i + 2 < len(parts) and parts[i].isdigit():
-                            epoch_part = parts[i]
-                            version_part = parts[i+1]
-                            release_part = parts[i+2]
-                            return f"{epoch_part}:{version_part}-{release_part}"
-                        else:
-                            return f"{version_part}-{release_part}"
-        except Exception as e:
-            logger.debug(f"Could not extract version from {filename}: {e}")
-        
-        return None
+        match = PKG_FILENAME_RE.match(filename)
+        if not match or match.group('name') != pkg_name:
+            return None
+        return package_file_version(match)
     
     def _compare_versions(self, version1: str, version2: str) -> int:
         """
@@ -156,39 +174,14 @@ class SmartCleanup:
         """
         logger.info("🔍 Starting version-based cleanup...")
         
-        # Get all package files in output_dir
-        package_files = list(self.output_dir.glob("*.pkg.tar.*"))
-        if not package_files:
+        if not self._output_index:
             logger.info("No package files found for version cleanup")
             return
         
-        # Remove signature files from the list (we'll handle them separately)
-        package_files = [f for f in package_files if not f.name.endswith('.sig')]
-        
-        # Group files by package name
-        packages_dict: Dict[str, List[Tuple[str, Path]]] = {}
-        
-        for pkg_file in package_files:
-            # Extract package name and version
-            pkg_name = self.extract_package_name_from_filename(pkg_file.name)
-            if not pkg_name:
-                logger.warning(f"Could not parse package name from {pkg_file.name}")
-                continue
-            
-            version = self.extract_version_from_filename(pkg_file.name, pkg_name)
-            if not version:
-                logger.warning(f"Could not parse version from {pkg_file.name}")
-                continue
-            
-            if pkg_name not in packages_dict:
-                packages_dict[pkg_name] = []
-            
-            packages_dict[pkg_name].append((version, pkg_file))
-        
         # Process each package
         total_deleted = 0
         
-        for pkg_name, files in packages_dict.items():
+        for pkg_name, files in self._output_index.items():
             if len(files) <= 1:
                 continue  # Only one version, nothing to do
             
@@ -207,21 +200,11 @@ class SmartCleanup:
             
             # Delete older versions
             for version, pkg_file in files:
-                if pkg_file != newest_file:
-                    try:
-                        # Delete package file
-                        pkg_file.unlink()
-                        logger.info(f"Removed old version: {pkg_file.name}")
-                        
-                        # Delete signature file if exists
-                        sig_file = pkg_file.with_suffix(pkg_file.suffix + '.sig')
-                        if sig_file.exists():
-                            sig_file.unlink()
-                            logger.info(f"Removed signature: {sig_file.name}")
-                        
-                        total_deleted += 1
-                    except Exception as e:
-                        logger.warning(f"Could not delete {pkg_file}: {e}")
+                if pkg_file != newest_file and self._delete_package_file(pkg_file, "Removed old version"):
+                    total_deleted += 1
+            
+            # Keep the index in step with the directory
+            files[:] = [(newest_version, newest_file)]
         
         if total_deleted > 0:
             logger.info(f"✅ Version cleanup: Removed {total_deleted} old package versions")
@@ -237,39 +220,16 @@ class SmartCleanup:
         """
         logger.info("🔍 Starting allowlist-based cleanup...")
         
-        # Get all package files in output_dir
-        package_files = list(self.output_dir.glob("*.pkg.tar.*"))
-        if not package_files:
+        if not self._output_index:
             logger.info("No package files found for allowlist cleanup")
             return
         
-        # Remove signature files from the list (we'll handle them separately)
-        package_files = [f for f in package_files if not f.name.endswith('.sig')]
-        
         deleted_count = 0
         
-        for pkg_file in package_files:
-            pkg_name = self.extract_package_name_from_filename(pkg_file.name)
-            
-            if not pkg_name:
-                logger.warning(f"Could not parse package name from {pkg_file.name}")
-                continue
-            
-            if pkg_name not in allowlist:
-                try:
-                    # Delete package file
-                    pkg_file.unlink()
-                    logger.info(f"Removed package not in allowlist: {pkg_file.name}")
-                    
-                    # Delete signature file if exists
-                    sig_file = pkg_file.with_suffix(pkg_file.suffix + '.sig')
-                    if sig_file.exists():
-                        sig_file.unlink()
-                        logger.info(f"Removed signature: {sig_file.name}")
-                    
+        for pkg_name in [name for name in self._output_index if name not in allowlist]:
+            for _, pkg_file in self._output_index.pop(pkg_name):
+                if self._delete_package_file(pkg_file, "Removed package not in allowlist"):
                     deleted_count += 1
-                except Exception as e:
-                    logger.warning(f"Could not delete {pkg_file}: {e}")
         
         if deleted_count > 0:
             logger.info(f"✅ Allowlist cleanup: Removed {deleted_count} packages not in allowlist")
@@ -383,7 +343,7 @@ class SmartCleanup:
             # Check if package name is in allowlist
             if pkg_name in allowlist:
                 files_to_keep.append(filename)
-                logger.debug(f"Keeping {filename} (allowlist: {pkg_name})")
+                logger.debug("Keeping %s (allowlist: %s)", filename, pkg_name)
             else:
                 files_to_delete.append(filename)
                 logger.info(f"Marking for deletion: {filename} (not in allowlist)")
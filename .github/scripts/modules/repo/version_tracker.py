@@ -4,10 +4,37 @@ Version Tracker Module - Handles package version tracking and comparison
 
 import re
 import logging
+import threading
 from typing import Dict, List, Optional, Tuple, Set
 
 logger = logging.getLogger(__name__)
 
+# Arch package filename: <pkgname>-<[epoch:]pkgver>-<pkgrel>-<arch>.pkg.tar.<ext>
+# pkgver, pkgrel and arch never contain '-', so anchoring the last three
+# components makes hyphenated pkgnames (e.g. ttf-font-awesome-5) unambiguous.
+# Shared by every module that parses package filenames (smart_cleanup,
+# cleanup_manager) so they all classify a file the same way.
+PKG_FILENAME_RE = re.compile(
+    r'^(?P<name>.+)-(?:(?P<epoch>\d+):)?(?P<ver>[^-:]+)-(?P<rel>[^-]+)-(?P<arch>[^-.]+)\.pkg\.tar\.(?:zst|xz)$'
+)
+
+
+def package_file_version(match: re.Match) -> str:
+    """
+    Full version string ([epoch:]pkgver-pkgrel) of a PKG_FILENAME_RE match.
+    
+    Args:
+        match: Successful PKG_FILENAME_RE match
+        
+    Returns:
+        Version string, e.g. '2:26.1.9-1' or '26.1.9-1'
+    """
+    version = f"{match['ver']}-{match['rel']}"
+    return f"{match['epoch']}:{version}" if match['epoch'] else version
+
+# Known architecture suffixes, stripped only as the final token
+_ARCH_SUFFIX_RE = re.compile(r'-(?:x86_64|any|i686|aarch64|armv7h|armv6h)$')
+
 
 class VersionTracker:
     """Handles package version tracking, comparison, and Zero-Residue policy"""
@@ -38,9 +65,16 @@ class VersionTracker:
         self._built_packages: Dict[str, str] = {}  # {pkg_name: built_version} - packages we just built
         self._upload_successful = False
         self._desired_inventory: Set[str] = set()  # NEW: Desired inventory for cleanup guard
+        # Package audits run on a thread pool; registrations touch two dicts
+        self._registry_lock = threading.Lock()
         
         # FIX: Add persistent remote version index
         self._remote_version_index: Dict[str, str] = {}  # {pkg_name: normalized_version}
+        self._inventory_by_name: Dict[str, List[str]] = {}  # {pkg_name: [vps package filenames]}
+        self._inventory_by_version: Dict[Tuple[str, str], List[str]] = {}  # {(pkg_name, normalized_version): [filenames]}
+        # NEW: filename -> (pkg_name, normalized_version); filled by the index build and
+        # reused by the VPS prune pass, which parses the same listing again
+        self._filename_parse_cache: Dict[str, Tuple[Optional[str], Optional[str]]] = {}
     
     def set_desired_inventory(self, desired_inventory: Set[str]):
         """Set the desired inventory for cleanup guard"""
@@ -60,6 +94,8 @@ class VersionTracker:
         """
         logger.info("Building remote version index from VPS package files...")
         self._remote_version_index = {}
+        self._inventory_by_name = {}
+        self._inventory_by_version = {}
         
         processed_count = 0
         fail_count = 0
@@ -69,10 +105,12 @@ class VersionTracker:
             if not (filename.endswith('.pkg.tar.zst') or filename.endswith('.pkg.tar.xz')):
                 continue
             
-            pkg_name, version = self._parse_package_filename_for_index(filename)
+            pkg_name, version = self.parse_package_filename(filename)
             if pkg_name and version:
                 # Store the normalized version
                 self._remote_version_index[pkg_name] = version
+                self._inventory_by_name.setdefault(pkg_name, []).append(filename)
+                self._inventory_by_version.setdefault((pkg_name, version), []).append(filename)
                 processed_count += 1
                 if fail_count < 5:  # Only log first 5 successful parses for debugging
                     logger.info(f"PARSE_VPS_PKG: file={filename} pkg={pkg_name} ver={version}")
@@ -101,6 +139,7 @@ class VersionTracker:
         """
         Parse package name and version from package filename for indexing.
         FIX: Robust parsing for pkgnames ending with digits and where version also starts with digits.
+        Uses the precompiled PKG_FILENAME_RE (single anchored match, no split/join chains).
         
         Args:
             filename: Package filename (e.g., 'ttf-font-awesome-5-5.15.4-1-any.pkg.tar.zst')
@@ -108,94 +147,37 @@ class VersionTracker:
         Returns:
             Tuple of (pkg_name, normalized_version) or (None, None) if cannot parse
         """
-        # Remove extensions
-        if filename.endswith('.pkg.tar.zst'):
-            base = filename[:-12]
-        elif filename.endswith('.pkg.tar.xz'):
-            base = filename[:-11]
-        else:
-            # Not a package file
-            return None, None
-        
-        # Remove known architecture suffixes from the end
-        # These are only stripped if they appear as the final token
-        arch_patterns = [r'-x86_64$', r'-any$', r'-i686$', r'-aarch64$', r'-armv7h$', r'-armv6h$']
-        for pattern in arch_patterns:
-            base = re.sub(pattern, '', base)
-        
-        # Now split by hyphens
-        parts = base.split('-')
-        
-        if len(parts) < 3:  # Need at least pkgname, version, and release
+        m = PKG_FILENAME_RE.match(filename)
+        if not m:
             return None, None
         
-        # Try to find where version starts
-        # We look for patterns that indicate version start:
-        # 1. Contains ':' (epoch:version) - e.g., "1:r1797.88f5a8a"
-        # 2. Contains a dot and digits - e.g., "5.15.4"
-        # 3. Starts with 'r' followed by digits (git revisions) - e.g., "r1797.88f5a8a"
-        # 4. All digits (could be epoch alone)
+        normalized = self.normalize_version_string(package_file_version(m))
+        return m['name'], normalized
+    
+    def get_inventory_files(self, pkg_name: str) -> List[str]:
+        """
+        Get VPS package filenames for a package name from the grouped index.
         
-        # Start from the end and work backwards
-        for i in range(len(parts) - 2, -1, -1):
-            # Check if current part could be the start of version
-            current_part = parts[i]
-            
-            # Check for epoch:version format
-            if ':' in current_part:
-                # This is epoch:version format
-                # The next part should be the release
-                if i + 1 < len(parts) and parts[i + 1].isdigit():
-                    pkg_name = '-'.join(parts[:i])
-                    # Reconstruct version: epoch:version-release
-                    version_str = f"{current_part}-{parts[i + 1]}"
-                    normalized = self.normalize_version_string(version_str)
-                    return pkg_name, normalized
+        Args:
+            pkg_name: Package name
             
-            # Check if current part looks like a version (contains digits and maybe dots/letters)
-            # and next part is a digit (the release)
-            elif i + 1 < len(parts) and parts[i + 1].isdigit():
-                # Check if current part could be a version
-                # It should contain at least one digit
-                if any(c.isdigit() for c in current_part):
-                    # Check if this is actually the package name (e.g., "ttf-font-awesome-5" where "5" is part of pkgname)
-                    # To avoid false positives, we need additional checks
-                    # 1. If current_part is all digits, it might be part of package name (e.g., "ttf-font-awesome-5")
-                    # 2. Look ahead to see if we have a valid version pattern
-                    
-                    # Check if we have a valid version pattern
-                    # A version typically contains a dot or starts with 'r' for git
-                    is_likely_version = (
-                        '.' in current_part or  # e.g., "5.15.4"
-                        current_part.startswith('r') or  # e.g., "r1797.88f5a8a"
-                        ':' in current_part or  # Already handled above
-                        (any(c.isdigit() for c in current_part) and any(c.isalpha() for c in current_part))  # Mixed alphanumeric
-                    )
-                    
-                    if is_likely_version:
-                        pkg_name = '-'.join(parts[:i])
-                        # Reconstruct version: version-release
-                        version_str = f"{current_part}-{parts[i + 1]}"
-                        normalized = self.normalize_version_string(version_str)
-                        return pkg_name, normalized
-                    else:
-                        # Check if the part before current could be the version
-                        # This handles cases like "ttf-font-awesome-5-5.15.4-1"
-                        # Where parts are: ["ttf", "font", "awesome", "5", "5.15.4", "1"]
-                        # "5" is not a version, "5.15.4" is
-                        continue
-        
-        # If we get here, try a simpler approach: assume last 2 parts are version-release
-        # This handles standard cases
-        if len(parts) >= 2:
-            # Check if second to last part could be version and last part is release
-            if parts[-1].isdigit() and any(c.isdigit() for c in parts[-2]):
-                pkg_name = '-'.join(parts[:-2])
-                version_str = f"{parts[-2]}-{parts[-1]}"
-                normalized = self.normalize_version_string(version_str)
-                return pkg_name, normalized
+        Returns:
+            List of package filenames (all versions/architectures), empty if none
+        """
+        return self._inventory_by_name.get(pkg_name, [])
+    
+    def get_inventory_files_for_version(self, pkg_name: str, version: str) -> List[str]:
+        """
+        Get VPS package filenames for one package version (any architecture/compression).
         
-        return None, None
+        Args:
+            pkg_name: Package name
+            version: Version string; normalized (epoch 0 added) before lookup
+            
+        Returns:
+            List of package filenames, empty if none
+        """
+        return self._inventory_by_version.get((pkg_name, self.normalize_version_string(version)), [])
     
     def get_remote_version_index_stats(self) -> Tuple[int, List[str]]:
         """
@@ -218,7 +200,8 @@ class VersionTracker:
             pkg_name: Package name
             target_version: The version we want to keep (either built or latest from server)
         """
-        self._package_target_versions[pkg_name] = target_version
+        with self._registry_lock:
+            self._package_target_versions[pkg_name] = target_version
         logger.info(f"📝 Registered target version for {pkg_name}: {target_version}")
     
     def register_skipped_package(self, pkg_name: str, remote_version: str):
@@ -229,11 +212,12 @@ class VersionTracker:
             pkg_name: Package name
             remote_version: The remote version that should be kept (not deleted)
         """
-        # Store in skipped registry
-        self._skipped_packages[pkg_name] = remote_version
-        
-        # 🚨 CRITICAL: Explicitly set target version to remote version
-        self._package_target_versions[pkg_name] = remote_version
+        with self._registry_lock:
+            # Store in skipped registry
+            self._skipped_packages[pkg_name] = remote_version
+            
+            # 🚨 CRITICAL: Explicitly set target version to remote version
+            self._package_target_versions[pkg_name] = remote_version
         
         logger.info(f"📝 Registered skipped package: {pkg_name} ({remote_version})")
     
@@ -246,13 +230,17 @@ class VersionTracker:
             version: The version to register for all packages
             is_built: True if package was built, False if skipped
         """
+        with self._registry_lock:
+            for pkg_name in pkg_names:
+                if is_built:
+                    self._package_target_versions[pkg_name] = version
+                else:
+                    self._skipped_packages[pkg_name] = version
+                    self._package_target_versions[pkg_name] = version
         for pkg_name in pkg_names:
             if is_built:
-                self._package_target_versions[pkg_name] = version
                 logger.info(f"📝 Registered split package target version for {pkg_name}: {version}")
             else:
-                self._skipped_packages[pkg_name] = version
-                self._package_target_versions[pkg_name] = version
                 logger.info(f"📝 Registered split skipped package: {pkg_name} ({version})")
     
     def get_target_version(self, pkg_name: str) -> Optional[str]:
@@ -291,7 +279,8 @@ class VersionTracker:
     def parse_package_filename(self, filename: str) -> Tuple[Optional[str], Optional[str]]:
         """
         Parse package name and version from package filename.
-        Uses the same logic as _parse_package_filename_for_index for consistency.
+        Uses the same logic as _parse_package_filename_for_index for consistency;
+        results are memoized per filename since a name always parses the same way.
         
         Args:
             filename: Package filename (e.g., 'package-1.0-1-x86_64.pkg.tar.zst')
@@ -299,7 +288,11 @@ class VersionTracker:
         Returns:
             Tuple of (pkg_name, normalized_version) or (None, None) if cannot parse
         """
-        return self._parse_package_filename_for_index(filename)
+        parsed = self._filename_parse_cache.get(filename)
+        if parsed is None:
+            parsed = self._parse_package_filename_for_index(filename)
+            self._filename_parse_cache[filename] = parsed
+        return parsed
     
     def package_exists(self, pkg_name: str, remote_files: List[str]) -> bool:
         """Check if package exists on server"""
@@ -319,11 +312,8 @@ class VersionTracker:
         if not version_string:
             return version_string
             
-        # Remove known architecture suffixes from the end
-        # These are only stripped if they appear as the final token
-        arch_patterns = [r'-x86_64$', r'-any$', r'-i686$', r'-aarch64$', r'-armv7h$', r'-armv6h$']
-        for pattern in arch_patterns:
-            version_string = re.sub(pattern, '', version_string)
+        # Remove known architecture suffix from the end (final token only)
+        version_string = _ARCH_SUFFIX_RE.sub('', version_string)
         
         # Ensure epoch format: if no epoch, prepend "0:"
         if ':' not in version_string:
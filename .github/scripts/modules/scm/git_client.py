@@ -3,14 +3,29 @@ Git Client Module - Handles Git operations
 """
 
 import os
+import random
+import shutil
 import subprocess
 import tempfile
+import time
 import logging
 from pathlib import Path
 from modules.common.shell_executor import ShellExecutor
 
 logger = logging.getLogger(__name__)
 
+# Abort transfers that stall below 1 KB/s for 10s instead of hanging until
+# the command timeout; never block on a credential prompt
+GIT_NETWORK_ENV = {
+    'GIT_HTTP_LOW_SPEED_LIMIT': '1000',
+    'GIT_HTTP_LOW_SPEED_TIME': '10',
+    'GIT_TERMINAL_PROMPT': '0',
+}
+
+# Clone failures that mean the repository does not exist or is not
+# readable; retrying them only wastes time
+_FATAL_CLONE_ERRORS = ("not found", "does not appear to be a git repository", "Authentication failed")
+
 
 class GitClient:
     """Handles Git operations for repository management"""
@@ -21,35 +36,74 @@ class GitClient:
         self.shell_executor = ShellExecutor(debug_mode=debug_mode)
         self.current_dir = None
     
-    def clone_repository(self, target_dir: str, depth: int = 1, repo_url: str = None) -> bool:
-        """Clone a Git repository"""
+    def clone_repository(self, target_dir: str, depth: int = 1, repo_url: str = None,
+                         max_retries: int = 3, base_delay: float = 2.0) -> bool:
+        """
+        Clone a Git repository, retrying transient failures.
+        
+        Retries wait base_delay * 2**attempt * (0.5 + random()) seconds so
+        concurrent clones rate-limited by the same host do not retry in step.
+        Missing repositories fail immediately.
+        
+        Args:
+            target_dir: Clone destination
+            depth: Shallow clone depth
+            repo_url: Repository URL (defaults to the client's repo_url)
+            max_retries: Total clone attempts
+            base_delay: Backoff base in seconds
+            
+        Returns:
+            True if the clone succeeded
+        """
         url = repo_url or self.repo_url
         if not url:
             logger.error("No repository URL provided")
             return False
         
-        cmd = ["git", "clone", "--depth", str(depth), url, target_dir]
+        # Protocol v2 only advertises the refs we ask for; a single branch
+        # without tags keeps the shallow fetch to exactly one commit
+        cmd = ['git', '-c', 'protocol.version=2']
         
         # Add SSH options if provided
         if self.ssh_options:
             ssh_cmd = " ".join(self.ssh_options)
-            cmd_str = f"git -c core.sshCommand='ssh {ssh_cmd}' clone --depth {depth} {url} {target_dir}"
-        else:
-            cmd_str = f"git clone --depth {depth} {url} {target_dir}"
+            cmd += ['-c', f'core.sshCommand=ssh {ssh_cmd}']
+        
+        cmd += ['clone', f'--depth={depth}', '--single-branch', '--no-tags', url, str(target_dir)]
         
         logger.info("SHELL_EXECUTOR_USED=1")
-        try:
-            result = self.shell_executor.run_command(cmd_str, capture=True, check=False)
+        for attempt in range(max_retries):
+            if attempt > 0:
+                delay = base_delay * (2 ** (attempt - 1)) * (0.5 + random.random())
+                logger.info(f"GIT_CLONE_RETRY attempt={attempt} max={max_retries} delay={delay:.1f}s url={url}")
+                time.sleep(delay)
+                # A failed clone may leave a partial checkout; git needs an empty target
+                if os.path.isdir(target_dir) and os.listdir(target_dir):
+                    shutil.rmtree(target_dir, ignore_errors=True)
+                    os.makedirs(target_dir, exist_ok=True)
+            try:
+                result = self.shell_executor.run_command(cmd, capture=True, check=False,
+                                                         timeout=300, extra_env=GIT_NETWORK_ENV)
+            except subprocess.TimeoutExpired:
+                logger.warning(f"⚠️ Clone timed out: {url}")
+                continue
+            except Exception as e:
+                logger.error(f"❌ Error cloning repository: {e}")
+                return False
+            
             if result.returncode == 0:
                 logger.info(f"✅ Successfully cloned repository to {target_dir}")
                 self.current_dir = target_dir
                 return True
-            else:
-                logger.error(f"❌ Failed to clone repository: {result.stderr}")
+            
+            stderr = result.stderr or ""
+            if any(marker in stderr for marker in _FATAL_CLONE_ERRORS):
+                logger.error(f"❌ Failed to clone repository: {stderr}")
                 return False
-        except Exception as e:
-            logger.error(f"❌ Error cloning repository: {e}")
-            return False
+            logger.warning(f"⚠️ Clone attempt {attempt + 1}/{max_retries} failed: {stderr[:200]}")
+        
+        logger.error(f"❌ Failed to clone repository after {max_retries} attempts: {url}")
+        return False
     
     def clone_with_ssh_key(self, target_dir: str, ssh_key: str, depth: int = 1, repo_url: str = None) -> bool:
         """
@@ -103,8 +157,7 @@ class GitClient:
         finally:
             # Cleanup SSH key file
             try:
-                if ssh_key_path.exists():
-                    ssh_key_path.unlink()
+                ssh_key_path.unlink(missing_ok=True)
             except Exception:
                 pass
     
@@ -8,8 +8,9 @@ import subprocess
 import shutil
 import time
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Optional
+from typing import Dict, List, Optional, Set
 
 logger = logging.getLogger(__name__)
 
@@ -28,14 +29,43 @@ class RsyncClient:
                 - remote_dir: Remote directory on VPS
                 - ssh_options: SSH options list
                 - repo_name: Repository name
+                - rsync_upload_streams: Parallel rsync processes for uploads
+                - rsync_mirror_streams: Parallel rsync processes for mirror downloads
         """
         self.vps_user = config['vps_user']
         self.vps_host = config['vps_host']
         self.remote_dir = config['remote_dir']
         self.ssh_options = config.get('ssh_options', [])
         self.repo_name = config.get('repo_name', '')
+        self.upload_streams = max(1, int(config.get('rsync_upload_streams') or 1))
+        self.mirror_streams = max(1, int(config.get('rsync_mirror_streams') or 1))
     
-    def mirror_remote_packages(self, mirror_temp_dir: Path, output_dir: Path, vps_package_files: List[str]) -> bool:
+    def default_mirror_excludes(self, include_signatures: bool = True) -> List[str]:
+        """
+        Rsync exclude patterns for files the pipeline regenerates locally.
+        
+        Args:
+            include_signatures: Also exclude *.sig (safe whenever signing re-creates them)
+            
+        Returns:
+            List of rsync --exclude patterns
+        """
+        excludes = [f"{self.repo_name}.db*", f"{self.repo_name}.files*"] if self.repo_name else []
+        if include_signatures:
+            excludes.append("*.sig")
+        return excludes
+    
+    @staticmethod
+    def _package_names(directory: Path) -> Set[str]:
+        """Names of non-directory entries matching *.pkg.tar.* (one os.scandir pass)."""
+        try:
+            with os.scandir(directory) as entries:
+                return {e.name for e in entries if '.pkg.tar.' in e.name and not e.is_dir()}
+        except FileNotFoundError:
+            return set()
+    
+    def mirror_remote_packages(self, mirror_temp_dir: Path, output_dir: Path, vps_package_files: List[str],
+                               exclude: Optional[List[str]] = None) -> bool:
         """
         Download ONLY remote package files (*.pkg.tar.*) to local directory.
         
@@ -47,6 +77,8 @@ class RsyncClient:
             output_dir: Output directory for built packages
             vps_package_files: List of package filenames (basenames) currently on VPS
                              MUST contain ONLY *.pkg.tar.* files (no .sig, no .db)
+            exclude: Extra rsync --exclude patterns (DB and signature files that are
+                     regenerated locally); defaults to default_mirror_excludes()
             
         Returns:
             True if successful, False otherwise
@@ -63,8 +95,7 @@ class RsyncClient:
         # Create a temporary local repository directory
         if mirror_temp_dir.exists():
             # First, check what's in the mirror directory (from cache)
-            cached_files = list(mirror_temp_dir.glob("*.pkg.tar.*"))
-            cached_file_names = set(f.name for f in cached_files)
+            cached_file_names = self._package_names(mirror_temp_dir)
             
             logger.info(f"Cache state: {len(cached_file_names)} package files in mirror directory")
             
@@ -76,9 +107,8 @@ class RsyncClient:
                 for file_name in files_to_delete:
                     file_path = mirror_temp_dir / file_name
                     try:
-                        if file_path.exists():
-                            file_path.unlink()
-                            logger.debug(f"Removed from mirror: {file_name}")
+                        file_path.unlink(missing_ok=True)
+                        logger.debug("Removed from mirror: %s", file_name)
                     except Exception as e:
                         logger.warning(f"Could not remove {file_name}: {e}")
             
@@ -101,43 +131,61 @@ class RsyncClient:
             for file_name in files_to_download:
                 # Ensure it's a package file (safety check)
                 if file_name.endswith(('.pkg.tar.zst', '.pkg.tar.xz')):
-                    remote_path = f"{self.remote_dir}/{file_name}"
-                    download_list.append(f"'{self.vps_user}@{self.vps_host}:{remote_path}'")
+                    download_list.append(file_name)
                 else:
                     logger.warning(f"Skipping non-package file in download list: {file_name}")
             
             if download_list:
-                files_str = ' '.join(download_list)
-                rsync_cmd = f"""
-                rsync -avz \
-                  --progress \
-                  --stats \
-                  -e "ssh -o StrictHostKeyChecking=no -o ConnectTimeout=60" \
-                  {files_str} \
-                  '{mirror_temp_dir}/' 2>/dev/null || true
-                """
+                # Each rsync session runs over one SSH connection with its file
+                # list fed on stdin (--files-from=-); large downloads are split
+                # round-robin over parallel sessions. Packages are already
+                # compressed and new locally, so -z and the delta algorithm
+                # only cost CPU (--whole-file)
+                excludes = self.default_mirror_excludes() if exclude is None else exclude
+                ordered = sorted(download_list)
+                shard_count = max(1, min(self.mirror_streams, len(ordered)))
+                shards = [ordered[i::shard_count] for i in range(shard_count)]
+                # Parallel shards each get their own connection (no shared ControlMaster)
+                ssh_options = self._unmultiplexed(self.ssh_options) if shard_count > 1 else self.ssh_options
+                rsync_cmd = [
+                    "rsync", "-av", "--whole-file", "--stats",
+                    "--files-from=-",
+                    *[f"--exclude={pattern}" for pattern in excludes],
+                    "-e", " ".join(["ssh", "-o", "StrictHostKeyChecking=no", "-o", "ConnectTimeout=60", *ssh_options]),
+                    f"{self.vps_user}@{self.vps_host}:{self.remote_dir}/",
+                    f"{mirror_temp_dir}/",
+                ]
                 
-                logger.info(f"RUNNING RSYNC DOWNLOAD COMMAND for {len(download_list)} package files")
+                logger.info(f"RUNNING RSYNC DOWNLOAD COMMAND for {len(download_list)} package files (--files-from) streams={shard_count}")
                 
-                start_time = time.time()
-                
-                try:
-                    result = subprocess.run(
+                def download_shard(shard: List[str]) -> subprocess.CompletedProcess:
+                    return subprocess.run(
                         rsync_cmd,
-                        shell=True,
+                        input="\n".join(shard) + "\n",
                         capture_output=True,
                         text=True,
                         check=False
                     )
+                
+                start_time = time.time()
+                
+                try:
+                    if shard_count == 1:
+                        results = [download_shard(shards[0])]
+                    else:
+                        with ThreadPoolExecutor(max_workers=shard_count) as executor:
+                            results = list(executor.map(download_shard, shards))
                     
                     end_time = time.time()
                     duration = int(end_time - start_time)
                     
-                    logger.info(f"EXIT CODE: {result.returncode}")
-                    if result.stdout:
-                        for line in result.stdout.splitlines()[-10:]:
-                            if line.strip():
-                                logger.info(f"RSYNC: {line}")
+                    for index, result in enumerate(results):
+                        label = f" SHARD {index + 1}/{shard_count}" if shard_count > 1 else ""
+                        logger.info(f"EXIT CODE{label}: {result.returncode}")
+                        if result.stdout:
+                            for line in result.stdout.splitlines()[-10:]:
+                                if line.strip():
+                                    logger.info(f"RSYNC{label}: {line}")
                     
                     # Count actual downloaded files by checking which of the files_to_download now exist
                     downloaded_count = 0
@@ -159,27 +207,17 @@ class RsyncClient:
         # Only copy from mirror to output_dir if file doesn't exist in output_dir
         # Never delete from output_dir as it may contain newly built packages
         
-        mirror_files = list(mirror_temp_dir.glob("*.pkg.tar.*"))
-        output_files = set(f.name for f in output_dir.glob("*.pkg.tar.*"))
+        # One scan per directory; the mirror listing doubles as the final
+        # validation state since nothing below modifies the mirror
+        final_mirror_names = self._package_names(mirror_temp_dir)
+        output_files = self._package_names(output_dir)
         
-        copied_count = 0
-        for mirror_file in mirror_files:
-            dest = output_dir / mirror_file.name
-            if not dest.exists():
-                try:
-                    shutil.copy2(mirror_file, dest)
-                    copied_count += 1
-                    logger.debug(f"Copied to output_dir: {mirror_file.name}")
-                except Exception as e:
-                    logger.warning(f"Could not copy {mirror_file.name}: {e}")
+        copied_count = self._copy_into(mirror_temp_dir, output_dir, sorted(final_mirror_names - output_files))
         
         if copied_count > 0:
             logger.info(f"Copied {copied_count} mirrored packages to output directory")
         
         # CRITICAL VALIDATION: Ensure mirror matches VPS package state ONLY
-        final_mirror_files = list(mirror_temp_dir.glob("*.pkg.tar.*"))
-        final_mirror_names = set(f.name for f in final_mirror_files)
-        
         # Log validation details
         logger.info(f"Mirror synchronization validation:")
         logger.info(f"  - Mirror now has {len(final_mirror_names)} package files")
@@ -218,6 +256,51 @@ class RsyncClient:
         
         return True
     
+    @staticmethod
+    def _copy_into(source_dir: Path, dest_dir: Path, names: List[str], batch_size: int = 256) -> int:
+        """
+        Copy files (with timestamps) from source_dir into dest_dir.
+        
+        Batches go through one `cp --reflink=auto` each, which shares extents
+        on btrfs/xfs and falls back to a kernel-side copy elsewhere. Hardlinks
+        are not used: makepkg rewrites package files in place, which would
+        corrupt the mirror copy used for upload diffing. Files of a failed
+        batch are retried one by one with shutil.copy2.
+        
+        Args:
+            source_dir: Directory holding the files
+            dest_dir: Destination directory
+            names: Basenames to copy
+            batch_size: Files per cp invocation
+            
+        Returns:
+            Number of files copied
+        """
+        copied = 0
+        for i in range(0, len(names), batch_size):
+            batch = names[i:i + batch_size]
+            try:
+                result = subprocess.run(
+                    ["cp", "--reflink=auto", "--preserve=mode,timestamps", "-t", str(dest_dir),
+                     *[str(source_dir / name) for name in batch]],
+                    capture_output=True,
+                    text=True,
+                    check=False
+                )
+                if result.returncode == 0:
+                    copied += len(batch)
+                    continue
+                logger.debug(f"cp --reflink batch failed, copying individually: {result.stderr[:200]}")
+            except OSError as e:
+                logger.debug(f"cp unavailable, copying individually: {e}")
+            for name in batch:
+                try:
+                    shutil.copy2(source_dir / name, dest_dir / name)
+                    copied += 1
+                except Exception as e:
+                    logger.warning(f"Could not copy {name}: {e}")
+        return copied
+    
     def upload_files(self, files_to_upload: List[str], output_dir: Path, cleanup_manager=None, remote_path: Optional[str] = None) -> bool:
         """
         Upload files to remote server using RSYNC.
@@ -256,14 +339,14 @@ class RsyncClient:
             except Exception:
                 logger.info(f"  - {os.path.basename(f)} [UNKNOWN SIZE]")
         
-        # Helper to run a command and return success/failure
-        def run_rsync(cmd_str: str, attempt_label: str) -> bool:
+        # Helper to run one rsync (file list on stdin) and return success/failure
+        def run_rsync(cmd: List[str], file_list: str, attempt_label: str) -> bool:
             logger.info(f"RUNNING RSYNC COMMAND {attempt_label}")
             start_time = time.time()
             try:
                 result = subprocess.run(
-                    cmd_str,
-                    shell=True,
+                    cmd,
+                    input=file_list,
                     capture_output=True,
                     text=True,
                     check=False
@@ -291,32 +374,122 @@ class RsyncClient:
                 logger.error(f"RSYNC execution error {attempt_label}: {e}")
                 return False
         
-        # Build base rsync command without any --link-dest
-        files_str = ' '.join(f"'{f}'" for f in files_to_upload)
-        ssh_part = f"-e \"ssh {' '.join(self.ssh_options)}\""
-        rsync_cmd = (
-            f"rsync -avz --progress --stats "
-            f"{ssh_part} "
-            f"{files_str} "
-            f"'{self.vps_user}@{self.vps_host}:{dest_path}/'"
-        )
-        
-        # FIRST ATTEMPT (default SSH options)
-        if run_rsync(rsync_cmd, "ATTEMPT 1"):
-            return True
-        
-        # SECOND ATTEMPT (with different SSH options)
-        logger.info("Retrying with different SSH options...")
-        time.sleep(5)
-        alt_ssh_part = "-e \"ssh -o StrictHostKeyChecking=no -o ConnectTimeout=60 -o ServerAliveInterval=30 -o ServerAliveCountMax=3\""
-        alt_rsync_cmd = (
-            f"rsync -avz --progress --stats "
-            f"{alt_ssh_part} "
-            f"{files_str} "
-            f"'{self.vps_user}@{self.vps_host}:{dest_path}/'"
-        )
-        if run_rsync(alt_rsync_cmd, "ATTEMPT 2"):
-            return True
+        # Files are named relative to their directory via --files-from, so
+        # epoch colons in filenames are never parsed as host:path
+        def build_cmd(ssh_options: List[str], source_dir: str) -> List[str]:
+            return [
+                "rsync", "-avz", "--progress", "--stats",
+                "--files-from=-",
+                "-e", " ".join(["ssh", *ssh_options]),
+                f"{source_dir}/",
+                f"{self.vps_user}@{self.vps_host}:{dest_path}/"
+            ]
+        
+        alt_ssh_options = ["-o", "StrictHostKeyChecking=no", "-o", "ConnectTimeout=60",
+                           "-o", "ServerAliveInterval=30", "-o", "ServerAliveCountMax=3"]
+        
+        # Split into size-balanced shards uploaded by parallel rsync processes
+        # (destination is a staging dir, promoted atomically, so order is irrelevant)
+        shards = self._balance_shards(files_to_upload, self.upload_streams)
+        # Parallel shards each get their own connection (no shared ControlMaster)
+        primary_ssh_options = self._unmultiplexed(self.ssh_options) if len(shards) > 1 else self.ssh_options
+        
+        def upload_shard(label: str, shard: List[str]) -> bool:
+            by_dir: Dict[str, List[str]] = {}
+            for f in shard:
+                by_dir.setdefault(os.path.dirname(os.path.abspath(f)), []).append(os.path.basename(f))
+            
+            shard_ok = True
+            for source_dir, names in by_dir.items():
+                file_list = "\n".join(names) + "\n"
+                
+                # FIRST ATTEMPT (default SSH options)
+                if run_rsync(build_cmd(primary_ssh_options, source_dir), file_list, f"ATTEMPT 1{label}"):
+                    continue
+                
+                # SECOND ATTEMPT (with different SSH options)
+                logger.info("Retrying with different SSH options...")
+                time.sleep(5)
+                if run_rsync(build_cmd(alt_ssh_options, source_dir), file_list, f"ATTEMPT 2{label}"):
+                    continue
+                shard_ok = False
+            return shard_ok
+        
+        if len(shards) == 1:
+            if upload_shard("", shards[0]):
+                return True
+        else:
+            logger.info(f"RSYNC_PARALLEL_UPLOAD streams={len(shards)} files={len(files_to_upload)}")
+            with ThreadPoolExecutor(max_workers=len(shards)) as executor:
+                results = list(executor.map(
+                    lambda item: upload_shard(f" SHARD {item[0] + 1}/{len(shards)}", item[1]),
+                    enumerate(shards)
+                ))
+            if all(results):
+                return True
+            logger.error(f"RSYNC_PARALLEL_UPLOAD_FAIL failed_shards={results.count(False)}/{len(shards)}")
         
         logger.error("RSYNC upload failed on both attempts!")
         return False
+    
+    @staticmethod
+    def _unmultiplexed(ssh_options: List[str]) -> List[str]:
+        """
+        SSH options for a parallel rsync shard: drop the ControlMaster settings and
+        force a dedicated connection, so shards do not funnel through one master.
+        
+        Args:
+            ssh_options: Shared SSH options (may carry ControlMaster/ControlPath/ControlPersist)
+            
+        Returns:
+            Options list with multiplexing disabled
+        """
+        options: List[str] = []
+        skip_next = False
+        for index, option in enumerate(ssh_options):
+            if skip_next:
+                skip_next = False
+                continue
+            value = option
+            if option == "-o" and index + 1 < len(ssh_options):
+                value = ssh_options[index + 1]
+                skip_next = True
+            elif option.startswith("-o"):
+                value = option[2:]
+            else:
+                options.append(option)
+                continue
+            if not value.strip().lower().startswith("control"):
+                options.extend(["-o", value])
+        # ssh keeps the first value it sees for an option, hence the stripping above
+        return options + ["-o", "ControlMaster=no", "-o", "ControlPath=none"]
+    
+    @staticmethod
+    def _balance_shards(files: List[str], streams: int) -> List[List[str]]:
+        """
+        Greedy size-balanced split: largest files first, each into the lightest shard.
+        
+        Args:
+            files: File paths
+            streams: Maximum number of shards
+            
+        Returns:
+            Non-empty shards (a single shard when streams <= 1)
+        """
+        count = max(1, min(streams, len(files)))
+        if count == 1:
+            return [list(files)]
+        
+        def size_of(path: str) -> int:
+            try:
+                return os.path.getsize(path)
+            except OSError:
+                return 0
+        
+        shards: List[List[str]] = [[] for _ in range(count)]
+        totals = [0] * count
+        for path, size in sorted(((f, size_of(f)) for f in files), key=lambda item: item[1], reverse=True):
+            lightest = totals.index(min(totals))
+            shards[lightest].append(path)
+            totals[lightest] += size
+        return [shard for shard in shards if shard]
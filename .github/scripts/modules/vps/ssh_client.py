@@ -4,14 +4,16 @@ WITH STAGING SUPPORT FOR ATOMIC PUBLISH AND PROMOTION LOCK
 """
 
 import os
+import json
 import subprocess
 import shutil
 import logging
 import random
 import string
+import time
 import datetime
 from pathlib import Path
-from typing import List, Tuple, Optional, Set
+from typing import FrozenSet, List, Tuple, Optional, Set
 
 logger = logging.getLogger(__name__)
 
@@ -30,12 +32,29 @@ class SSHClient:
                 - remote_dir: Remote directory on VPS
                 - ssh_options: SSH options list
                 - repo_name: Repository name
+                - inventory_cache_file: Optional path for the persisted
+                  remote package listing (cross-run cache)
+                - inventory_cache_max_age: Seconds the persisted listing may
+                  be reused (0 = no limit)
+                - ssh_control_path: Optional ControlPath for SSH multiplexing
+                - ssh_control_persist: Seconds an idle master connection persists
         """
         self.vps_user = config['vps_user']
         self.vps_host = config['vps_host']
         self.remote_dir = config['remote_dir']
         self.ssh_options = config.get('ssh_options', [])
         self.repo_name = config.get('repo_name', '')
+        self.control_path = config.get('ssh_control_path')
+        self.control_persist = int(config.get('ssh_control_persist') or 600)
+
+        # In-process cache of the remote package listing (basenames)
+        self._inventory_cache: Optional[List[str]] = None
+        self._signature_cache: Optional[List[str]] = None  # *.sig basenames from the same listing
+        self._file_set_cache: Optional[FrozenSet[str]] = None  # packages | signatures, built on demand
+        # On-disk cache of the same listing, keyed by remote_dir mtime
+        cache_file = config.get('inventory_cache_file')
+        self.inventory_cache_file: Optional[Path] = Path(cache_file) if cache_file else None
+        self.inventory_cache_max_age = int(config.get('inventory_cache_max_age') or 0)
 
     def generate_run_id(self) -> str:
         """
@@ -261,8 +280,7 @@ echo "CLEANUP_OK"
             )
 
             if result.returncode == 0:
-                files = [f.strip() for f in result.stdout.split('\n')
-                         if f.strip() and f.strip() != 'NO_FILES']
+                files = [f for f in map(str.strip, result.stdout.splitlines()) if f and f != 'NO_FILES']
                 logger.info(f"REMOTE_FILE_LIST path={target} count={len(files)}")
                 return files
             else:
@@ -316,6 +334,12 @@ echo "CLEANUP_OK"
   ServerAliveInterval 15
   ServerAliveCountMax 3
 """
+        # Multiplex every ssh/rsync call to the VPS over one master connection
+        if self.control_path:
+            config_content += f"""  ControlMaster auto
+  ControlPath {self.control_path}
+  ControlPersist {self.control_persist}
+"""
 
         config_file = ssh_dir / "config"
         with open(config_file, "w") as f:
@@ -336,6 +360,65 @@ echo "CLEANUP_OK"
         except Exception as e:
             logger.warning(f"Could not change SSH dir ownership: {e}")
 
+    def open_master(self) -> bool:
+        """
+        Start the shared SSH master connection in the background (ssh -MNf).
+        Later ssh/rsync calls attach to it through the ControlPath in the ssh
+        config instead of doing their own handshake.
+
+        Returns:
+            True if the master is running, False otherwise (calls then connect directly)
+        """
+        if not self.control_path:
+            return False
+
+        ssh_cmd = [
+            "ssh",
+            # ssh keeps the first value of an option, so these precede ssh_options
+            "-o", "ControlMaster=yes",
+            "-o", f"ControlPath={self.control_path}",
+            "-o", f"ControlPersist={self.control_persist}",
+            *self.ssh_options,
+            "-MNf",
+            f"{self.vps_user}@{self.vps_host}"
+        ]
+        try:
+            result = subprocess.run(
+                ssh_cmd,
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE,
+                text=True,
+                check=False,
+                timeout=60
+            )
+        except Exception as e:
+            logger.warning(f"SSH_MUX_OPEN=0 error={e}")
+            return False
+
+        if result.returncode == 0:
+            logger.info(f"SSH_MUX_OPEN=1 persist={self.control_persist}s")
+            return True
+        logger.warning(f"SSH_MUX_OPEN=0 rc={result.returncode} stderr={(result.stderr or '')[:200]}")
+        return False
+
+    def close_master(self):
+        """Stop the shared SSH master connection (no-op if none is running)."""
+        if not self.control_path:
+            return
+        try:
+            subprocess.run(
+                ["ssh", "-o", f"ControlPath={self.control_path}", "-O", "exit", f"{self.vps_user}@{self.vps_host}"],
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                check=False,
+                timeout=15
+            )
+            logger.info("SSH_MUX_CLOSED=1")
+        except Exception as e:
+            logger.warning(f"SSH_MUX_CLOSE_FAIL error={e}")
+
     def test_ssh_connection(self) -> bool:
         """Test SSH connection to VPS"""
         logger.info("Testing SSH connection to VPS...")
@@ -594,17 +677,29 @@ find "{target_dir}" -type f -exec chmod 644 {{}} \\;
 
     def list_remote_packages(self) -> List[str]:
         """List all *.pkg.tar.zst and *.pkg.tar.xz files in the remote repository directory (basenames only)"""
-        logger.info("Listing remote repository packages (SSH find)...")
+        packages, _ = self.list_remote_packages_and_signatures()
+        return packages
+
+    def list_remote_packages_and_signatures(self) -> Tuple[List[str], List[str]]:
+        """
+        List package files and signature files in the remote repository
+        directory with a single SSH find, partitioned locally by suffix.
+
+        Returns:
+            Tuple of (package basenames, signature basenames)
+        """
+        logger.info("Listing remote repository packages and signatures (SSH find)...")
 
         ssh_key_path = "/home/builder/.ssh/id_ed25519"
         if not os.path.exists(ssh_key_path):
             logger.error(f"SSH key not found")
-            return []
+            return [], []
 
         ssh_cmd = [
             "ssh",
+            *self.ssh_options,
             f"{self.vps_user}@{self.vps_host}",
-            rf'find "{self.remote_dir}" -maxdepth 1 -type f \( -name "*.pkg.tar.zst" -o -name "*.pkg.tar.xz" \) -printf "%f\\n" 2>/dev/null || echo "NO_FILES"'
+            rf'find "{self.remote_dir}" -maxdepth 1 \( -type f \( -name "*.pkg.tar.zst" -o -name "*.pkg.tar.xz" \) -o \( -type f -o -type l \) -name "*.sig" \) -printf "%f\\n" 2>/dev/null || echo "NO_FILES"'
         ]
 
         try:
@@ -616,13 +711,208 @@ find "{target_dir}" -type f -exec chmod 644 {{}} \\;
             )
 
             if result.returncode == 0:
-                files = [f.strip() for f in result.stdout.split('\n') if f.strip() and f.strip() != 'NO_FILES']
-                logger.info(f"Found {len(files)} package files on remote server")
-                return files
+                packages = []
+                signatures = []
+                for f in map(str.strip, result.stdout.splitlines()):
+                    if not f or f == 'NO_FILES':
+                        continue
+                    if f.endswith('.sig'):
+                        signatures.append(f)
+                    elif f.endswith(('.pkg.tar.zst', '.pkg.tar.xz')):
+                        packages.append(f)
+                logger.info(f"Found {len(packages)} package files and {len(signatures)} signatures on remote server")
+                return packages, signatures
             else:
                 logger.warning(f"SSH find returned error")
-                return []
+                return [], []
 
         except Exception as e:
             logger.error(f"SSH command failed: {e}")
+            return [], []
+
+    def get_remote_dir_mtime(self) -> Optional[int]:
+        """
+        Get the modification time of remote_dir with a single remote stat.
+        The directory mtime changes whenever a file is added, removed or renamed.
+
+        Returns:
+            Epoch seconds, or None if the stat failed
+        """
+        ssh_cmd = [
+            "ssh",
+            *self.ssh_options,
+            f"{self.vps_user}@{self.vps_host}",
+            f'stat -c %Y "{self.remote_dir}"'
+        ]
+
+        try:
+            result = subprocess.run(
+                ssh_cmd,
+                capture_output=True,
+                text=True,
+                check=False,
+                timeout=30
+            )
+            if result.returncode == 0 and result.stdout.strip().isdigit():
+                return int(result.stdout.strip())
+            logger.warning(f"REMOTE_DIR_STAT_FAIL rc={result.returncode} stderr={result.stderr[:200]}")
+        except Exception as e:
+            logger.warning(f"REMOTE_DIR_STAT_EXCEPTION error={str(e)[:200]}")
+        return None
+
+    def _load_inventory_file(self, remote_mtime: int) -> Optional[Tuple[List[str], List[str]]]:
+        """Load the persisted (packages, signatures) inventory if it was recorded at remote_mtime"""
+        if not self.inventory_cache_file or not self.inventory_cache_file.exists():
+            return None
+        try:
+            with open(self.inventory_cache_file, 'r') as f:
+                data = json.load(f)
+            if data.get('remote_mtime') != remote_mtime:
+                logger.info(f"INVENTORY_CACHE_STALE cached_mtime={data.get('remote_mtime')} remote_mtime={remote_mtime}")
+                return None
+            if self.inventory_cache_max_age:
+                age = time.time() - float(data.get('saved_at') or 0)
+                if age > self.inventory_cache_max_age:
+                    logger.info(f"INVENTORY_CACHE_EXPIRED age={int(age)}s max_age={self.inventory_cache_max_age}s")
+                    return None
+            files = data.get('files')
+            signatures = data.get('signatures')
+            if not isinstance(files, list) or not isinstance(signatures, list):
+                return None
+            return files, signatures
+        except Exception as e:
+            logger.warning(f"INVENTORY_CACHE_READ_FAIL path={self.inventory_cache_file} error={e}")
+            return None
+
+    def _save_inventory_file(self, remote_mtime: int, files: List[str], signatures: List[str]) -> None:
+        """Persist the inventory together with the remote_dir mtime it was taken at"""
+        if not self.inventory_cache_file:
+            return
+        try:
+            self.inventory_cache_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.inventory_cache_file.with_suffix('.tmp')
+            with open(tmp_path, 'w') as f:
+                json.dump({'remote_mtime': remote_mtime, 'saved_at': time.time(),
+                           'files': files, 'signatures': signatures}, f)
+            os.replace(tmp_path, self.inventory_cache_file)
+        except Exception as e:
+            logger.warning(f"INVENTORY_CACHE_WRITE_FAIL path={self.inventory_cache_file} error={e}")
+
+    def update_cached_inventory(self, remote_files: List[str]) -> List[str]:
+        """
+        Replace the cached inventory with a listing taken after an upload.
+
+        Keeps the in-memory inventory in step with the VPS and re-keys the
+        on-disk cache to the new remote_dir mtime, so the next run can reuse
+        it instead of running another remote find.
+
+        An empty listing is what list_remote_files() returns when SSH fails;
+        it is never cached, and the on-disk cache is dropped instead.
+
+        Args:
+            remote_files: Fresh basename listing of remote_dir
+
+        Returns:
+            List of package filenames (basenames) now cached
+        """
+        if not remote_files:
+            logger.warning("REMOTE_INVENTORY_REFRESH_SKIPPED reason=empty_listing")
+            self.invalidate_inventory_cache()
             return []
+
+        # One pass partitions the listing into packages and signatures
+        packages = []
+        signatures = []
+        for f in remote_files:
+            if f.endswith(('.pkg.tar.zst', '.pkg.tar.xz')):
+                packages.append(f)
+            elif f.endswith('.sig'):
+                signatures.append(f)
+        self._inventory_cache = packages
+        self._signature_cache = signatures
+        self._file_set_cache = None
+        logger.info(f"REMOTE_INVENTORY_REFRESHED count={len(packages)}")
+
+        if self.inventory_cache_file and packages:
+            remote_mtime = self.get_remote_dir_mtime()
+            if remote_mtime is not None:
+                self._save_inventory_file(remote_mtime, packages, self._signature_cache)
+
+        return list(packages)
+
+    def invalidate_inventory_cache(self) -> None:
+        """
+        Drop the in-memory listing and the persisted inventory file, so the
+        next get_cached_inventory() lists remote_dir again.
+        """
+        self._inventory_cache = None
+        self._signature_cache = None
+        self._file_set_cache = None
+        if self.inventory_cache_file:
+            try:
+                self.inventory_cache_file.unlink(missing_ok=True)
+            except OSError as e:
+                logger.warning(f"INVENTORY_CACHE_INVALIDATE_FAIL path={self.inventory_cache_file} error={e}")
+
+    def get_cached_inventory(self, refresh: bool = False) -> List[str]:
+        """
+        Return the remote package listing, fetching it with a single SSH find
+        on first use and serving it from memory afterwards.
+
+        When inventory_cache_file is configured, the listing is also persisted
+        across runs and reused as long as the remote_dir mtime is unchanged
+        and the file is younger than inventory_cache_max_age.
+
+        Args:
+            refresh: Force a new remote listing even if one is cached
+
+        Returns:
+            List of package filenames (basenames) on the VPS
+        """
+        if self._inventory_cache is not None and not refresh:
+            return list(self._inventory_cache)
+
+        remote_mtime = self.get_remote_dir_mtime() if self.inventory_cache_file else None
+
+        if remote_mtime is not None and not refresh:
+            cached = self._load_inventory_file(remote_mtime)
+            if cached is not None:
+                self._inventory_cache, self._signature_cache = cached
+                self._file_set_cache = None
+                logger.info(f"INVENTORY_CACHE_HIT count={len(self._inventory_cache)} signatures={len(self._signature_cache)} remote_mtime={remote_mtime}")
+                return list(self._inventory_cache)
+
+        self._inventory_cache, self._signature_cache = self.list_remote_packages_and_signatures()
+        self._file_set_cache = None
+        logger.info(f"REMOTE_INVENTORY_CACHED count={len(self._inventory_cache)} signatures={len(self._signature_cache)}")
+
+        if remote_mtime is not None and self._inventory_cache:
+            self._save_inventory_file(remote_mtime, self._inventory_cache, self._signature_cache)
+
+        return list(self._inventory_cache)
+
+    def get_cached_signatures(self) -> List[str]:
+        """
+        Return the remote signature listing captured by the same SSH find
+        as get_cached_inventory(); no extra round-trip is made.
+
+        Returns:
+            List of *.sig filenames (basenames) on the VPS
+        """
+        if self._signature_cache is None:
+            self.get_cached_inventory()
+        return list(self._signature_cache or [])
+
+    def get_cached_file_set(self) -> FrozenSet[str]:
+        """
+        Packages and signatures of the cached listing as one frozenset, built
+        once per listing for membership checks.
+
+        Returns:
+            Frozenset of package and *.sig filenames (basenames) on the VPS
+        """
+        if self._inventory_cache is None:
+            self.get_cached_inventory()
+        if self._file_set_cache is None:
+            self._file_set_cache = frozenset(self._inventory_cache or ()) | frozenset(self._signature_cache or ())
+        return self._file_set_cache